@@ -1,19 +1,36 @@
 """管理后台 API - 需要认证的 CRUD 操作"""
-from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, timezone
 import traceback
+import asyncio
+import uuid
+import time
 import logging
 import os
+import csv
+import io
+import json
 import shutil
 from pathlib import Path
 import stat
-from app.core.database import get_db
+from app.core.database import get_db, async_session_maker
 from app.core.oss_service import oss_service
+from app.core.catalog_cache import catalog_cache
+from app.core.catalog_stats import get_product_tag_ids, record_product_change
+from app.core.search_index import search_index
+from app.core.uploads import receive_upload, ReceivedUpload, max_size_for, check_content_type, SNIFF_SIZE
+from app.core.media_store import MediaStore, MEDIA_EXTENSIONS, is_valid_sha256
+from app.core.image_variants import ImageVariantService
+from app.core.media_sweeper import MediaSweeper
+from app.core.http_client import proxy_http_client
+from app.api.proxy import proxy_cache, image_transformer
+from app.core.config import UPLOAD_MAX_VIDEO_SIZE
 from app.models.catalog import Category, Product, Tag, product_tag_association
 from app.models.content import HeroSlide
 from app.models.admin import Admin
@@ -32,6 +49,17 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 logger.info(f"文件上传目录: {UPLOAD_DIR.absolute()}")
 logger.info(f"上传目录是否存在: {UPLOAD_DIR.exists()}")
 logger.info(f"上传目录可写: {UPLOAD_DIR.is_dir() and os.access(UPLOAD_DIR, os.W_OK)}")
+# 上传接收中的临时文件（不在 /uploads 挂载范围内，不对外提供访问）
+INCOMING_DIR = BASE_DIR / "static" / ".incoming"
+
+# 内容寻址媒体存储（相同内容只保存一份）
+media_store = MediaStore(UPLOAD_DIR)
+# 响应式图片衍生版本（上传后在后台进程池中生成）
+image_variants = ImageVariantService(media_store, INCOMING_DIR)
+# 未被引用的临时文件和媒体文件定期清理（应用启动时开始运行）
+media_sweeper = MediaSweeper(media_store, INCOMING_DIR)
+
+ALLOWED_UPLOAD_TYPES = ["image/jpeg", "image/png", "image/gif", "image/webp", "video/mp4", "video/webm", "video/quicktime"]
 
 
 # ==================== 认证依赖 ====================
@@ -62,77 +90,50 @@ async def get_current_admin(request: Request, db: AsyncSession = Depends(get_db)
 
 
 # ==================== 文件上传 API ====================
+async def store_received_upload(upload: ReceivedUpload) -> Tuple[str, bool]:
+    """按内容哈希保存已接收的上传，返回 (URL, 是否与已有文件重复)"""
+    try:
+        return await media_store.store(upload)
+    except Exception as e:
+        logger.error(f"❌ 文件保存失败: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"文件保存失败: {str(e)}"
+        )
+
+
 @router.post("/upload-temp")
 async def upload_temp_file(
     file: UploadFile = File(...),
     admin: Admin = Depends(get_current_admin)
 ):
-    """上传临时文件（用于预览，上传到 temp/ 目录）"""
+    """上传文件用于预览
+    
+    文件按内容哈希直接保存到正式位置（相同内容只保存一份），返回的 URL 不需要再调用 move-temp-to-final。
+    """
     try:
-        # 验证文件类型
-        allowed_types = ["image/jpeg", "image/png", "image/gif", "image/webp", "video/mp4", "video/webm", "video/quicktime"]
-        if file.content_type not in allowed_types:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"不支持的文件类型: {file.content_type}"
-            )
-        
-        # 生成文件名
-        file_ext = Path(file.filename).suffix
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{file.filename}"
-        
         logger.info(f"========== 临时文件上传开始 ==========")
         logger.info(f"文件名: {file.filename}")
         logger.info(f"文件类型: {file.content_type}")
         logger.info(f"OSS 服务状态: {'启用' if oss_service.enabled else '未启用（使用本地存储）'}")
         
-        # 重置文件指针（确保从头读取）
-        await file.seek(0)
-        content = await file.read()
-        file_size = len(content)
+        # 分块接收（边读边校验类型和大小）
+        upload = await receive_upload(file, INCOMING_DIR, ALLOWED_UPLOAD_TYPES)
+        file_size = upload.size
         logger.info(f"读取文件内容大小: {file_size} 字节")
         
-        # 尝试上传到 OSS 临时目录
-        file_url = None
-        if oss_service.enabled:
-            try:
-                file_url = oss_service.upload_file(content, filename, file.content_type, is_temp=True)
-                if file_url:
-                    logger.info(f"✅ 临时文件已上传到 OSS: {file_url}")
-                else:
-                    logger.warning("OSS 上传失败，回退到本地存储")
-            except Exception as e:
-                logger.error(f"OSS 上传异常: {str(e)}")
-                logger.warning("回退到本地存储")
-        
-        # 如果 OSS 未启用或上传失败，使用本地存储
-        if not file_url:
-            temp_dir = UPLOAD_DIR / "temp"
-            temp_dir.mkdir(parents=True, exist_ok=True)
-            file_path = temp_dir / filename
-            logger.info(f"使用本地存储，目标路径: {file_path.absolute()}")
-            
-            try:
-                with open(file_path, "wb") as buffer:
-                    buffer.write(content)
-                    buffer.flush()
-                    os.fsync(buffer.fileno())
-                
-                file_url = f"/uploads/temp/{filename}"
-                logger.info(f"✅ 临时文件已保存到本地: {file_url}")
-            except Exception as e:
-                logger.error(f"❌ 文件写入失败: {str(e)}")
-                logger.error(traceback.format_exc())
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"文件保存失败: {str(e)}"
-                )
+        try:
+            file_url, deduplicated = await store_received_upload(upload)
+            if not deduplicated:
+                image_variants.schedule_upload(file_url, upload)
+        finally:
+            upload.discard()
         
         logger.info(f"========== 临时文件上传成功 ==========")
         logger.info(f"URL: {file_url}")
         logger.info(f"大小: {file_size} 字节")
-        return {"url": file_url, "filename": filename, "is_temp": True}
+        return {"url": file_url, "filename": Path(file_url).name, "is_temp": False, "deduplicated": deduplicated}
     except HTTPException:
         raise
     except Exception as e:
@@ -149,80 +150,29 @@ async def upload_file(
     file: UploadFile = File(...),
     admin: Admin = Depends(get_current_admin)
 ):
-    """上传文件（图片或视频）- 直接上传到正式位置"""
+    """上传文件（图片或视频）- 按内容哈希直接保存到正式位置"""
     try:
-        # 验证文件类型
-        allowed_types = ["image/jpeg", "image/png", "image/gif", "image/webp", "video/mp4", "video/webm", "video/quicktime"]
-        if file.content_type not in allowed_types:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"不支持的文件类型: {file.content_type}"
-            )
-        
-        # 生成文件名
-        file_ext = Path(file.filename).suffix
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{file.filename}"
-        
         logger.info(f"========== 文件上传开始 ==========")
         logger.info(f"文件名: {file.filename}")
         logger.info(f"文件类型: {file.content_type}")
         logger.info(f"OSS 服务状态: {'启用' if oss_service.enabled else '未启用（使用本地存储）'}")
         
-        # 重置文件指针（确保从头读取）
-        await file.seek(0)
-        content = await file.read()
-        file_size = len(content)
+        # 分块接收（边读边校验类型和大小）
+        upload = await receive_upload(file, INCOMING_DIR, ALLOWED_UPLOAD_TYPES)
+        file_size = upload.size
         logger.info(f"读取文件内容大小: {file_size} 字节")
         
-        # 尝试上传到 OSS（正式位置）
-        file_url = None
-        if oss_service.enabled:
-            try:
-                file_url = oss_service.upload_file(content, filename, file.content_type, is_temp=False)
-                if file_url:
-                    logger.info(f"✅ 文件已上传到 OSS: {file_url}")
-                else:
-                    logger.warning("OSS 上传失败，回退到本地存储")
-            except Exception as e:
-                logger.error(f"OSS 上传异常: {str(e)}")
-                logger.warning("回退到本地存储")
-        
-        # 如果 OSS 未启用或上传失败，使用本地存储
-        if not file_url:
-            file_path = UPLOAD_DIR / filename
-            logger.info(f"使用本地存储，目标路径: {file_path.absolute()}")
-            
-            # 确保目录存在
-            UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-            
-            try:
-                with open(file_path, "wb") as buffer:
-                    buffer.write(content)
-                    buffer.flush()
-                    os.fsync(buffer.fileno())
-                
-                # 验证文件是否真的保存成功
-                if not file_path.exists():
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail="文件保存失败：文件不存在"
-                    )
-                
-                file_url = f"/uploads/{filename}"
-                logger.info(f"✅ 文件已保存到本地: {file_url}")
-            except Exception as e:
-                logger.error(f"❌ 文件写入失败: {str(e)}")
-                logger.error(traceback.format_exc())
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"文件保存失败: {str(e)}"
-                )
+        try:
+            file_url, deduplicated = await store_received_upload(upload)
+            if not deduplicated:
+                image_variants.schedule_upload(file_url, upload)
+        finally:
+            upload.discard()
         
         logger.info(f"========== 文件上传成功 ==========")
         logger.info(f"URL: {file_url}")
         logger.info(f"大小: {file_size} 字节")
-        return {"url": file_url, "filename": filename}
+        return {"url": file_url, "filename": Path(file_url).name, "deduplicated": deduplicated}
     except HTTPException:
         raise
     except Exception as e:
@@ -249,92 +199,20 @@ async def upload_video(
                 detail=f"不支持的视频类型: {file.content_type}。支持的格式：MP4, WEBM, MOV, AVI, OGG"
             )
         
-        # 检查文件大小（限制 100MB）
-        file_size_limit = 100 * 1024 * 1024  # 100MB
-        # 注意：UploadFile 的 size 属性可能不可用，需要在读取时检查
-        
-        # 生成文件名
-        file_ext = Path(file.filename).suffix
-        if not file_ext:
-            # 根据 content_type 推断扩展名
-            ext_map = {
-                "video/mp4": ".mp4",
-                "video/webm": ".webm",
-                "video/quicktime": ".mov",
-                "video/x-msvideo": ".avi",
-                "video/ogg": ".ogg"
-            }
-            file_ext = ext_map.get(file.content_type, ".mp4")
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_video{file_ext}"
-        
         logger.info(f"========== 视频上传开始 ==========")
         logger.info(f"文件名: {file.filename}")
         logger.info(f"文件类型: {file.content_type}")
         logger.info(f"OSS 服务状态: {'启用' if oss_service.enabled else '未启用（使用本地存储）'}")
         
-        # 重置文件指针
-        await file.seek(0)
-        
-        # 读取文件内容并检查大小
-        content = await file.read()
-        file_size = len(content)
-        
-        if file_size > file_size_limit:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"视频文件过大: {file_size / 1024 / 1024:.2f}MB，最大允许 100MB"
-            )
-        
+        # 分块接收，超过 UPLOAD_MAX_VIDEO_SIZE 时在读取过程中立即中止
+        upload = await receive_upload(file, INCOMING_DIR, allowed_video_types, max_size=UPLOAD_MAX_VIDEO_SIZE)
+        file_size = upload.size
         logger.info(f"视频文件大小: {file_size} 字节 ({file_size / 1024 / 1024:.2f}MB)")
         
-        # 尝试上传到 OSS
-        video_url = None
-        if oss_service.enabled:
-            try:
-                video_url = oss_service.upload_file(content, filename, file.content_type)
-                if video_url:
-                    logger.info(f"✅ 视频已上传到 OSS: {video_url}")
-                else:
-                    logger.warning("OSS 上传失败，回退到本地存储")
-            except Exception as e:
-                logger.error(f"OSS 上传异常: {str(e)}")
-                logger.warning("回退到本地存储")
-        
-        # 如果 OSS 未启用或上传失败，使用本地存储
-        if not video_url:
-            file_path = UPLOAD_DIR / filename
-            logger.info(f"使用本地存储，目标路径: {file_path.absolute()}")
-            
-            # 确保目录存在
-            UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-            
-            try:
-                with open(file_path, "wb") as buffer:
-                    buffer.write(content)
-                    buffer.flush()
-                    os.fsync(buffer.fileno())
-                
-                # 验证文件是否真的保存成功
-                if not file_path.exists():
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail="视频保存失败：文件不存在"
-                    )
-                
-                saved_size = file_path.stat().st_size
-                video_url = f"/uploads/{filename}"
-                logger.info(f"✅ 视频已保存到本地: {video_url}")
-            except HTTPException:
-                raise
-            except Exception as e:
-                logger.error(f"❌ 视频文件写入失败: {str(e)}")
-                logger.error(traceback.format_exc())
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"视频保存失败: {str(e)}"
-                )
+        try:
+            video_url, deduplicated = await store_received_upload(upload)
+        finally:
+            upload.discard()
         
         logger.info(f"========== 视频上传成功 ==========")
         logger.info(f"URL: {video_url}")
@@ -343,8 +221,9 @@ async def upload_video(
         return {
             "success": True,
             "url": video_url,
-            "filename": filename,
+            "filename": Path(video_url).name,
             "size": file_size,
+            "deduplicated": deduplicated,
             "message": "视频上传成功"
         }
     except HTTPException:
@@ -358,10 +237,193 @@ async def upload_video(
         )
 
 
+class MediaPrecheckRequest(BaseModel):
+    sha256: str
+    content_type: str
+
+
+@router.post("/media/precheck")
+async def precheck_media(
+    request: MediaPrecheckRequest,
+    admin: Admin = Depends(get_current_admin)
+):
+    """上传前按内容哈希查询是否已有相同文件
+    
+    存在时客户端可以跳过上传，直接使用返回的 URL。
+    """
+    sha256 = request.sha256.lower()
+    if not is_valid_sha256(sha256):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的 SHA-256 值"
+        )
+    if request.content_type not in MEDIA_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"不支持的文件类型: {request.content_type}"
+        )
+    
+    url = await media_store.find(sha256, request.content_type)
+    if url:
+        logger.info(f"♻️  预检命中已有文件: {url}")
+    return {"exists": url is not None, "url": url}
+
+
+class DirectUploadRequest(BaseModel):
+    filename: str
+    content_type: str
+    size: int
+    sha256: Optional[str] = None
+
+
+class DirectUploadCompleteRequest(BaseModel):
+    object_key: str
+
+
+@router.post("/upload-url")
+async def create_direct_upload(
+    request: DirectUploadRequest,
+    admin: Admin = Depends(get_current_admin)
+):
+    """获取直传 OSS 临时目录的预签名 URL（文件内容不经过应用服务器）
+    
+    浏览器用返回的 method / url / headers 上传文件，完成后调用 /upload-complete。
+    只签发 temp/ 下的新对象键，不能直接写入内容寻址位置（media/）。
+    提供 sha256 且存储服务支持校验（S3）时，哈希签入上传地址，内容不一致的上传会被存储服务拒绝。
+    OSS 未启用时返回 {"direct": false}，前端回退到 /upload-temp。
+    """
+    if request.content_type not in ALLOWED_UPLOAD_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"不支持的文件类型: {request.content_type}"
+        )
+    max_size = max_size_for(request.content_type)
+    if request.size <= 0 or request.size > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"文件过大，最大允许 {max_size / 1024 / 1024:.0f}MB"
+        )
+    
+    sha256 = request.sha256.lower() if request.sha256 else None
+    if sha256 and not is_valid_sha256(sha256):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的 SHA-256 值"
+        )
+    
+    if not oss_service.enabled:
+        return {"direct": False}
+    
+    # 随机片段避免同一秒内同名文件互相覆盖
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{timestamp}_{uuid.uuid4().hex[:8]}_{Path(request.filename).name}"
+    presigned = oss_service.presign_upload(filename, request.content_type, sha256=sha256)
+    if not presigned:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="生成上传地址失败"
+        )
+    logger.info(f"已签发直传地址: {presigned['object_key']}（{request.size} 字节）")
+    return {"direct": True, "filename": filename, **presigned}
+
+
+@router.post("/upload-complete")
+async def complete_direct_upload(
+    request: DirectUploadCompleteRequest,
+    admin: Admin = Depends(get_current_admin)
+):
+    """直传完成回调：校验对象的类型、大小和文件头，再转为内容寻址文件
+    
+    只接受 temp/ 下的临时对象，文件内容不经过应用服务器：
+    - 存储服务校验过 SHA-256 时（S3），按该哈希在存储桶内复制到 media/ 对应位置
+      （已有相同内容时直接使用已有文件），然后删除临时对象
+    - 没有校验值时（阿里云、腾讯云等）不做内容寻址去重，文件保留在 temp/，
+      提交产品时由 /move-temp-to-final 转为正式文件（is_temp 为 True）
+    校验不通过的临时对象会被删除；media/ 下的文件不会被本接口修改或删除。
+    返回与 /upload-temp 相同格式的结果。
+    """
+    object_key = request.object_key
+    if not object_key.startswith("temp/") or ".." in object_key:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的对象键"
+        )
+    
+    info = await oss_service.head_object_async(object_key)
+    if not info:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="文件不存在，请重新上传"
+        )
+    
+    content_type = info["content_type"]
+    max_size = max_size_for(content_type)
+    try:
+        if content_type not in ALLOWED_UPLOAD_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"不支持的文件类型: {content_type}"
+            )
+        if info["size"] > max_size:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"文件过大，最大允许 {max_size / 1024 / 1024:.0f}MB"
+            )
+        head = await oss_service.read_object_range_async(object_key, 0, SNIFF_SIZE - 1)
+        check_content_type(content_type, head or b"")
+    except HTTPException as e:
+        logger.warning(f"直传文件校验失败，已删除: {object_key}: {e.detail}")
+        await oss_service.delete_object_async(object_key)
+        raise
+    
+    sha256 = info.get("sha256")
+    if not sha256:
+        file_url = oss_service.object_url(object_key)
+        logger.info(f"✅ 直传文件已确认（无校验值，保留为临时文件）: {file_url}（{info['size']} 字节）")
+        return {
+            "url": file_url,
+            "filename": Path(object_key).name,
+            "is_temp": True,
+            "size": info["size"],
+            "deduplicated": False,
+        }
+    
+    try:
+        file_url, deduplicated = await media_store.adopt(oss_service.backend, object_key, sha256, content_type)
+    except Exception as e:
+        logger.error(f"❌ 直传文件保存失败: {object_key}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"文件保存失败: {str(e)}"
+        )
+    # 响应式图片在保存产品或轮播图时补生成（schedule_missing），这里不读取文件内容
+    
+    logger.info(f"✅ 直传文件已确认: {file_url}（{info['size']} 字节）")
+    return {
+        "url": file_url,
+        "filename": Path(file_url).name,
+        "is_temp": False,
+        "size": info["size"],
+        "deduplicated": deduplicated,
+    }
+
+
 class MoveTempFilesRequest(BaseModel):
     temp_urls: List[str]
 
 
+def move_local_temp_file(temp_url: str) -> dict:
+    """将本地临时文件移动到正式位置（阻塞操作，在线程中调用）"""
+    filename = temp_url.replace('/uploads/temp/', '')
+    temp_path = UPLOAD_DIR / "temp" / filename
+    final_path = UPLOAD_DIR / filename
+    if not temp_path.exists():
+        logger.warning(f"⚠️  临时文件不存在: {temp_path}")
+        return {"source": temp_url, "url": temp_url, "status": "missing"}
+    shutil.move(str(temp_path), str(final_path))
+    return {"source": temp_url, "url": f"/uploads/{filename}", "status": "moved"}
+
+
 @router.post("/move-temp-to-final")
 async def move_temp_to_final(
     request: MoveTempFilesRequest,
@@ -369,59 +431,54 @@ async def move_temp_to_final(
 ):
     """将临时文件移动到正式位置（提交产品时调用）
     
+    OSS 文件并发复制后批量删除临时对象，本地文件在线程中并发移动。
+    
     Args:
         temp_urls: 临时文件 URL 列表
     
     Returns:
-        正式文件 URL 列表
+        urls: 与 temp_urls 顺序一致的正式文件 URL 列表（失败的保持原 URL）
+        results: 每个文件的处理结果（status: moved / missing / failed / unchanged）
     """
     try:
         logger.info(f"========== 移动临时文件到正式位置 ==========")
         logger.info(f"临时文件数量: {len(request.temp_urls)}")
+        started = time.perf_counter()
         
-        final_urls = []
-        for temp_url in request.temp_urls:
-            logger.info(f"处理临时文件: {temp_url}")
-            
-            # 从临时 URL 中提取文件名
+        results: List[dict] = [None] * len(request.temp_urls)
+        local_indexes = []
+        oss_indexes = []
+        for index, temp_url in enumerate(request.temp_urls):
             if temp_url.startswith('/uploads/temp/'):
-                # 本地临时文件
-                filename = temp_url.replace('/uploads/temp/', '')
-                # 移动到正式位置
-                temp_path = UPLOAD_DIR / "temp" / filename
-                final_path = UPLOAD_DIR / filename
-                
-                if temp_path.exists():
-                    import shutil
-                    shutil.move(str(temp_path), str(final_path))
-                    final_url = f"/uploads/{filename}"
-                    final_urls.append(final_url)
-                    logger.info(f"✅ 本地文件移动成功: {final_url}")
-                else:
-                    logger.warning(f"⚠️  临时文件不存在: {temp_path}")
-                    final_urls.append(temp_url)  # 保持原 URL
+                local_indexes.append(index)
             elif temp_url.startswith('http://') or temp_url.startswith('https://'):
-                # OSS 临时文件
-                if oss_service.enabled:
-                    # 从 URL 中提取文件名
-                    filename = Path(temp_url).name
-                    final_url = oss_service.move_file(temp_url, filename)
-                    if final_url:
-                        final_urls.append(final_url)
-                        logger.info(f"✅ OSS 文件移动成功: {final_url}")
-                    else:
-                        logger.warning(f"⚠️  OSS 文件移动失败，保持原 URL")
-                        final_urls.append(temp_url)
-                else:
-                    # OSS 未启用，保持原 URL
-                    final_urls.append(temp_url)
+                oss_indexes.append(index)
             else:
                 # 已经是正式路径，直接使用
-                final_urls.append(temp_url)
+                results[index] = {"source": temp_url, "url": temp_url, "status": "unchanged"}
+        
+        if local_indexes:
+            # 本地临时文件：在线程中并发移动（跨文件系统时 shutil.move 会复制文件）
+            local_results = await asyncio.gather(
+                *(asyncio.to_thread(move_local_temp_file, request.temp_urls[index]) for index in local_indexes)
+            )
+            for index, result in zip(local_indexes, local_results):
+                results[index] = result
+        
+        if oss_indexes:
+            # OSS 临时文件：并发复制 + 批量删除（OSS 未启用时原样返回）
+            oss_results = await oss_service.promote_temp_files_async(
+                [request.temp_urls[index] for index in oss_indexes]
+            )
+            for index, result in zip(oss_indexes, oss_results):
+                results[index] = result
         
+        final_urls = [result["url"] for result in results]
+        moved = sum(1 for result in results if result["status"] == "moved")
+        elapsed = (time.perf_counter() - started) * 1000
         logger.info(f"========== 文件移动完成 ==========")
-        logger.info(f"正式文件数量: {len(final_urls)}")
-        return {"urls": final_urls}
+        logger.info(f"正式文件数量: {len(final_urls)}, 已转正: {moved}, 耗时 {elapsed:.0f}ms")
+        return {"urls": final_urls, "results": results}
     except Exception as e:
         logger.error(f"移动文件失败: {str(e)}")
         logger.error(traceback.format_exc())
@@ -431,6 +488,30 @@ async def move_temp_to_final(
         )
 
 
+@router.get("/storage/metrics")
+async def get_storage_metrics(admin: Admin = Depends(get_current_admin)):
+    """OSS 和本地存储的线程池指标（排队深度、各操作耗时）、代理连接池和缓存命中情况、媒体清理状态"""
+    return {
+        **oss_service.metrics(),
+        "local": media_store.local.metrics(),
+        "proxy": {
+            **proxy_http_client.metrics(),
+            "cache": proxy_cache.metrics(),
+            "transform": image_transformer.metrics(),
+        },
+        "sweeper": media_sweeper.metrics(),
+    }
+
+
+@router.post("/storage/sweep")
+async def sweep_storage(
+    dry_run: bool = Query(True, description="只统计将被删除的文件，不实际删除"),
+    admin: Admin = Depends(get_current_admin)
+):
+    """立即执行一次媒体清理（删除超过保留期且未被产品、轮播图引用的临时文件和媒体文件）"""
+    return await media_sweeper.sweep(dry_run=dry_run)
+
+
 # ==================== API Endpoints ====================
 @router.get("/products", response_model=List[ProductResponse])
 async def get_all_products(
@@ -462,6 +543,110 @@ async def get_all_products(
         )
 
 
+# ==================== 目录导出 ====================
+EXPORT_BATCH_SIZE = 500
+EXPORT_COLUMNS = [
+    "id", "name", "slug", "description", "category_id", "category", "tag_ids",
+    "key_features", "images", "video", "specs", "order", "is_active", "created_at", "updated_at",
+]
+
+
+async def iter_export_rows(include_inactive: bool):
+    """按批次流式读取产品（服务端游标 + yield_per），每批产出一组导出行
+
+    产品行占用一个连接的服务端游标；标签在另一个会话中按批次查询，
+    因为 MySQL 在未读完的流式结果上不能再执行其他查询。
+    """
+    async with async_session_maker() as stream_session, async_session_maker() as lookup_session:
+        categories = dict((await lookup_session.execute(select(Category.id, Category.name))).all())
+        
+        query = (
+            select(
+                Product.id, Product.name, Product.slug, Product.description, Product.category_id,
+                Product.key_features, Product.images, Product.video, Product.specs,
+                Product.order, Product.is_active, Product.created_at, Product.updated_at,
+            )
+            .order_by(Product.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        if not include_inactive:
+            query = query.where(Product.is_active == True)
+        
+        result = await stream_session.stream(query)
+        async for partition in result.partitions():
+            product_ids = [row.id for row in partition]
+            tag_rows = await lookup_session.execute(
+                select(product_tag_association.c.product_id, product_tag_association.c.tag_id)
+                .where(product_tag_association.c.product_id.in_(product_ids))
+            )
+            tags_by_product = {}
+            for product_id, tag_id in tag_rows:
+                tags_by_product.setdefault(product_id, []).append(tag_id)
+            
+            batch = []
+            for row in partition:
+                data = row._asdict()
+                data["category"] = categories.get(row.category_id)
+                data["tag_ids"] = sorted(tags_by_product.get(row.id, []))
+                batch.append(data)
+            yield batch
+
+
+async def export_ndjson(include_inactive: bool):
+    """NDJSON：每行一个产品 JSON 对象"""
+    async for batch in iter_export_rows(include_inactive):
+        yield "".join(
+            json.dumps({k: row[k] for k in EXPORT_COLUMNS}, ensure_ascii=False) + "\n"
+            for row in batch
+        ).encode("utf-8")
+
+
+async def export_csv(include_inactive: bool):
+    """CSV：JSON 字段（key_features、images、specs、tag_ids）以 JSON 字符串写入单元格"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # UTF-8 BOM，方便 Excel 直接打开中文内容
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue().encode("utf-8")
+    
+    async for batch in iter_export_rows(include_inactive):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in batch:
+            writer.writerow([
+                json.dumps(row[k], ensure_ascii=False) if isinstance(row[k], (list, dict)) else row[k]
+                for k in EXPORT_COLUMNS
+            ])
+        yield buffer.getvalue().encode("utf-8")
+
+
+@router.get("/products/export")
+async def export_products(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="导出格式：ndjson 或 csv"),
+    include_inactive: bool = True,
+    admin: Admin = Depends(get_current_admin)
+):
+    """流式导出产品目录（ERP / 平台同步用）
+    
+    使用服务端游标按批读取，内存占用与产品总数无关，第一批数据读出后立即开始返回。
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if format == "csv":
+        body = export_csv(include_inactive)
+        media_type = "text/csv; charset=utf-8"
+    else:
+        body = export_ndjson(include_inactive)
+        media_type = "application/x-ndjson"
+    
+    logger.info(f"开始导出产品目录: format={format}, include_inactive={include_inactive}")
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="products_{timestamp}.{format}"'}
+    )
+
+
 # ==================== Pydantic Schemas ====================
 class ProductCreate(BaseModel):
     name: str
@@ -624,14 +809,15 @@ async def create_product(
             specs=specs,
             order=product_data.order,
             is_active=product_data.is_active,
-            created_at=datetime.utcnow().isoformat(),
-            updated_at=datetime.utcnow().isoformat()
+            created_at=datetime.now(timezone.utc).isoformat(),
+            updated_at=datetime.now(timezone.utc).isoformat()
         )
         
         db.add(product)
         await db.flush()  # 获取产品 ID，此时 product.id 已可用
         
         # 关联标签（使用 association 表直接插入，避免访问关联关系）
+        tag_ids = []
         if product_data.tag_ids and len(product_data.tag_ids) > 0:
             # 验证标签是否存在
             result = await db.execute(
@@ -651,8 +837,14 @@ async def create_product(
                         for tag in tags
                     ])
                 )
+            tag_ids = [tag.id for tag in tags]
+        
+        # 维护标签的启用产品数量
+        await record_product_change(db, False, [], product.is_active, tag_ids, product.id)
         
         await db.commit()
+        search_index.upsert_product(product, catalog_cache.invalidate())
+        await image_variants.schedule_missing(product.images or [])
         
         # 不需要重新查询或访问关联关系，直接返回成功
         logger.info(f"产品创建成功: ID={product.id}, name={product.name}")
@@ -692,6 +884,11 @@ async def update_product(
         
         logger.info(f"更新前产品状态: is_active={product.is_active}")
         
+        # 记录变更前的状态，用于维护标签计数
+        old_active = product.is_active
+        old_tag_ids = await get_product_tag_ids(db, product_id)
+        new_tag_ids = old_tag_ids
+        
         # 更新字段
         if product_data.name is not None:
             product.name = product_data.name
@@ -760,7 +957,7 @@ async def update_product(
         else:
             logger.warning(f"is_active 字段为 None，不更新")
         
-        product.updated_at = datetime.utcnow().isoformat()
+        product.updated_at = datetime.now(timezone.utc).isoformat()
         
         # 更新标签关联（使用 association 表直接操作）
         if product_data.tag_ids is not None:
@@ -771,6 +968,7 @@ async def update_product(
                 )
             )
             # 再插入新的关联
+            new_tag_ids = set()
             if len(product_data.tag_ids) > 0:
                 result = await db.execute(
                     select(Tag).where(Tag.id.in_(product_data.tag_ids))
@@ -783,8 +981,14 @@ async def update_product(
                             for tag in tags
                         ])
                     )
+                new_tag_ids = {tag.id for tag in tags}
+        
+        # 维护标签的启用产品数量
+        await record_product_change(db, old_active, old_tag_ids, product.is_active, new_tag_ids, product_id)
         
         await db.commit()
+        search_index.upsert_product(product, catalog_cache.invalidate())
+        await image_variants.schedule_missing(product.images or [])
         
         logger.info(f"产品更新成功: ID={product_id}, is_active={product.is_active}")
         return {"success": True, "message": "产品更新成功"}
@@ -818,8 +1022,13 @@ async def delete_product(
             detail="产品不存在"
         )
     
+    # 维护标签的启用产品数量
+    old_tag_ids = await get_product_tag_ids(db, product_id)
+    await record_product_change(db, product.is_active, old_tag_ids, False, [], product_id)
+    
     await db.delete(product)
     await db.commit()
+    search_index.remove_product(product_id, catalog_cache.invalidate())
     
     return {"success": True, "message": "产品删除成功"}
 
@@ -878,6 +1087,7 @@ async def create_category(
     
     db.add(category)
     await db.commit()
+    catalog_cache.invalidate()
     # 不需要 refresh，直接返回即可
     
     return {"success": True, "message": "分类创建成功", "id": category.id}
@@ -921,6 +1131,7 @@ async def update_category(
         category.is_active = category_data.is_active
     
     await db.commit()
+    catalog_cache.invalidate()
     
     return {"success": True, "message": "分类更新成功"}
 
@@ -945,6 +1156,7 @@ async def delete_category(
     
     await db.delete(category)
     await db.commit()
+    catalog_cache.invalidate()
     
     return {"success": True, "message": "分类删除成功"}
 
@@ -976,6 +1188,7 @@ async def create_tag(
     
     db.add(tag)
     await db.commit()
+    catalog_cache.invalidate()
     # 不需要 refresh，直接返回即可
     
     return {"success": True, "message": "标签创建成功", "id": tag.id}
@@ -1019,6 +1232,7 @@ async def update_tag(
         tag.is_active = tag_data.is_active
     
     await db.commit()
+    catalog_cache.invalidate()
     
     return {"success": True, "message": "标签更新成功"}
 
@@ -1043,6 +1257,7 @@ async def delete_tag(
     
     await db.delete(tag)
     await db.commit()
+    catalog_cache.invalidate()
     
     return {"success": True, "message": "标签删除成功"}
 
@@ -1099,6 +1314,8 @@ async def create_slide(
         
         db.add(slide)
         await db.commit()
+        catalog_cache.invalidate()
+        await image_variants.schedule_missing([slide.image])
         # 不需要 refresh，直接返回即可
         
         logger.info(f"轮播图创建成功: ID={slide.id}, title={slide.title}")
@@ -1157,6 +1374,8 @@ async def update_slide(
             slide.is_active = slide_data.is_active
         
         await db.commit()
+        catalog_cache.invalidate()
+        await image_variants.schedule_missing([slide.image])
         
         logger.info(f"轮播图更新成功: ID={slide_id}")
         return {"success": True, "message": "轮播图更新成功"}
@@ -1192,6 +1411,7 @@ async def delete_slide(
     
     await db.delete(slide)
     await db.commit()
+    catalog_cache.invalidate()
     
     return {"success": True, "message": "轮播图删除成功"}
 
@@ -1,77 +1,478 @@
 """OSS 文件代理 - 用于解决 CORS 问题"""
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Query
 from fastapi.responses import StreamingResponse, Response
+from starlette.background import BackgroundTask
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple
+import asyncio
+import hashlib
+import os
+import re
 import httpx
 import logging
+from app.core.oss_service import oss_service
+from app.core.http_client import proxy_http_client
+from app.core.proxy_cache import ProxyCache, Flight
+from app.core.image_transform import ImageTransformer, TRANSFORM_FORMATS, TRANSFORM_SOURCE_TYPES
+from app.core.config import PROXY_CHUNK_SIZE, PROXY_TRANSFORM_MAX_DIMENSION, PROXY_TRANSFORM_QUALITY
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/proxy", tags=["代理"])
 
+# 代理磁盘缓存目录（不在 /uploads 挂载范围内）
+BASE_DIR = Path(__file__).parent.parent.parent  # 项目根目录
+proxy_cache = ProxyCache(BASE_DIR / "static" / ".proxy-cache")
+# 按需图片缩放（进程池）
+image_transformer = ImageTransformer()
 
-@router.get("/oss/{file_path:path}")
-async def proxy_oss_file(file_path: str):
+
+# 转发给存储桶的请求头（范围请求和条件请求）
+FORWARD_REQUEST_HEADERS = ("Range", "If-Range", "If-None-Match", "If-Modified-Since")
+# 原样返回给客户端的上游响应头
+FORWARD_RESPONSE_HEADERS = (
+    "Content-Length", "Content-Encoding", "Content-Range", "Accept-Ranges", "ETag", "Last-Modified"
+)
+PROXY_HEADERS = {
+    "Cache-Control": "public, max-age=31536000",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, HEAD, OPTIONS",
+    "Access-Control-Allow-Headers": "*",
+    "Access-Control-Expose-Headers": "Content-Length, Content-Range, Accept-Ranges, ETag, Last-Modified, X-Cache",
+}
+# 请求缩放但返回原图时的缓存时间
+TRANSFORM_FALLBACK_CACHE_CONTROL = "public, max-age=60"
+# 单段字节范围：bytes=start-end、bytes=start-、bytes=-suffix
+_BYTE_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _response_headers(upstream: httpx.Response, cache_status: str) -> dict:
+    """代理响应头：固定的缓存和跨域头 + 上游的长度、范围和校验头"""
+    headers = dict(PROXY_HEADERS)
+    for name in FORWARD_RESPONSE_HEADERS:
+        if name in upstream.headers:
+            headers[name] = upstream.headers[name]
+    headers.setdefault("Accept-Ranges", "bytes")
+    headers["X-Cache"] = cache_status
+    return headers
+
+
+# ==================== 缓存命中 ====================
+def _not_modified(request: Request, entry: Dict[str, Any]) -> bool:
+    """客户端的条件请求是否与缓存版本一致"""
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        if not entry.get("etag"):
+            return False
+        etag = entry["etag"].removeprefix("W/")
+        return if_none_match.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    if_modified_since = request.headers.get("If-Modified-Since")
+    if if_modified_since and entry.get("last_modified"):
+        try:
+            return parsedate_to_datetime(entry["last_modified"]) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _parse_range(request: Request, entry: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    """解析单个字节范围，返回 (start, end)；没有 Range、If-Range 不匹配或多段范围时返回 None（返回完整文件）"""
+    range_header = request.headers.get("Range")
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range not in (entry.get("etag"), entry.get("last_modified")):
+        return None
+
+    # 语法无效的范围（如 bytes=500-100、bytes=abc-）按 RFC 7233 忽略，返回完整文件；
+    # 只有格式正确但无法满足的范围（起点超出文件大小、bytes=-0）才返回 416
+    size = entry["size"]
+    match = _BYTE_RANGE_RE.match(range_header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # bytes=-N：最后 N 个字节
+        suffix = int(last)
+        start, end = max(size - suffix, 0), size - 1
+        if suffix == 0:
+            start = size
+    if start >= size:
+        raise HTTPException(status_code=416, detail="请求范围无效", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+async def _iter_file(f, start: int, end: int):
+    try:
+        await asyncio.to_thread(f.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(PROXY_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+async def _serve_cached(
+    request: Request, entry: Dict[str, Any], cache_status: str = "HIT", extra_headers: Optional[Dict[str, str]] = None
+) -> Optional[Response]:
+    """从缓存文件返回（支持 HEAD、Range 和条件请求），缓存文件已不存在或被替换时返回 None"""
+    headers = dict(PROXY_HEADERS, **{"Accept-Ranges": "bytes", "X-Cache": cache_status}, **(extra_headers or {}))
+    for name, field in (("ETag", "etag"), ("Last-Modified", "last_modified")):
+        if entry.get(field):
+            headers[name] = entry[field]
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+
+    size = entry["size"]
+    status_code = 200
+    start, end = 0, size - 1
+    byte_range = _parse_range(request, entry)
+    if byte_range:
+        status_code = 206
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    if request.method == "HEAD":
+        return Response(status_code=status_code, media_type=entry["content_type"], headers=headers)
+
+    try:
+        f = await asyncio.to_thread(open, entry["path"], "rb")
+    except FileNotFoundError:
+        return None
+    if os.fstat(f.fileno()).st_size != size:
+        f.close()
+        return None
+    return StreamingResponse(
+        _iter_file(f, start, end),
+        status_code=status_code,
+        media_type=entry["content_type"],
+        headers=headers,
+    )
+
+
+async def _revalidate(oss_url: str, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """向存储桶确认缓存项是否仍有效：有效返回缓存项，对象已变化或已删除返回 None
+
+    存储桶无法访问时继续使用旧缓存。
+    """
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    try:
+        response = await proxy_http_client.client.head(oss_url, headers=headers)
+    except httpx.RequestError as e:
+        logger.warning(f"代理缓存验证失败，使用旧缓存: {oss_url}: {str(e)}")
+        return entry
+
+    unchanged = response.status_code == 304 or (
+        response.status_code == 200 and entry.get("etag") and response.headers.get("ETag") == entry["etag"]
+    )
+    if unchanged:
+        proxy_cache.stats["revalidated"] += 1
+        await proxy_cache.mark_validated(entry)
+        return entry
+    if response.status_code >= 500:
+        logger.warning(f"代理缓存验证失败 (HTTP {response.status_code})，使用旧缓存: {oss_url}")
+        return entry
+    await proxy_cache.discard(entry["key"])
+    return None
+
+
+# ==================== 缓存未命中 ====================
+async def _download(flight: Flight, oss_url: str):
+    """后台下载对象并写入缓存
+
+    下载与任何单个客户端的连接无关，合并的请求都按写入进度读取临时文件；
+    某个客户端断开不影响其他请求，也不影响写入缓存。
+    """
+    writer = None
+    try:
+        client = proxy_http_client.client
+        response = await client.send(client.build_request("GET", oss_url), stream=True)
+        flight.upstream = response
+        if response.is_error:
+            await response.aclose()
+            return
+        writer = flight.writer = proxy_cache.writer(flight.key, response)
+        if writer is None:
+            # 不适合缓存：响应交给发起请求的一方直接转发（由它关闭）
+            return
+        flight.ready.set()
+        try:
+            async for chunk in response.aiter_raw(PROXY_CHUNK_SIZE):
+                await writer.write(chunk)
+        finally:
+            await response.aclose()
+        # 先写入缓存再结束合并：之后到达的请求总能找到正在进行的下载或缓存项
+        await writer.commit()
+    except Exception as e:
+        logger.error(f"代理下载 OSS 文件失败: {oss_url}: {str(e)}")
+        flight.error = e
+        if writer:
+            writer.abort()
+        return
+    except asyncio.CancelledError:
+        if writer:
+            writer.abort()
+        raise
+    finally:
+        flight.ready.set()
+        proxy_cache.end_flight(flight)
+
+
+async def _join_download(file_path: str, oss_url: str) -> Tuple[Flight, bool]:
+    """加入对象正在进行的后台下载（没有时发起），等到收到上游响应头；上游返回错误时抛出
+
+    Returns:
+        (flight, 是否为发起方)
+    """
+    flight, leader = proxy_cache.join(file_path)
+    if leader:
+        logger.info(f"代理 OSS 文件: GET {oss_url}")
+        flight.task = asyncio.create_task(_download(flight, oss_url))
+    await flight.ready.wait()
+
+    upstream = flight.upstream
+    if upstream is None:
+        raise flight.error or HTTPException(status_code=502, detail="无法连接到 OSS")
+    if upstream.is_error:
+        upstream.raise_for_status()
+    return flight, leader
+
+
+async def _serve_shared(file_path: str, oss_url: str) -> Optional[Response]:
+    """合并同一对象的并发未命中请求：只向存储桶请求一次，把数据同时转发给所有等待的请求
+
+    对象不适合缓存（过大、压缩编码等）时，发起方直接转发上游响应，其他请求返回 None 由调用方各自转发。
+    """
+    flight, leader = await _join_download(file_path, oss_url)
+    upstream = flight.upstream
+    media_type = upstream.headers.get("Content-Type", "application/octet-stream")
+    if flight.writer is None:
+        # 不适合缓存：发起方直接转发这个响应，其他等待的请求各自请求存储桶
+        if not leader:
+            return None
+        return StreamingResponse(
+            upstream.aiter_raw(PROXY_CHUNK_SIZE),
+            media_type=media_type,
+            headers=_response_headers(upstream, "MISS"),
+            background=BackgroundTask(upstream.aclose),
+        )
+    stream = flight.writer.follow()
+    if stream is None:
+        return None
+    return StreamingResponse(stream, media_type=media_type, headers=_response_headers(upstream, "MISS"))
+
+
+async def _lookup(file_path: str, oss_url: str) -> Optional[Dict[str, Any]]:
+    """查找磁盘缓存（超过免验证期的先向存储桶确认）"""
+    entry = await proxy_cache.get(file_path)
+    if entry and not proxy_cache.is_fresh(entry):
+        entry = await _revalidate(oss_url, entry)
+    return entry
+
+
+# ==================== 图片缩放 ====================
+async def _cached_source(file_path: str, oss_url: str) -> Optional[Dict[str, Any]]:
+    """取得原图的缓存项（未缓存时下载并等待写入完成），原图不是可处理的图片或不适合缓存时返回 None
+
+    收到上游响应头后先检查类型，不是图片时不等待下载完成，由调用方按原文件转发
+    （转发时加入同一个下载，不会再次请求存储桶）。
+    """
+    entry = await _lookup(file_path, oss_url)
+    if entry:
+        return entry
+    flight, leader = await _join_download(file_path, oss_url)
+    if flight.writer is None:
+        if leader:
+            await flight.upstream.aclose()
+        return None
+    content_type = flight.upstream.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if content_type not in TRANSFORM_SOURCE_TYPES:
+        return None
+    await asyncio.shield(flight.task)
+    return await proxy_cache.get(file_path)
+
+
+async def _render_variant(
+    flight: Flight, source: Dict[str, Any], width: Optional[int], height: Optional[int], quality: int, fmt: str
+) -> bool:
+    """在进程池中生成缩放后的图片并写入缓存，返回是否成功"""
+    content_type, extension = TRANSFORM_FORMATS[fmt]
+    output = proxy_cache.tmp_path(extension)
+    try:
+        result = await image_transformer.transform(source["path"], str(output), width, height, quality, fmt)
+        if result is None:
+            return False
+        source_version = source.get("etag") or source.get("last_modified")
+        etag = hashlib.sha256(f"{source_version}:{flight.key}".encode("utf-8")).hexdigest()[:32]
+        return await proxy_cache.store_file(
+            flight.key, output, content_type,
+            etag=f'"{etag}"', last_modified=source.get("last_modified"), source_version=source_version,
+        )
+    except Exception as e:
+        logger.error(f"图片缩放失败: {flight.key}: {str(e)}")
+        return False
+    finally:
+        output.unlink(missing_ok=True)
+        proxy_cache.end_flight(flight)
+
+
+async def _serve_transformed(
+    request: Request, file_path: str, oss_url: str,
+    width: Optional[int], height: Optional[int], quality: Optional[int], requested_format: Optional[str],
+) -> Optional[Response]:
+    """返回缩放 / 转换格式后的图片（按参数缓存），原图不是可处理的图片或处理失败时返回 None"""
+    if requested_format and requested_format != "auto" and requested_format not in image_transformer.formats:
+        raise HTTPException(status_code=400, detail=f"不支持的图片格式: {requested_format}")
+    source = await _cached_source(file_path, oss_url)
+    if source is None or source["content_type"] not in TRANSFORM_SOURCE_TYPES:
+        return None
+
+    fmt = image_transformer.negotiate(requested_format, request.headers.get("Accept", ""), source["content_type"])
+    # PNG 是无损格式，质量参数不影响结果
+    quality = 0 if fmt == "png" else quality or PROXY_TRANSFORM_QUALITY
+    variant_key = f"{file_path}?w={width or ''}&h={height or ''}&q={quality}&format={fmt}"
+    source_version = source.get("etag") or source.get("last_modified")
+
+    cache_status = "HIT"
+    entry = await proxy_cache.get(variant_key)
+    if entry and entry.get("source_version") != source_version:
+        # 原图已变化
+        await proxy_cache.discard(variant_key)
+        entry = None
+    if entry is None:
+        cache_status = "MISS"
+        flight, leader = proxy_cache.join(variant_key)
+        if leader:
+            flight.task = asyncio.create_task(_render_variant(flight, source, width, height, quality, fmt))
+        if not await asyncio.shield(flight.task):
+            return None
+        entry = await proxy_cache.get(variant_key)
+        if entry is None:
+            return None
+
+    extra_headers = {"Vary": "Accept"} if requested_format == "auto" else None
+    response = await _serve_cached(request, entry, cache_status, extra_headers)
+    if response and cache_status == "HIT":
+        proxy_cache.stats["hits"] += 1
+    return response
+
+
+# ==================== 原文件 ====================
+async def _serve_original(request: Request, file_path: str, oss_url: str) -> Response:
+    """返回原文件：优先从磁盘缓存返回，未命中时从存储桶获取"""
+    entry = await _lookup(file_path, oss_url)
+    if entry:
+        cached = await _serve_cached(request, entry)
+        if cached:
+            proxy_cache.stats["hits"] += 1
+            return cached
+        proxy_cache.forget(file_path)
+
+    # 使用共享客户端获取文件（复用到存储桶的连接），只读取响应头，响应体边读边转发
+    client = proxy_http_client.client
+    upstream_headers = {
+        name: request.headers[name] for name in FORWARD_REQUEST_HEADERS if name in request.headers
+    }
+    # 只有完整的 GET 请求可以写入缓存（并合并并发请求），HEAD、范围请求和条件请求直接转发
+    cacheable = proxy_cache.enabled and request.method == "GET" and not upstream_headers
+    if cacheable:
+        shared = await _serve_shared(file_path, oss_url)
+        if shared:
+            return shared
+    else:
+        proxy_cache.stats["bypassed"] += 1
+    cache_status = "MISS" if cacheable else "BYPASS"
+
+    logger.info(f"代理 OSS 文件: {request.method} {oss_url}")
+    upstream_request = client.build_request(request.method, oss_url, headers=upstream_headers)
+    response = await client.send(upstream_request, stream=True)
+
+    # 没有响应体的情况：HEAD、未修改（304）、请求范围无效（416）
+    if request.method == "HEAD" or response.status_code in (304, 416):
+        await response.aclose()
+        if response.is_error and response.status_code != 416:
+            response.raise_for_status()
+        return Response(
+            status_code=response.status_code,
+            media_type=response.headers.get("Content-Type"),
+            headers=_response_headers(response, cache_status),
+        )
+
+    if response.is_error:
+        await response.aclose()
+        response.raise_for_status()
+
+    # 确定 Content-Type
+    content_type = response.headers.get("Content-Type", "application/octet-stream")
+
+    # 返回文件流（200 完整文件或 206 部分内容；客户端接收慢时暂停读取上游，内存占用与文件大小无关）
+    return StreamingResponse(
+        response.aiter_raw(PROXY_CHUNK_SIZE),
+        status_code=response.status_code,
+        media_type=content_type,
+        headers=_response_headers(response, cache_status),
+        background=BackgroundTask(response.aclose),
+    )
+
+
+@router.api_route("/oss/{file_path:path}", methods=["GET", "HEAD"])
+async def proxy_oss_file(
+    file_path: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, le=PROXY_TRANSFORM_MAX_DIMENSION, description="最大宽度（像素，只缩小不放大）"),
+    h: Optional[int] = Query(None, ge=1, le=PROXY_TRANSFORM_MAX_DIMENSION, description="最大高度（像素，只缩小不放大）"),
+    q: Optional[int] = Query(None, ge=1, le=100, description="图片质量（1-100）"),
+    fmt: Optional[str] = Query(None, alias="format", pattern="^(auto|avif|webp|jpeg|png)$", description="输出格式，auto 按 Accept 头选择"),
+):
     """代理 OSS 文件请求（解决 CORS 问题）
-    
+
+    支持 HEAD 和 Range / If-Range 请求（视频拖动进度条时只获取需要的部分，返回 206），
+    以及 If-None-Match / If-Modified-Since 条件请求（返回 304）。
+    完整的 GET 响应会写入本地磁盘缓存，响应头 X-Cache 标明 HIT / MISS / BYPASS；
+    同一文件的并发未命中请求只向存储桶请求一次。
+
+    图片可以通过 w / h / q / format 参数按需缩放和转换格式，结果按参数缓存；
+    无法处理（不是图片、服务繁忙等）时返回原图。
+
     Args:
         file_path: OSS 文件路径（从 temp/ 或 uploads/ 开始）
     """
     try:
-        # 构建完整的 OSS URL
-        from app.core.oss_config import (
-            OSS_TYPE,
-            ALIYUN_OSS_BUCKET_NAME,
-            ALIYUN_OSS_ENDPOINT,
-            ALIYUN_OSS_BUCKET_DOMAIN,
-            TENCENT_COS_BUCKET_NAME,
-            TENCENT_COS_REGION,
-            TENCENT_COS_DOMAIN,
-            AWS_S3_BUCKET_NAME,
-            AWS_S3_REGION,
-            AWS_S3_DOMAIN,
-            OSS_USE_HTTPS
-        )
-        
-        # 构建 OSS URL
-        if OSS_TYPE == "aliyun":
-            if ALIYUN_OSS_BUCKET_DOMAIN:
-                oss_url = f"{'https' if OSS_USE_HTTPS else 'http'}://{ALIYUN_OSS_BUCKET_DOMAIN}/{file_path}"
-            else:
-                oss_url = f"{'https' if OSS_USE_HTTPS else 'http'}://{ALIYUN_OSS_BUCKET_NAME}.{ALIYUN_OSS_ENDPOINT}/{file_path}"
-        elif OSS_TYPE == "tencent":
-            if TENCENT_COS_DOMAIN:
-                oss_url = f"{'https' if OSS_USE_HTTPS else 'http'}://{TENCENT_COS_DOMAIN}/{file_path}"
-            else:
-                oss_url = f"{'https' if OSS_USE_HTTPS else 'http'}://{TENCENT_COS_BUCKET_NAME}.cos.{TENCENT_COS_REGION}.myqcloud.com/{file_path}"
-        elif OSS_TYPE == "aws":
-            if AWS_S3_DOMAIN:
-                oss_url = f"{'https' if OSS_USE_HTTPS else 'http'}://{AWS_S3_DOMAIN}/{file_path}"
-            else:
-                oss_url = f"{'https' if OSS_USE_HTTPS else 'http'}://{AWS_S3_BUCKET_NAME}.s3.{AWS_S3_REGION}.amazonaws.com/{file_path}"
-        else:
-            raise HTTPException(status_code=400, detail="不支持的 OSS 类型")
-        
-        logger.info(f"代理 OSS 文件: {oss_url}")
-        
-        # 使用 httpx 获取文件
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            response = await client.get(oss_url)
-            response.raise_for_status()
-            
-            # 确定 Content-Type
-            content_type = response.headers.get("Content-Type", "application/octet-stream")
-            
-            # 返回文件流
-            return Response(
-                content=response.content,
-                media_type=content_type,
-                headers={
-                    "Cache-Control": "public, max-age=31536000",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "GET, HEAD, OPTIONS",
-                    "Access-Control-Allow-Headers": "*",
-                }
-            )
+        # 构建完整的 OSS URL（各家域名规则由存储后端处理）
+        oss_url = oss_service.object_url(file_path)
+        if not oss_url:
+            raise HTTPException(status_code=400, detail="OSS 未启用")
+
+        if any(value is not None for value in (w, h, q, fmt)):
+            if proxy_cache.enabled and image_transformer.enabled:
+                transformed = await _serve_transformed(request, file_path, oss_url, w, h, q, fmt)
+                if transformed:
+                    return transformed
+            # 返回原图时不让浏览器长期缓存（之后可能可以正常缩放）
+            response = await _serve_original(request, file_path, oss_url)
+            response.headers["Cache-Control"] = TRANSFORM_FALLBACK_CACHE_CONTROL
+            if fmt == "auto":
+                # 同一 URL 按 Accept 可能返回不同格式，共享缓存需要区分
+                response.headers["Vary"] = "Accept"
+            return response
+
+        return await _serve_original(request, file_path, oss_url)
+    except HTTPException:
+        raise
     except httpx.HTTPStatusError as e:
         logger.error(f"代理 OSS 文件失败 (HTTP {e.response.status_code}): {str(e)}")
         raise HTTPException(status_code=e.response.status_code, detail=f"无法获取文件: {str(e)}")
@@ -83,4 +484,3 @@ async def proxy_oss_file(file_path: str):
         import traceback
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"代理失败: {str(e)}")
-
@@ -1,11 +1,16 @@
 """API 路由 - 只读接口"""
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-from typing import Optional, List
-from pydantic import BaseModel
+from sqlalchemy.orm import selectinload, load_only
+from typing import Optional, List, Dict, Set, Tuple
+import json
+from pydantic import BaseModel, TypeAdapter
 from app.core.database import get_db
+from app.core.catalog_cache import CatalogSnapshot, catalog_cache
+from app.core.catalog_facets import FacetFilter
+from app.core.http_cache import CachedBody, cached_response
+from app.core.search_index import search_index, tokenize
 from app.models.catalog import Category, Product, Tag, product_tag_association
 from app.models.content import HeroSlide
 
@@ -31,11 +36,20 @@ class TagResponse(BaseModel):
     color: str
     order: int
     is_active: bool
+    product_count: int = 0  # 关联的启用产品数量
     
     class Config:
         from_attributes = True
 
 
+class ImageSrcset(BaseModel):
+    """响应式图片：原图尺寸和各格式的 srcset 字符串（如 "url 320w, url 640w"）"""
+    width: int
+    height: int
+    webp: Optional[str] = None
+    jpeg: Optional[str] = None
+
+
 class ProductResponse(BaseModel):
     id: int
     name: str
@@ -50,6 +64,7 @@ class ProductResponse(BaseModel):
     category_id: Optional[int]
     category: Optional[CategoryResponse] = None
     tags: List[TagResponse] = []
+    image_srcsets: Optional[Dict[str, ImageSrcset]] = None  # 按图片 URL 索引，仅包含已生成衍生版本的图片
     
     class Config:
         from_attributes = True
@@ -66,153 +81,377 @@ class HeroSlideResponse(BaseModel):
     text_color: Optional[str]
     order: int
     is_active: bool
+    image_srcset: Optional[ImageSrcset] = None
     
     class Config:
         from_attributes = True
 
 
-# ==================== API Endpoints ====================
-@router.get("/tags", response_model=List[TagResponse])
-async def get_tags(db: AsyncSession = Depends(get_db)):
-    """获取标签列表（仅返回启用的且至少关联了一个启用产品的标签，按 order 排序）"""
-    from sqlalchemy import exists
-    
-    # 子查询：查找至少关联了一个启用产品的标签
-    # 使用 exists() 子查询来检查标签是否有关联的启用产品
-    subquery = (
-        select(1)
-        .select_from(product_tag_association)
-        .join(Product, product_tag_association.c.product_id == Product.id)
-        .where(
-            product_tag_association.c.tag_id == Tag.id,
-            Product.is_active == True
+class BootstrapResponse(BaseModel):
+    slides: List[HeroSlideResponse]
+    categories: List[CategoryResponse]
+    tags: List[TagResponse]
+    products: List[ProductResponse]
+
+
+# ==================== 序列化 ====================
+# 快照数据只在首次访问时序列化一次，之后直接返回缓存的字节
+tag_list_adapter = TypeAdapter(List[TagResponse])
+slide_list_adapter = TypeAdapter(List[HeroSlideResponse])
+category_list_adapter = TypeAdapter(List[CategoryResponse])
+product_list_adapter = TypeAdapter(List[ProductResponse])
+product_adapter = TypeAdapter(ProductResponse)
+
+
+def render_json(adapter: TypeAdapter, data) -> bytes:
+    """将 ORM 对象按响应模型序列化为 JSON 字节"""
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+# ==================== 产品分页与字段裁剪 ====================
+MAX_PAGE_SIZE = 200
+PRODUCT_FIELDS = set(ProductResponse.model_fields)
+# 对应 products 表列的字段（category / tags 为关联关系，image_srcsets 由快照附加）
+PRODUCT_COLUMN_FIELDS = PRODUCT_FIELDS - {"category", "tags", "image_srcsets"}
+
+
+def parse_product_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """解析 fields 参数，未传时返回 None 表示返回全部字段"""
+    if not fields:
+        return None
+    field_set = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = field_set - PRODUCT_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的字段: {', '.join(sorted(unknown))}"
         )
-    )
+    field_set.add("id")
+    return field_set
+
+
+def project_product(product: Product, field_set: Set[str]) -> dict:
+    """只取产品的指定字段（不会访问未请求的列或关联）"""
+    data = {}
+    # 按响应模型的字段顺序输出，保证相同请求的响应体（及 ETag）稳定
+    for field in ProductResponse.model_fields:
+        if field not in field_set:
+            continue
+        if field == "category":
+            data[field] = (
+                CategoryResponse.model_validate(product.category).model_dump()
+                if product.category else None
+            )
+        elif field == "tags":
+            data[field] = [TagResponse.model_validate(t).model_dump() for t in product.tags]
+        elif field == "image_srcsets":
+            data[field] = product.image_srcsets
+        else:
+            data[field] = getattr(product, field)
+    return data
+
+
+def render_products(products: List[Product], field_set: Optional[Set[str]]) -> bytes:
+    """序列化产品列表，指定 field_set 时只输出这些字段"""
+    if field_set is None:
+        return render_json(product_list_adapter, products)
+    return json.dumps(
+        [project_product(p, field_set) for p in products],
+        ensure_ascii=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def parse_facet_filter(
+    category_id: Optional[int],
+    tag_ids: Optional[str],
+    tag_match: str,
+    spec: Optional[List[str]],
+) -> Optional[FacetFilter]:
+    """解析分面筛选参数，没有标签和规格条件时返回 None"""
+    tag_id_set = set()
+    if tag_ids:
+        try:
+            tag_id_set = {int(t) for t in tag_ids.split(",") if t.strip()}
+        except ValueError:
+            raise HTTPException(status_code=400, detail="tag_ids 必须是逗号分隔的整数")
     
-    # 只返回启用的标签，且该标签至少关联了一个启用产品
-    result = await db.execute(
-        select(Tag)
-        .where(
-            Tag.is_active == True,
-            exists(subquery)
-        )
-        .order_by(Tag.order, Tag.name)
+    specs = {}
+    for item in spec or []:
+        key, sep, value = item.partition(":")
+        key, value = key.strip(), value.strip()
+        if not sep or not key or not value:
+            raise HTTPException(status_code=400, detail=f"规格筛选格式应为 key:value，收到: {item}")
+        specs.setdefault(key, set()).add(value)
+    
+    if not tag_id_set and not specs:
+        return None
+    return FacetFilter(
+        category_id=category_id or None,
+        tag_ids=tag_id_set,
+        match_all=(tag_match == "all"),
+        specs=specs,
     )
-    tags = result.scalars().all()
-    return tags
+
+
+def next_cursor_headers(next_cursor: Optional[int]) -> Optional[dict]:
+    """还有下一页时通过 X-Next-Cursor 响应头返回游标"""
+    if next_cursor is None:
+        return None
+    return {"X-Next-Cursor": str(next_cursor)}
+
+
+# ==================== 快照响应体 ====================
+def tags_body(snapshot: CatalogSnapshot) -> CachedBody:
+    return snapshot.body("tags", lambda: render_json(tag_list_adapter, snapshot.tags))
+
+
+def slides_body(snapshot: CatalogSnapshot) -> CachedBody:
+    return snapshot.body("slides", lambda: render_json(slide_list_adapter, snapshot.slides))
+
+
+def categories_body(snapshot: CatalogSnapshot) -> CachedBody:
+    return snapshot.body("categories", lambda: render_json(category_list_adapter, snapshot.categories))
+
+
+def products_body(
+    snapshot: CatalogSnapshot,
+    category_id: Optional[int] = None,
+    cursor: Optional[int] = None,
+    limit: Optional[int] = None,
+    field_set: Optional[Set[str]] = None,
+    facet_filter: Optional[FacetFilter] = None,
+) -> Tuple[CachedBody, Optional[int]]:
+    """产品列表响应体，返回 (响应体, 下一页游标)"""
+    products, next_cursor = snapshot.product_page(category_id, cursor, limit, facet_filter)
+    key = (
+        f"products:category={category_id or ''}:cursor={cursor or ''}:limit={limit or ''}"
+        f":fields={','.join(sorted(field_set)) if field_set else ''}"
+    )
+    if facet_filter is not None:
+        key += f":facets={facet_filter.cache_key()}"
+    # 只有默认参数的完整列表（全部或某个已有分类）是固定接口，其余组合由请求参数决定
+    volatile = (
+        cursor is not None or limit is not None or field_set is not None or facet_filter is not None
+        or (category_id is not None and not snapshot.products_in_category(category_id))
+    )
+    return snapshot.body(key, lambda: render_products(products, field_set), volatile=volatile), next_cursor
+
+
+# ==================== API Endpoints ====================
+@router.get("/tags", response_model=List[TagResponse])
+async def get_tags(request: Request):
+    """获取标签列表（仅返回启用的且至少关联了一个启用产品的标签，按 order 排序）"""
+    snapshot = await catalog_cache.get_snapshot()
+    return cached_response(request, tags_body(snapshot))
 
 
 @router.get("/slides", response_model=List[HeroSlideResponse])
-async def get_slides(db: AsyncSession = Depends(get_db)):
+async def get_slides(request: Request):
     """获取首页轮播图列表（仅返回启用的，按 order 排序）"""
-    result = await db.execute(
-        select(HeroSlide)
-        .where(HeroSlide.is_active == True)
-        .order_by(HeroSlide.order, HeroSlide.id)
-    )
-    slides = result.scalars().all()
-    return slides
+    snapshot = await catalog_cache.get_snapshot()
+    return cached_response(request, slides_body(snapshot))
 
 
 @router.get("/categories", response_model=List[CategoryResponse])
-async def get_categories(db: AsyncSession = Depends(get_db)):
+async def get_categories(request: Request):
     """获取分类列表（仅返回启用的，按 order 排序）"""
-    result = await db.execute(
-        select(Category)
-        .where(Category.is_active == True)
-        .order_by(Category.order, Category.name)
-    )
-    categories = result.scalars().all()
-    return categories
+    snapshot = await catalog_cache.get_snapshot()
+    return cached_response(request, categories_body(snapshot))
+
+
+@router.get("/bootstrap", response_model=BootstrapResponse)
+async def get_bootstrap(
+    request: Request,
+    fields: Optional[str] = Query(None, description="产品列表返回的字段，同 /api/products 的 fields 参数"),
+):
+    """首页初始化数据：一次返回轮播图、分类、标签和产品
+    
+    四份数据来自同一个目录快照，直接拼接各自已缓存的响应体，整体再作为一个响应体缓存。
+    """
+    field_set = parse_product_fields(fields)
+    snapshot = await catalog_cache.get_snapshot()
+    
+    def render() -> bytes:
+        products, _ = products_body(snapshot, field_set=field_set)
+        return b"".join([
+            b'{"slides":', slides_body(snapshot).content,
+            b',"categories":', categories_body(snapshot).content,
+            b',"tags":', tags_body(snapshot).content,
+            b',"products":', products.content,
+            b"}",
+        ])
+    
+    key = f"bootstrap:fields={','.join(sorted(field_set)) if field_set else ''}"
+    return cached_response(request, snapshot.body(key, render, volatile=field_set is not None))
 
 
 @router.get("/products", response_model=List[ProductResponse])
 async def get_products(
+    request: Request,
     category_id: Optional[int] = None,
     include_inactive: bool = False,  # 新增参数：是否包含未启用的产品
+    cursor: Optional[int] = Query(None, ge=0, description="上一页最后一个产品的 ID（keyset 分页游标）"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="每页数量，不传则返回全部"),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段，例如 id,name,images"),
+    tag_ids: Optional[str] = Query(None, description="逗号分隔的标签 ID"),
+    tag_match: str = Query("all", pattern="^(all|any)$", description="all: 包含全部标签；any: 包含任一标签"),
+    spec: Optional[List[str]] = Query(None, description="规格筛选 key:value，可重复；同一 key 多个值为 OR"),
     db: AsyncSession = Depends(get_db)
 ):
-    """获取产品列表（支持按分类过滤，包含标签）
+    """获取产品列表（支持按分类/标签/规格筛选、keyset 分页和字段裁剪，包含标签）
     
     Args:
         category_id: 可选的分类 ID，用于过滤产品
         include_inactive: 是否包含未启用的产品（默认 False，只返回启用的）
+        cursor: 从该 ID 之后开始返回（按 ID 升序）
+        limit: 每页数量；还有下一页时通过响应头 X-Next-Cursor 返回下一页游标
+        fields: 只返回指定字段（id 始终返回）
+        tag_ids / tag_match / spec: 分面筛选，基于快照中的位图索引
     """
-    query = (
-        select(Product)
-        .options(selectinload(Product.category), selectinload(Product.tags))
-    )
+    field_set = parse_product_fields(fields)
+    facet_filter = parse_facet_filter(category_id, tag_ids, tag_match, spec)
     
-    # 如果不包含未启用的，只返回启用的产品
+    # 只读启用产品时直接使用目录快照
     if not include_inactive:
-        query = query.where(Product.is_active == True)
+        snapshot = await catalog_cache.get_snapshot()
+        body, next_cursor = products_body(snapshot, category_id, cursor, limit, field_set, facet_filter)
+        return cached_response(request, body, next_cursor_headers(next_cursor))
+    
+    if facet_filter is not None:
+        raise HTTPException(status_code=400, detail="标签/规格筛选只支持启用的产品")
+    
+    query = select(Product)
+    if field_set:
+        # 只加载需要的列和关联，避免读取 description/specs 等大字段
+        columns = [getattr(Product, f) for f in field_set if f in PRODUCT_COLUMN_FIELDS]
+        if "category" in field_set:
+            columns.append(Product.category_id)
+            query = query.options(selectinload(Product.category))
+        if "tags" in field_set:
+            query = query.options(selectinload(Product.tags))
+        query = query.options(load_only(Product.id, *columns))
+    else:
+        query = query.options(selectinload(Product.category), selectinload(Product.tags))
     
     if category_id:
         query = query.where(Product.category_id == category_id)
     
-    # 只按 ID 排序，避免 order 字段导致的排序内存问题
+    if cursor is not None:
+        query = query.where(Product.id > cursor)
+    
+    # 只按 ID 排序，避免 order 字段导致的排序内存问题（同时也是 keyset 分页的顺序）
     query = query.order_by(Product.id)
+    if limit is not None:
+        # 多取一条用于判断是否还有下一页
+        query = query.limit(limit + 1)
     result = await db.execute(query)
     products = result.scalars().unique().all()
-    return products
+    
+    next_cursor = None
+    if limit is not None and len(products) > limit:
+        products = products[:limit]
+        next_cursor = products[-1].id
+    
+    body = CachedBody(render_products(products, field_set))
+    return cached_response(request, body, next_cursor_headers(next_cursor))
+
+
+@router.get("/products/facets")
+async def get_product_facets(
+    request: Request,
+    category_id: Optional[int] = None,
+    tag_ids: Optional[str] = Query(None, description="逗号分隔的标签 ID"),
+    tag_match: str = Query("all", pattern="^(all|any)$"),
+    spec: Optional[List[str]] = Query(None, description="规格筛选 key:value，可重复"),
+):
+    """获取分面计数：当前筛选条件下的结果总数，以及每个分类、标签、规格值对应的产品数量"""
+    facet_filter = parse_facet_filter(category_id, tag_ids, tag_match, spec) or FacetFilter(category_id=category_id or None)
+    snapshot = await catalog_cache.get_snapshot()
+    
+    def render() -> bytes:
+        total, category_counts, tag_counts, spec_counts = snapshot.facets.counts(facet_filter)
+        data = {
+            "total": total,
+            "categories": [
+                {"id": c.id, "name": c.name, "count": category_counts.get(c.id, 0)}
+                for c in snapshot.categories
+            ],
+            "tags": [
+                {"id": t.id, "name": t.name, "count": tag_counts.get(t.id, 0)}
+                for t in snapshot.tags
+            ],
+            "specs": {
+                key: [
+                    {"value": value, "count": count}
+                    for value, count in sorted(values.items())
+                ]
+                for key, values in sorted(spec_counts.items())
+            },
+        }
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    
+    return cached_response(request, snapshot.body(f"facets:{facet_filter.cache_key()}", render, volatile=True))
 
 
 @router.get("/products/statistics")
 async def get_product_statistics(
-    include_inactive: bool = False,
-    db: AsyncSession = Depends(get_db)
+    request: Request,
+    include_inactive: bool = False
 ):
-    """获取产品统计数据（按分类统计产品数量）"""
-    from sqlalchemy import func
+    """获取产品统计数据（按分类统计产品数量）
     
-    # 构建查询
-    query = select(Product.category_id, func.count(Product.id).label('count'))
-    
-    # 如果不包含未启用的，只统计启用的产品
-    if not include_inactive:
-        query = query.where(Product.is_active == True)
+    计数在目录快照重建时一次算好（管理后台写操作后重建），这里只返回缓存结果。
+    """
+    snapshot = await catalog_cache.get_snapshot()
+    body = snapshot.body(
+        f"statistics:include_inactive={include_inactive}",
+        lambda: json.dumps(
+            snapshot.product_statistics(include_inactive),
+            ensure_ascii=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+    )
+    return cached_response(request, body)
+
+
+@router.get("/search", response_model=List[ProductResponse])
+async def search_products(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="搜索关键词"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="最多返回的产品数量"),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段，同 /api/products"),
+):
+    """全文搜索启用的产品（名称、SKU、简介、卖点、规格），按 BM25 相关度排序"""
+    field_set = parse_product_fields(fields)
+    snapshot = await catalog_cache.get_snapshot()
     
-    # 按分类分组
-    query = query.group_by(Product.category_id)
+    # 索引与快照版本不一致（如其他 worker 写入后快照按 TTL 重建）时从快照全量重建
+    if search_index.version != snapshot.version:
+        search_index.rebuild(snapshot.products, snapshot.version)
     
-    result = await db.execute(query)
-    stats = result.all()
+    def render() -> bytes:
+        hits = search_index.search(q, limit)
+        products = [snapshot.products_by_id[pid] for pid, _ in hits if pid in snapshot.products_by_id]
+        return render_products(products, field_set)
     
-    # 获取所有分类信息
-    categories_result = await db.execute(
-        select(Category).where(Category.is_active == True)
+    key = (
+        f"search:{' '.join(tokenize(q))}:limit={limit}"
+        f":fields={','.join(sorted(field_set)) if field_set else ''}"
     )
-    categories = {cat.id: cat for cat in categories_result.scalars().all()}
-    
-    # 构建返回数据
-    statistics = {}
-    total_count = 0
-    
-    for category_id, count in stats:
-        if category_id and category_id in categories:
-            category_name = categories[category_id].name
-            statistics[category_name] = count
-            total_count += count
-        elif category_id is None:
-            # 未分类的产品
-            statistics['Uncategorized'] = count
-            total_count += count
-    
-    # 确保所有启用的分类都在统计中（即使没有产品也显示0）
-    for cat_id, cat in categories.items():
-        if cat.name not in statistics:
-            statistics[cat.name] = 0
-    
-    return {
-        "total": total_count,
-        "by_category": statistics,
-        "include_inactive": include_inactive
-    }
+    return cached_response(request, snapshot.body(key, render, volatile=True))
 
 
 @router.get("/products/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: int, db: AsyncSession = Depends(get_db)):
+async def get_product(product_id: int, request: Request, db: AsyncSession = Depends(get_db)):
     """获取产品详情（包含标签）"""
+    # 启用的产品从快照读取，未命中（如未启用的产品）再查数据库
+    snapshot = await catalog_cache.get_snapshot()
+    product = snapshot.products_by_id.get(product_id)
+    if product:
+        body = snapshot.body(f"product:{product_id}", lambda: render_json(product_adapter, product))
+        return cached_response(request, body)
+    
     result = await db.execute(
         select(Product)
         .where(Product.id == product_id)
@@ -0,0 +1,280 @@
+"""目录快照缓存 - 公开只读 API 的进程内缓存
+
+目录数据（分类、标签、轮播图、产品）一天只变化几次，但每分钟被读取上千次。
+这里维护一份带版本号的内存快照，公开接口直接从快照读取；
+管理后台写操作提交后调用 invalidate()，下一次读取时重建。
+"""
+import asyncio
+import bisect
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Callable, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.orm import selectinload
+from app.core.config import CATALOG_CACHE_TTL, CATALOG_BODY_CACHE_MAX
+from app.core.database import async_session_maker
+from app.core.http_cache import CachedBody
+from app.core.catalog_facets import FacetIndex, FacetFilter
+from app.models.catalog import Category, Product, Tag
+from app.models.content import HeroSlide
+from app.models.media import MediaVariant
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSnapshot:
+    """某一版本的目录数据（只包含启用的数据，对象已脱离会话）"""
+
+    def __init__(
+        self,
+        version: int,
+        categories: List[Category],
+        tags: List[Tag],
+        slides: List[HeroSlide],
+        products: List[Product],
+        product_counts: Optional[Dict[Optional[int], Tuple[int, int]]] = None,
+    ):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.categories = categories
+        self.tags = tags
+        self.slides = slides
+        self.products = products
+        # 按 ID 索引，产品详情接口使用
+        self.products_by_id: Dict[int, Product] = {p.id: p for p in products}
+        # 按分类分组（key 为 None 表示全部产品），同时保存有序 ID 列表用于 keyset 分页
+        self._products_by_category: Dict[Optional[int], List[Product]] = {None: products}
+        for product in products:
+            if product.category_id is not None:
+                self._products_by_category.setdefault(product.category_id, []).append(product)
+        self._ids_by_category: Dict[Optional[int], List[int]] = {
+            key: [p.id for p in items] for key, items in self._products_by_category.items()
+        }
+        # 各分类的产品数量：category_id -> (启用数量, 总数量)，None 表示未分类
+        self.product_counts = product_counts or {}
+        # 分面位图索引，首次筛选时构建
+        self._facets: Optional[FacetIndex] = None
+        # 预序列化的响应体，按接口 key 缓存，随快照一起失效
+        # 固定接口（分类、轮播图、标签、首页数据、产品详情等）总是缓存，数量由目录数据决定
+        self._bodies: Dict[str, CachedBody] = {}
+        # 由请求参数决定的响应体（搜索、游标分页、筛选、字段组合），按 LRU 限制数量，不会挤掉固定接口
+        self._volatile_bodies: "OrderedDict[str, CachedBody]" = OrderedDict()
+
+    def products_in_category(self, category_id: int) -> List[Product]:
+        """按分类过滤产品（保持 ID 顺序）"""
+        return self._products_by_category.get(category_id, [])
+
+    @property
+    def facets(self) -> FacetIndex:
+        """分面位图索引（懒加载）"""
+        if self._facets is None:
+            self._facets = FacetIndex(self.products)
+        return self._facets
+
+    def product_page(
+        self,
+        category_id: Optional[int] = None,
+        cursor: Optional[int] = None,
+        limit: Optional[int] = None,
+        facet_filter: Optional[FacetFilter] = None,
+    ) -> Tuple[List[Product], Optional[int]]:
+        """按 ID keyset 分页，返回 (本页产品, 下一页游标)
+
+        通过二分查找定位游标，任意一页的开销都与第一页相同。
+        指定 facet_filter 时先用位图求出匹配的产品（此时忽略 category_id，分类条件在 facet_filter 中）。
+        """
+        if facet_filter is not None and not facet_filter.is_empty:
+            items = self.facets.products_for(self.facets.match(facet_filter))
+            ids = [p.id for p in items]
+        else:
+            key = category_id or None
+            items = self._products_by_category.get(key, [])
+            ids = self._ids_by_category.get(key, [])
+        start = 0
+        if cursor is not None:
+            start = bisect.bisect_right(ids, cursor)
+        if limit is None:
+            return items[start:], None
+        page = items[start:start + limit]
+        next_cursor = page[-1].id if page and start + limit < len(items) else None
+        return page, next_cursor
+
+    def product_statistics(self, include_inactive: bool = False) -> dict:
+        """按分类统计产品数量（只统计启用的分类和未分类产品）"""
+        index = 1 if include_inactive else 0
+        statistics = {}
+        total_count = 0
+        for category in self.categories:
+            count = self.product_counts.get(category.id, (0, 0))[index]
+            statistics[category.name] = count
+            total_count += count
+        uncategorized = self.product_counts.get(None, (0, 0))[index]
+        if uncategorized:
+            statistics["Uncategorized"] = uncategorized
+            total_count += uncategorized
+        return {
+            "total": total_count,
+            "by_category": statistics,
+            "include_inactive": include_inactive
+        }
+
+    def body(self, key: str, render: Callable[[], bytes], volatile: bool = False) -> CachedBody:
+        """获取某个接口的预序列化响应体，首次访问时调用 render 生成
+
+        Args:
+            volatile: key 由任意请求参数决定（搜索词、游标等），放入有上限的 LRU，
+                避免一次性的请求占满缓存后热点接口每次都重新序列化
+        """
+        if not volatile:
+            cached = self._bodies.get(key)
+            if cached is None:
+                cached = self._bodies[key] = CachedBody(render())
+            return cached
+
+        cached = self._volatile_bodies.get(key)
+        if cached is not None:
+            self._volatile_bodies.move_to_end(key)
+            return cached
+        cached = self._volatile_bodies[key] = CachedBody(render())
+        if len(self._volatile_bodies) > CATALOG_BODY_CACHE_MAX:
+            self._volatile_bodies.popitem(last=False)
+        return cached
+
+
+class CatalogCache:
+    """目录快照缓存
+
+    - 每次 invalidate() 递增版本号，旧快照随即失效
+    - 重建由一把锁串行化：并发的冷请求只会触发一次数据库查询，其余请求等待结果
+    - 快照超过 CATALOG_CACHE_TTL 秒也会重建（其他 worker 的写操作无法通知本进程）
+    """
+
+    def __init__(self, ttl: int = CATALOG_CACHE_TTL):
+        self.ttl = ttl
+        self._version = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = asyncio.Lock()
+        # invalidate_later() 安排的延迟失效
+        self._deferred: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def version(self) -> int:
+        """当前数据版本号"""
+        return self._version
+
+    def invalidate(self) -> int:
+        """使当前快照失效（管理后台写操作提交后调用），返回新的版本号"""
+        if self._deferred is not None:
+            self._deferred.cancel()
+            self._deferred = None
+        self._version += 1
+        logger.info(f"目录缓存已失效，新版本: {self._version}")
+        return self._version
+
+    def invalidate_later(self, delay: float):
+        """延迟失效：delay 秒内的多次调用合并为一次 invalidate()（后台批量任务使用）"""
+        if self._deferred is None:
+            self._deferred = asyncio.get_running_loop().call_later(delay, self.invalidate)
+
+    def flush(self):
+        """立即执行尚未到期的延迟失效（没有时不做任何事）"""
+        if self._deferred is not None:
+            self.invalidate()
+
+    def _is_fresh(self, snapshot: Optional[CatalogSnapshot]) -> bool:
+        if snapshot is None or snapshot.version != self._version:
+            return False
+        if self.ttl > 0 and time.monotonic() - snapshot.built_at > self.ttl:
+            return False
+        return True
+
+    async def get_snapshot(self) -> CatalogSnapshot:
+        """获取最新快照，必要时重建（同一时间只有一个重建在执行）"""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        async with self._lock:
+            # 等锁期间可能已被其他请求重建
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+
+            # TTL 过期但没有显式失效时，同样递增版本号，保证版本号与内容一一对应
+            if snapshot is not None and snapshot.version == self._version:
+                self._version += 1
+
+            snapshot = await self._build(self._version)
+            self._snapshot = snapshot
+            return snapshot
+
+    async def _build(self, version: int) -> CatalogSnapshot:
+        """从数据库加载快照"""
+        started = time.perf_counter()
+        async with async_session_maker() as session:
+            categories = (await session.execute(
+                select(Category)
+                .where(Category.is_active == True)
+                .order_by(Category.order, Category.name)
+            )).scalars().all()
+
+            slides = (await session.execute(
+                select(HeroSlide)
+                .where(HeroSlide.is_active == True)
+                .order_by(HeroSlide.order, HeroSlide.id)
+            )).scalars().all()
+
+            # 标签：启用的且至少关联了一个启用产品的标签（product_count 由管理后台维护）
+            tags = (await session.execute(
+                select(Tag)
+                .where(Tag.is_active == True, Tag.product_count > 0)
+                .order_by(Tag.order, Tag.name)
+            )).scalars().all()
+
+            products = (await session.execute(
+                select(Product)
+                .where(Product.is_active == True)
+                .options(selectinload(Product.category), selectinload(Product.tags))
+                .order_by(Product.id)
+            )).scalars().unique().all()
+
+            # 分类产品数量随快照一起计算，统计接口不再每次 GROUP BY
+            product_counts: Dict[Optional[int], Tuple[int, int]] = {}
+            count_rows = (await session.execute(
+                select(Product.category_id, Product.is_active, func.count(Product.id))
+                .group_by(Product.category_id, Product.is_active)
+            )).all()
+            for category_id, is_active, count in count_rows:
+                active, total = product_counts.get(category_id, (0, 0))
+                product_counts[category_id] = (active + (count if is_active else 0), total + count)
+
+            # 响应式图片：按原图 URL 附加 srcset 数据（没有衍生版本的图片不返回）
+            variants = {
+                v.source_url: v.srcset_data()
+                for v in (await session.execute(select(MediaVariant))).scalars().all()
+            }
+            for product in products:
+                product.image_srcsets = {
+                    url: variants[url] for url in product.images or [] if url in variants
+                } or None
+            for slide in slides:
+                slide.image_srcset = variants.get(slide.image)
+
+        elapsed = (time.perf_counter() - started) * 1000
+        logger.info(
+            f"目录快照已重建: version={version}, categories={len(categories)}, "
+            f"tags={len(tags)}, slides={len(slides)}, products={len(products)}, 耗时 {elapsed:.1f}ms"
+        )
+        return CatalogSnapshot(
+            version=version,
+            categories=list(categories),
+            tags=list(tags),
+            slides=list(slides),
+            products=list(products),
+            product_counts=product_counts,
+        )
+
+
+# 全局目录缓存实例
+catalog_cache = CatalogCache()
@@ -0,0 +1,167 @@
+"""产品分面筛选 - 基于位图的标签 / 分类 / 规格值过滤与计数
+
+每个快照构建一次 FacetIndex：产品按 ID 顺序编号，每个分面值对应一个 Python int 位图，
+多条件筛选就是位图的 AND / OR，计数用 bit_count()，不需要在 MySQL 中扫描 JSON。
+"""
+import logging
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from app.models.catalog import Product
+
+logger = logging.getLogger(__name__)
+
+# 规格值超过该长度的不作为分面（通常是描述性文本，而不是可选项）
+MAX_SPEC_VALUE_LENGTH = 50
+
+
+def normalize_spec_value(value) -> Optional[str]:
+    """将规格值规范为分面值，不适合作为分面的返回 None"""
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    text = str(value).strip()
+    if not text or len(text) > MAX_SPEC_VALUE_LENGTH:
+        return None
+    return text
+
+
+class FacetFilter:
+    """一次分面筛选条件
+
+    - tag_ids: 标签筛选，match_all 为 True 时要求包含全部标签，否则包含任一即可
+    - category_id: 分类筛选
+    - specs: 规格筛选 {key: {value, ...}}，同一 key 的多个值为 OR，不同 key 之间为 AND
+    """
+
+    def __init__(
+        self,
+        category_id: Optional[int] = None,
+        tag_ids: Optional[Set[int]] = None,
+        match_all: bool = True,
+        specs: Optional[Dict[str, Set[str]]] = None,
+    ):
+        self.category_id = category_id
+        self.tag_ids = tag_ids or set()
+        self.match_all = match_all
+        self.specs = specs or {}
+
+    @property
+    def is_empty(self) -> bool:
+        return self.category_id is None and not self.tag_ids and not self.specs
+
+    def cache_key(self) -> str:
+        """用于响应体缓存的稳定 key"""
+        specs = ";".join(
+            f"{key}={','.join(sorted(values))}" for key, values in sorted(self.specs.items())
+        )
+        return (
+            f"category={self.category_id or ''}"
+            f":tags={','.join(str(t) for t in sorted(self.tag_ids))}"
+            f":match={'all' if self.match_all else 'any'}:specs={specs}"
+        )
+
+
+class FacetIndex:
+    """某个快照的分面位图索引"""
+
+    def __init__(self, products: List[Product]):
+        started = time.perf_counter()
+        self.products = products
+        self.all_bits = (1 << len(products)) - 1
+        self.category_bits: Dict[int, int] = {}
+        self.tag_bits: Dict[int, int] = {}
+        self.spec_bits: Dict[str, Dict[str, int]] = {}
+
+        for position, product in enumerate(products):
+            bit = 1 << position
+            if product.category_id is not None:
+                self.category_bits[product.category_id] = self.category_bits.get(product.category_id, 0) | bit
+            for tag in product.tags:
+                self.tag_bits[tag.id] = self.tag_bits.get(tag.id, 0) | bit
+            for key, value in (product.specs or {}).items():
+                value = normalize_spec_value(value)
+                if value is None:
+                    continue
+                values = self.spec_bits.setdefault(key, {})
+                values[value] = values.get(value, 0) | bit
+
+        elapsed = (time.perf_counter() - started) * 1000
+        logger.info(
+            f"分面索引已构建: products={len(products)}, categories={len(self.category_bits)}, "
+            f"tags={len(self.tag_bits)}, spec_keys={len(self.spec_bits)}, 耗时 {elapsed:.1f}ms"
+        )
+
+    # ---------- 筛选 ----------
+    def _category_mask(self, facet_filter: FacetFilter) -> int:
+        if facet_filter.category_id is None:
+            return self.all_bits
+        return self.category_bits.get(facet_filter.category_id, 0)
+
+    def _tag_mask(self, facet_filter: FacetFilter) -> int:
+        if not facet_filter.tag_ids:
+            return self.all_bits
+        if facet_filter.match_all:
+            mask = self.all_bits
+            for tag_id in facet_filter.tag_ids:
+                mask &= self.tag_bits.get(tag_id, 0)
+            return mask
+        mask = 0
+        for tag_id in facet_filter.tag_ids:
+            mask |= self.tag_bits.get(tag_id, 0)
+        return mask
+
+    def _spec_mask(self, facet_filter: FacetFilter, exclude_key: Optional[str] = None) -> int:
+        mask = self.all_bits
+        for key, values in facet_filter.specs.items():
+            if key == exclude_key:
+                continue
+            key_bits = self.spec_bits.get(key, {})
+            any_value = 0
+            for value in values:
+                any_value |= key_bits.get(value, 0)
+            mask &= any_value
+        return mask
+
+    def match(self, facet_filter: FacetFilter) -> int:
+        """返回满足全部条件的产品位图"""
+        return self._category_mask(facet_filter) & self._tag_mask(facet_filter) & self._spec_mask(facet_filter)
+
+    def products_for(self, bits: int) -> List[Product]:
+        """按 ID 顺序取出位图中的产品"""
+        # 二进制字符串反转后，第 i 位即第 i 个产品，str.find 在 C 层扫描，比逐位移位快得多
+        flags = bin(bits)[:1:-1]
+        result = []
+        position = flags.find("1")
+        while position != -1:
+            result.append(self.products[position])
+            position = flags.find("1", position + 1)
+        return result
+
+    # ---------- 计数 ----------
+    def counts(self, facet_filter: FacetFilter) -> Tuple[int, Dict[int, int], Dict[int, int], Dict[str, Dict[str, int]]]:
+        """计算筛选结果总数及各分面值的数量
+
+        分类和规格采用“排除自身”的计数方式（选中一个值后其他值的数量不会变为 0）；
+        标签在“全部匹配”模式下按当前结果计数，表示再加上该标签后剩余的数量。
+        """
+        category_mask = self._category_mask(facet_filter)
+        tag_mask = self._tag_mask(facet_filter)
+        spec_mask = self._spec_mask(facet_filter)
+        total = (category_mask & tag_mask & spec_mask).bit_count()
+
+        base = tag_mask & spec_mask
+        category_counts = {
+            category_id: (bits & base).bit_count()
+            for category_id, bits in self.category_bits.items()
+        }
+
+        base = category_mask & spec_mask
+        if facet_filter.match_all:
+            base &= tag_mask
+        tag_counts = {tag_id: (bits & base).bit_count() for tag_id, bits in self.tag_bits.items()}
+
+        spec_counts: Dict[str, Dict[str, int]] = {}
+        for key, values in self.spec_bits.items():
+            base = category_mask & tag_mask & self._spec_mask(facet_filter, exclude_key=key)
+            spec_counts[key] = {value: (bits & base).bit_count() for value, bits in values.items()}
+
+        return total, category_counts, tag_counts, spec_counts
@@ -0,0 +1,87 @@
+"""目录统计维护 - 增量维护标签的启用产品数量
+
+管理后台写产品时在同一事务内调用，保证计数与产品数据一致；
+启动时调用 recount_tag_products() 做一次全量校正。
+"""
+import logging
+from typing import Dict, Set, Iterable, Optional
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.catalog import Product, Tag, product_tag_association
+
+logger = logging.getLogger(__name__)
+
+
+async def get_product_tag_ids(db: AsyncSession, product_id: int) -> Set[int]:
+    """查询产品当前关联的标签 ID"""
+    result = await db.execute(
+        select(product_tag_association.c.tag_id)
+        .where(product_tag_association.c.product_id == product_id)
+    )
+    return set(result.scalars().all())
+
+
+def tag_count_deltas(
+    old_active: bool,
+    old_tag_ids: Iterable[int],
+    new_active: bool,
+    new_tag_ids: Iterable[int],
+) -> Dict[int, int]:
+    """计算一次产品变更对各标签启用产品数量的影响（只返回非 0 的变化）"""
+    deltas: Dict[int, int] = {}
+    if old_active:
+        for tag_id in set(old_tag_ids):
+            deltas[tag_id] = deltas.get(tag_id, 0) - 1
+    if new_active:
+        for tag_id in set(new_tag_ids):
+            deltas[tag_id] = deltas.get(tag_id, 0) + 1
+    return {tag_id: delta for tag_id, delta in deltas.items() if delta != 0}
+
+
+async def apply_tag_count_deltas(db: AsyncSession, deltas: Dict[int, int]):
+    """在当前事务中原子地调整标签计数（按变化量分组，每组一条 UPDATE）"""
+    by_delta: Dict[int, list] = {}
+    for tag_id, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(tag_id)
+
+    for delta, tag_ids in by_delta.items():
+        await db.execute(
+            update(Tag)
+            .where(Tag.id.in_(tag_ids))
+            .values(product_count=Tag.product_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def record_product_change(
+    db: AsyncSession,
+    old_active: bool,
+    old_tag_ids: Iterable[int],
+    new_active: bool,
+    new_tag_ids: Iterable[int],
+    product_id: Optional[int] = None,
+):
+    """产品新增、修改、删除或启用状态切换后调用，维护标签计数"""
+    deltas = tag_count_deltas(old_active, old_tag_ids, new_active, new_tag_ids)
+    if deltas:
+        await apply_tag_count_deltas(db, deltas)
+        logger.info(f"标签计数已更新: product_id={product_id}, deltas={deltas}")
+
+
+async def recount_tag_products(db: AsyncSession):
+    """全量重算所有标签的启用产品数量（一条 UPDATE，用于启动校正）"""
+    active_count = (
+        select(func.count())
+        .select_from(product_tag_association)
+        .join(Product, product_tag_association.c.product_id == Product.id)
+        .where(
+            product_tag_association.c.tag_id == Tag.id,
+            Product.is_active == True
+        )
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(Tag)
+        .values(product_count=active_count)
+        .execution_options(synchronize_session=False)
+    )
@@ -24,3 +24,58 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production"
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "SCAVI")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "SCAVI123")
 
+
+# 目录缓存配置
+# 快照最长存活时间（秒），多 worker 部署时作为跨进程失效的兜底
+CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", "300"))
+# 每个快照最多缓存多少个由请求参数决定的预序列化响应体（搜索词、游标、筛选、字段组合各占一个，超出时淘汰最久未用的）
+CATALOG_BODY_CACHE_MAX = int(os.getenv("CATALOG_BODY_CACHE_MAX", "2048"))
+# 预序列化响应体超过该大小（字节）时额外保存一份 gzip 压缩版本
+HTTP_GZIP_MIN_SIZE = int(os.getenv("HTTP_GZIP_MIN_SIZE", "1024"))
+
+# 数据库迁移配置
+# 启动时表结构版本落后是否自动执行迁移（关闭后需手动运行 python migrate_database.py）
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() == "true"
+
+# 文件上传配置
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # 每次读取 1MB
+UPLOAD_MAX_IMAGE_SIZE = int(os.getenv("UPLOAD_MAX_IMAGE_SIZE", str(20 * 1024 * 1024)))  # 图片最大 20MB
+UPLOAD_MAX_VIDEO_SIZE = int(os.getenv("UPLOAD_MAX_VIDEO_SIZE", str(100 * 1024 * 1024)))  # 视频最大 100MB
+# 本地存储文件操作线程数
+LOCAL_STORAGE_WORKERS = int(os.getenv("LOCAL_STORAGE_WORKERS", "4"))
+
+# 响应式图片配置
+# 上传后生成的衍生宽度（像素，逗号分隔；大于原图宽度的跳过）
+IMAGE_VARIANT_WIDTHS = [int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1280").split(",") if w.strip()]
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))  # WebP / JPEG 质量
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", "2"))  # 图片处理进程数
+# 批量生成时，目录快照最多每隔多少秒重建一次（一批全部生成完时立即重建）
+IMAGE_VARIANT_INVALIDATE_DELAY = float(os.getenv("IMAGE_VARIANT_INVALIDATE_DELAY", "5"))
+
+# 媒体清理配置
+# 后台清理任务的执行间隔（秒，0 表示关闭）
+MEDIA_SWEEP_INTERVAL = int(os.getenv("MEDIA_SWEEP_INTERVAL", "3600"))
+# 未被引用的临时文件和媒体文件保留时长（秒），超过后才会删除
+MEDIA_ORPHAN_TTL = int(os.getenv("MEDIA_ORPHAN_TTL", str(24 * 3600)))
+
+# OSS 文件代理配置
+PROXY_MAX_CONNECTIONS = int(os.getenv("PROXY_MAX_CONNECTIONS", "100"))  # 到存储桶的最大连接数
+PROXY_MAX_KEEPALIVE = int(os.getenv("PROXY_MAX_KEEPALIVE", "20"))  # 保持空闲的连接数
+PROXY_KEEPALIVE_EXPIRY = float(os.getenv("PROXY_KEEPALIVE_EXPIRY", "30"))  # 空闲连接保留时长（秒）
+PROXY_TIMEOUT = float(os.getenv("PROXY_TIMEOUT", "30"))  # 读写超时（秒）
+PROXY_CONNECT_TIMEOUT = float(os.getenv("PROXY_CONNECT_TIMEOUT", "5"))  # 建立连接超时（秒）
+PROXY_CHUNK_SIZE = int(os.getenv("PROXY_CHUNK_SIZE", str(64 * 1024)))  # 转发文件时每次读取的字节数
+# 是否启用 HTTP/2（需要安装 httpx[http2]）
+PROXY_HTTP2 = os.getenv("PROXY_HTTP2", "false").lower() == "true"
+# 代理磁盘缓存（static/.proxy-cache）：总大小上限（字节，0 表示关闭）
+PROXY_CACHE_MAX_BYTES = int(os.getenv("PROXY_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# 单个文件超过该大小（字节）时不缓存，避免大视频挤掉图片
+PROXY_CACHE_MAX_OBJECT_SIZE = int(os.getenv("PROXY_CACHE_MAX_OBJECT_SIZE", str(32 * 1024 * 1024)))
+# 缓存项超过该时长（秒）后，使用前向存储桶确认是否变化
+PROXY_CACHE_REVALIDATE = int(os.getenv("PROXY_CACHE_REVALIDATE", "300"))
+# 代理按需图片缩放（?w=&h=&q=&format=）：处理进程数（0 表示关闭，始终返回原图）
+PROXY_TRANSFORM_WORKERS = int(os.getenv("PROXY_TRANSFORM_WORKERS", "2"))
+# 排队 + 处理中的缩放请求上限，超过时直接返回原图
+PROXY_TRANSFORM_MAX_PENDING = int(os.getenv("PROXY_TRANSFORM_MAX_PENDING", "32"))
+PROXY_TRANSFORM_MAX_DIMENSION = int(os.getenv("PROXY_TRANSFORM_MAX_DIMENSION", "4096"))  # w / h 最大值（像素）
+PROXY_TRANSFORM_QUALITY = int(os.getenv("PROXY_TRANSFORM_QUALITY", "80"))  # 未指定 q 时的质量
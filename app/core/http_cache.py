@@ -0,0 +1,70 @@
+"""HTTP 缓存工具 - 预序列化响应体、ETag 与 304 协商"""
+import gzip
+import hashlib
+from typing import Optional, Dict
+from fastapi import Request
+from fastapi.responses import Response
+from app.core.config import HTTP_GZIP_MIN_SIZE
+
+# 公开数据允许 CDN / nginx 缓存，但每次使用前都需要用 ETag 重新验证
+CACHE_CONTROL = "public, no-cache"
+
+
+class CachedBody:
+    """已经序列化好的响应体（含可选的 gzip 版本和强 ETag）"""
+
+    def __init__(self, content: bytes, media_type: str = "application/json"):
+        self.content = content
+        self.media_type = media_type
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        # 压缩版本是另一种表示，强 ETag 需要与原文区分
+        self.gzip_etag = f'"{digest}-gzip"'
+        self.gzip_content: Optional[bytes] = None
+        if len(content) >= HTTP_GZIP_MIN_SIZE:
+            self.gzip_content = gzip.compress(content, compresslevel=6)
+
+
+def etag_matches(if_none_match: Optional[str], body: CachedBody) -> bool:
+    """判断 If-None-Match 是否命中（弱比较，兼容 nginx 改写后的 W/ 前缀）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in (body.etag, body.gzip_etag):
+            return True
+    return False
+
+
+def accepts_gzip(request: Request) -> bool:
+    """客户端是否接受 gzip 编码"""
+    accept_encoding = request.headers.get("accept-encoding", "")
+    return "gzip" in accept_encoding.lower()
+
+
+def cached_response(
+    request: Request,
+    body: CachedBody,
+    extra_headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """根据请求头返回 304 或预序列化的响应体（不做任何序列化工作）"""
+    use_gzip = body.gzip_content is not None and accepts_gzip(request)
+    headers = {
+        "ETag": body.gzip_etag if use_gzip else body.etag,
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if extra_headers:
+        headers.update(extra_headers)
+
+    if etag_matches(request.headers.get("if-none-match"), body):
+        return Response(status_code=304, headers=headers)
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=body.gzip_content, media_type=body.media_type, headers=headers)
+    return Response(content=body.content, media_type=body.media_type, headers=headers)
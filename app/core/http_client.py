@@ -0,0 +1,85 @@
+"""共享 HTTP 客户端 - OSS 文件代理访问存储桶使用
+
+应用启动时创建一个长期存在的 httpx.AsyncClient，所有代理请求复用其连接池（keep-alive），
+避免每个请求重新建立 TCP / TLS 连接；关闭应用时释放连接。
+"""
+import logging
+from typing import Optional, Dict, Any
+import httpx
+from app.core.config import (
+    PROXY_MAX_CONNECTIONS,
+    PROXY_MAX_KEEPALIVE,
+    PROXY_KEEPALIVE_EXPIRY,
+    PROXY_TIMEOUT,
+    PROXY_CONNECT_TIMEOUT,
+    PROXY_HTTP2,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SharedHTTPClient:
+    """长期复用的 httpx.AsyncClient（start 之前首次使用时也会自动创建）"""
+
+    def __init__(
+        self,
+        max_connections: int = PROXY_MAX_CONNECTIONS,
+        max_keepalive: int = PROXY_MAX_KEEPALIVE,
+        keepalive_expiry: float = PROXY_KEEPALIVE_EXPIRY,
+        timeout: float = PROXY_TIMEOUT,
+        connect_timeout: float = PROXY_CONNECT_TIMEOUT,
+        http2: bool = PROXY_HTTP2,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def start(self):
+        """创建客户端（重复调用无副作用）"""
+        if self._client is not None:
+            return
+        if self.http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("未安装 h2 库，代理使用 HTTP/1.1（启用 HTTP/2 请运行: pip install httpx[http2]）")
+                self.http2 = False
+        self._client = httpx.AsyncClient(
+            limits=self.limits,
+            timeout=self.timeout,
+            http2=self.http2,
+            follow_redirects=True,
+        )
+        logger.info(
+            f"🌐 代理 HTTP 客户端已创建: 最大连接 {self.limits.max_connections}, "
+            f"keep-alive {self.limits.max_keepalive_connections}, HTTP/2 {'开启' if self.http2 else '关闭'}"
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self.start()
+        return self._client
+
+    async def close(self):
+        if self._client is None:
+            return
+        await self._client.aclose()
+        self._client = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "started": self._client is not None,
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+        }
+
+
+# 全局代理客户端实例
+proxy_http_client = SharedHTTPClient()
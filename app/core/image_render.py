@@ -0,0 +1,93 @@
+"""图片衍生尺寸渲染和按需缩放 - 在独立进程中执行
+
+本模块只依赖 Pillow，不导入应用的其他模块，便于进程池（spawn）中快速加载。
+"""
+import os
+from typing import Dict, List, Optional
+
+# 输出格式 -> Pillow 格式名
+PIL_FORMATS = {"webp": "WEBP", "avif": "AVIF", "jpeg": "JPEG", "png": "PNG"}
+
+
+def _open_image(source_path: str):
+    """打开图片并按 EXIF 方向旋转（手机照片），返回 (image, 是否有透明通道)，image 已转为 RGB / RGBA"""
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as opened:
+        image = ImageOps.exif_transpose(opened)
+        image.load()
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    return image.convert("RGBA" if has_alpha else "RGB"), has_alpha
+
+
+def _flatten(image):
+    """JPEG 不支持透明，铺白底"""
+    from PIL import Image
+
+    background = Image.new("RGB", image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def render_variants(source_path: str, output_dir: str, basename: str, widths: List[int], quality: int) -> Dict:
+    """按指定宽度生成 WebP 和 JPEG 版本
+
+    只生成小于原图宽度的尺寸；原图比所有宽度都小时按原图宽度生成一份。
+
+    Returns:
+        {"width": 原图宽, "height": 原图高, "files": [{"width", "format", "path"}, ...]}
+    """
+    from PIL import Image
+
+    image, has_alpha = _open_image(source_path)
+    width, height = image.size
+    targets = sorted({w for w in widths if 0 < w < width}) or [width]
+
+    files = []
+    for target in targets:
+        target_height = max(1, round(height * target / width))
+        resized = image if target == width else image.resize((target, target_height), Image.LANCZOS)
+
+        webp_path = os.path.join(output_dir, f"{basename}_w{target}.webp")
+        resized.save(webp_path, "WEBP", quality=quality, method=4)
+        files.append({"width": target, "format": "webp", "path": webp_path})
+
+        jpeg_source = _flatten(resized) if has_alpha else resized
+        jpeg_path = os.path.join(output_dir, f"{basename}_w{target}.jpg")
+        jpeg_source.save(jpeg_path, "JPEG", quality=quality, optimize=True, progressive=True)
+        files.append({"width": target, "format": "jpeg", "path": jpeg_path})
+
+    return {"width": width, "height": height, "files": files}
+
+
+def render_transform(
+    source_path: str, output_path: str, width: Optional[int], height: Optional[int], quality: int, fmt: str
+) -> Dict:
+    """等比缩小到不超过 width × height（不放大），并转换为指定格式
+
+    Returns:
+        {"width": 输出宽, "height": 输出高}
+    """
+    from PIL import Image
+
+    image, has_alpha = _open_image(source_path)
+    source_width, source_height = image.size
+    scale = min(
+        width / source_width if width else 1,
+        height / source_height if height else 1,
+        1,
+    )
+    if scale < 1:
+        size = (max(1, round(source_width * scale)), max(1, round(source_height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+
+    if fmt == "jpeg":
+        image = _flatten(image) if has_alpha else image
+        image.save(output_path, "JPEG", quality=quality, optimize=True, progressive=True)
+    elif fmt == "png":
+        image.save(output_path, "PNG", optimize=True)
+    elif fmt == "webp":
+        image.save(output_path, "WEBP", quality=quality, method=4)
+    else:
+        image.save(output_path, PIL_FORMATS[fmt], quality=quality)
+    return {"width": image.width, "height": image.height}
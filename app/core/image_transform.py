@@ -0,0 +1,105 @@
+"""按需图片缩放 - OSS 代理根据 w / h / q / format 参数返回缩小或转换格式后的图片
+
+- 图片处理在独立的进程池中执行，同时处理的数量不超过进程数，排队过多时调用方返回原图
+- format=auto 时按请求的 Accept 头选择 AVIF / WebP，否则保持原图格式
+- 未安装 Pillow 时整体跳过，代理始终返回原图
+"""
+import asyncio
+import importlib.util
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any
+from app.core.config import PROXY_TRANSFORM_WORKERS, PROXY_TRANSFORM_MAX_PENDING
+from app.core.image_render import render_transform
+
+logger = logging.getLogger(__name__)
+
+# 可以处理的原图类型 -> 原图格式（GIF 可能是动图，保持原样）
+TRANSFORM_SOURCE_TYPES = {"image/jpeg": "jpeg", "image/png": "png", "image/webp": "webp"}
+# 输出格式 -> (Content-Type, 扩展名)
+TRANSFORM_FORMATS = {
+    "avif": ("image/avif", ".avif"),
+    "webp": ("image/webp", ".webp"),
+    "jpeg": ("image/jpeg", ".jpg"),
+    "png": ("image/png", ".png"),
+}
+# format=auto 时按优先顺序尝试的格式
+NEGOTIATED_FORMATS = ("avif", "webp")
+
+
+class ImageTransformer:
+    """代理图片缩放（进程池执行，事件循环中只做调度）"""
+
+    def __init__(self, workers: int = PROXY_TRANSFORM_WORKERS, max_pending: int = PROXY_TRANSFORM_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.enabled = workers > 0 and importlib.util.find_spec("PIL") is not None
+        self.formats = set()
+        if self.enabled:
+            from PIL import features
+            # AVIF / WebP 取决于 Pillow 编译时包含的编码器
+            self.formats = {"jpeg", "png"} | {fmt for fmt in NEGOTIATED_FORMATS if features.check(fmt)}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots = asyncio.Semaphore(max(workers, 1))
+        self._pending = 0
+        self.stats = dict.fromkeys(("transformed", "rejected", "failed"), 0)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn：子进程不继承事件循环和线程池的状态
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def negotiate(self, requested: Optional[str], accept: str, source_type: str) -> str:
+        """确定输出格式：指定了格式时使用指定的，auto 时按 Accept 头选择，否则保持原图格式"""
+        if requested and requested != "auto":
+            return requested
+        if requested == "auto":
+            for fmt in NEGOTIATED_FORMATS:
+                if fmt in self.formats and f"image/{fmt}" in accept:
+                    return fmt
+        return TRANSFORM_SOURCE_TYPES[source_type]
+
+    async def transform(
+        self, source_path: str, output_path: str, width: Optional[int], height: Optional[int], quality: int, fmt: str
+    ) -> Optional[Dict[str, Any]]:
+        """生成缩放后的图片
+
+        Returns:
+            {"width", "height"}；排队的处理过多时返回 None（调用方返回原图）
+        """
+        if self._pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            logger.warning(f"图片缩放排队过多（{self._pending}），返回原图")
+            return None
+        self._pending += 1
+        try:
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    self._get_pool(), render_transform, source_path, output_path, width, height, quality, fmt
+                )
+            self.stats["transformed"] += 1
+            return result
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self._pending -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "workers": self.workers,
+            "formats": sorted(self.formats),
+            "pending": self._pending,
+            **self.stats,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
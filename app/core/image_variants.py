@@ -0,0 +1,192 @@
+"""响应式图片 - 上传后在进程池中生成多种宽度的 WebP / JPEG 版本
+
+- 生成结果按原图 URL 记录在 media_variants 表，目录快照构建时附加到产品和轮播图上，
+  接口以 srcset 字符串返回（image_srcsets / image_srcset）
+- 衍生文件与原图放在同一位置（原图在 OSS 则上传到 OSS，否则保存在本地 /uploads）
+- 上传时立即生成；产品和轮播图保存时为缺少衍生版本的图片（旧数据、直传文件）补生成
+- 未安装 Pillow 时整体跳过，接口不返回 srcset 数据
+"""
+import asyncio
+import importlib.util
+import logging
+import multiprocessing
+import shutil
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional, Set
+from urllib.parse import urlparse
+from sqlalchemy import select
+from app.core.config import (
+    IMAGE_VARIANT_WIDTHS,
+    IMAGE_VARIANT_QUALITY,
+    IMAGE_VARIANT_WORKERS,
+    IMAGE_VARIANT_INVALIDATE_DELAY,
+)
+from app.core.database import async_session_maker
+from app.core.catalog_cache import catalog_cache
+from app.core.image_render import render_variants
+from app.core.media_store import MediaStore
+from app.core.uploads import ReceivedUpload, file_sha256
+from app.models.media import MediaVariant
+
+logger = logging.getLogger(__name__)
+
+# 可以生成衍生版本的原图格式（GIF 可能是动图，保持原样）
+VARIANT_SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+VARIANT_SOURCE_TYPES = {"image/jpeg", "image/png", "image/webp"}
+
+VARIANT_CONTENT_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+def is_variant_source(url: str) -> bool:
+    return Path(urlparse(url).path).suffix.lower() in VARIANT_SOURCE_EXTENSIONS
+
+
+class ImageVariantService:
+    """图片衍生版本生成（进程池执行图片处理，事件循环中只做调度和存储）"""
+
+    def __init__(self, media_store: MediaStore, work_dir: Path):
+        self.media_store = media_store
+        self.work_dir = work_dir
+        self.enabled = importlib.util.find_spec("PIL") is not None
+        if not self.enabled:
+            logger.warning("未安装 Pillow，跳过响应式图片生成（pip install Pillow）")
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # 正在生成的原图 URL，避免重复调度
+        self._pending: Set[str] = set()
+        # 持有后台任务的引用，防止被垃圾回收
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn：子进程不继承事件循环和线程池的状态
+            self._pool = ProcessPoolExecutor(
+                max_workers=IMAGE_VARIANT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    # ==================== 调度 ====================
+    def schedule_upload(self, file_url: str, upload: ReceivedUpload):
+        """上传完成后调度生成（接管仍在临时目录的上传文件，省去重新读取原图）"""
+        if not self.enabled or upload.content_type not in VARIANT_SOURCE_TYPES:
+            return
+        source_path = None
+        if upload.path.exists():
+            # 上传到 OSS 时临时文件还在，移动到工作目录（同目录重命名），之后由生成任务删除
+            self.work_dir.mkdir(parents=True, exist_ok=True)
+            source_path = self.work_dir / f"source-{uuid.uuid4().hex}"
+            upload.path.rename(source_path)
+        self.schedule(file_url, source_path, owned=source_path is not None)
+
+    def schedule(self, source_url: str, source_path: Optional[Path] = None, owned: bool = False):
+        """后台生成 source_url 的衍生版本
+
+        Args:
+            source_path: 原图本地文件（为空时按 URL 读取本地文件或从 OSS 下载）
+            owned: 生成结束后是否删除 source_path
+        """
+        if not self.enabled or not is_variant_source(source_url) or source_url in self._pending:
+            if owned and source_path:
+                source_path.unlink(missing_ok=True)
+            return
+        self._pending.add(source_url)
+        task = asyncio.create_task(self._generate(source_url, source_path, owned))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def schedule_missing(self, urls: Iterable[Optional[str]]):
+        """为还没有衍生版本的图片补生成（产品 / 轮播图保存后调用）"""
+        if not self.enabled:
+            return
+        candidates = {url for url in urls if url and is_variant_source(url) and url not in self._pending}
+        if not candidates:
+            return
+        async with async_session_maker() as session:
+            existing = set((await session.execute(
+                select(MediaVariant.source_url).where(MediaVariant.source_url.in_(candidates))
+            )).scalars().all())
+        for url in candidates - existing:
+            self.schedule(url)
+
+    # ==================== 生成 ====================
+    async def _generate(self, source_url: str, source_path: Optional[Path], owned: bool):
+        work = self.work_dir / f"variants-{uuid.uuid4().hex}"
+        try:
+            async with async_session_maker() as session:
+                if await session.get(MediaVariant, source_url):
+                    return
+
+            work.mkdir(parents=True, exist_ok=True)
+            if source_path is None:
+                source_path = await self._fetch_source(source_url, work)
+                if source_path is None:
+                    return
+
+            # 衍生文件按原图内容哈希命名，放在原图所在的 media/ 目录下
+            parsed = self.media_store.parse_url(source_url)
+            sha256 = parsed[0] if parsed else await asyncio.to_thread(file_sha256, source_path)
+
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._get_pool(), render_variants,
+                str(source_path), str(work), sha256, IMAGE_VARIANT_WIDTHS, IMAGE_VARIANT_QUALITY,
+            )
+
+            remote = source_url.startswith(("http://", "https://"))
+            entries = {fmt: [] for fmt in VARIANT_CONTENT_TYPES}
+            for item in result["files"]:
+                path = Path(item["path"])
+                url = await self.media_store.store_derivative(
+                    path, sha256, path.name, VARIANT_CONTENT_TYPES[item["format"]], remote
+                )
+                entries[item["format"]].append(f"{url} {item['width']}w")
+
+            async with async_session_maker() as session:
+                await session.merge(MediaVariant(
+                    source_url=source_url,
+                    width=result["width"],
+                    height=result["height"],
+                    srcset={fmt: ", ".join(items) for fmt, items in entries.items()},
+                    created_at=datetime.now(timezone.utc).isoformat(),
+                ))
+                await session.commit()
+            # 批量上传时合并失效，避免每张图片都重建一次快照和搜索 / 分面索引
+            catalog_cache.invalidate_later(IMAGE_VARIANT_INVALIDATE_DELAY)
+            logger.info(f"✅ 已生成响应式图片: {source_url}（{len(result['files'])} 个文件）")
+        except Exception as e:
+            logger.error(f"生成响应式图片失败: {source_url}: {str(e)}")
+            logger.error(traceback.format_exc())
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+            if owned and source_path:
+                source_path.unlink(missing_ok=True)
+            self._pending.discard(source_url)
+            if not self._pending:
+                # 这一批都已生成完，新的 srcset 立即生效
+                catalog_cache.flush()
+
+    async def _fetch_source(self, source_url: str, work: Path) -> Optional[Path]:
+        """取得原图的本地文件：本地存储直接使用，OSS 下载到工作目录"""
+        located = self.media_store.locate(source_url)
+        if located is None:
+            logger.warning(f"无法读取原图，跳过生成: {source_url}")
+            return None
+        backend, key = located
+        if backend is self.media_store.local:
+            path = backend.path_for(key)
+            if path.exists():
+                return path
+        else:
+            path = work / "source"
+            if await backend.download(key, path):
+                return path
+        logger.warning(f"原图不存在，跳过生成: {source_url}")
+        return None
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
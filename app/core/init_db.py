@@ -57,3 +57,17 @@ async def init_default_admin():
             await session.rollback()
             # 不抛出异常，避免影响应用启动
 
+
+
+async def init_tag_product_counts():
+    """全量校正标签的启用产品数量（product_count 列由迁移 2 添加）"""
+    from app.core.catalog_stats import recount_tag_products
+    
+    try:
+        async with async_session_maker() as session:
+            await recount_tag_products(session)
+            await session.commit()
+        logger.info("标签启用产品数量已校正")
+    except Exception as e:
+        print(f"❌ 校正标签产品数量失败: {str(e)}")
+        logger.error(f"校正标签产品数量失败: {str(e)}", exc_info=True)
@@ -0,0 +1,152 @@
+"""内容寻址媒体存储 - 按内容的 SHA-256 命名，相同文件只保存一份
+
+文件路径为 media/<哈希前两位>/<哈希><扩展名>：
+- 本地存储：static/uploads/media/ab/abcd....jpg，URL 为 /uploads/media/ab/abcd....jpg
+- OSS：{OSS_PREFIX}/media/ab/abcd....jpg
+
+同一内容的 URL 永远不变，重复上传时直接返回已有文件，不再保存新副本。
+"""
+import logging
+import re
+from pathlib import Path
+from typing import Optional, List, Tuple
+from urllib.parse import urlparse
+from app.core.oss_service import oss_service
+from app.core.storage import StorageBackend, LocalStorageBackend
+from app.core.uploads import ReceivedUpload
+
+logger = logging.getLogger(__name__)
+
+MEDIA_DIR = "media"
+
+# 按 MIME 类型确定扩展名（不使用原始文件名，保证同一内容只有一个 key）
+MEDIA_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "video/mp4": ".mp4",
+    "video/webm": ".webm",
+    "video/quicktime": ".mov",
+    "video/x-msvideo": ".avi",
+    "video/ogg": ".ogv",
+}
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+# URL 路径中的内容寻址文件：.../media/ab/<哈希><扩展名>
+_MEDIA_PATH_RE = re.compile(rf"/{MEDIA_DIR}/[0-9a-f]{{2}}/([0-9a-f]{{64}})(\.[a-z0-9]+)$")
+
+
+def is_valid_sha256(value: str) -> bool:
+    return bool(_SHA256_RE.match(value or ""))
+
+
+def media_relative_path(sha256: str, content_type: str) -> str:
+    """media/ab/abcd....jpg"""
+    return f"{MEDIA_DIR}/{sha256[:2]}/{sha256}{MEDIA_EXTENSIONS.get(content_type, '')}"
+
+
+class MediaStore:
+    """内容寻址媒体存储（优先 OSS，未启用或失败时使用本地目录）"""
+
+    def __init__(self, upload_dir: Path):
+        self.upload_dir = upload_dir
+        self.local = LocalStorageBackend(upload_dir, "/uploads")
+
+    def backends(self) -> List[StorageBackend]:
+        """按优先级排列的可用后端"""
+        return [oss_service.backend, self.local] if oss_service.enabled else [self.local]
+
+    def key_for(self, backend: StorageBackend, relative: str) -> str:
+        """相对路径在后端中的对象键（OSS 中位于 OSS_PREFIX 下）"""
+        return relative if backend is self.local else f"{oss_service.prefix}/{relative}"
+
+    def object_key(self, sha256: str, content_type: str) -> str:
+        """OSS 中的对象键"""
+        return f"{oss_service.prefix}/{media_relative_path(sha256, content_type)}"
+
+    async def find(self, sha256: str, content_type: str) -> Optional[str]:
+        """查找已保存的相同内容，返回 URL（不存在返回 None）
+
+        命中时刷新文件的修改时间：清理任务只删除超过保留期且未被引用的文件，
+        刚被重新使用、还没保存到产品中的旧文件不会被误删。
+        """
+        relative = media_relative_path(sha256, content_type)
+        for backend in self.backends():
+            key = self.key_for(backend, relative)
+            if await backend.head(key):
+                await backend.touch(key, content_type)
+                return backend.url_for(key)
+        return None
+
+    async def store(self, upload: ReceivedUpload) -> Tuple[str, bool]:
+        """保存已接收的上传，返回 (URL, 是否与已有文件重复)
+
+        调用方负责在之后调用 upload.discard() 清理临时文件。
+        """
+        existing = await self.find(upload.sha256, upload.content_type)
+        if existing:
+            logger.info(f"♻️  相同内容已存在，跳过保存: {existing}")
+            return existing, True
+
+        relative = media_relative_path(upload.sha256, upload.content_type)
+        return await self._put(upload.path, relative, upload.content_type), False
+
+    async def adopt(self, backend: StorageBackend, temp_key: str, sha256: str, content_type: str) -> Tuple[str, bool]:
+        """将直传到 temp/ 的对象转为内容寻址文件，返回 (URL, 是否与已有文件重复)
+
+        sha256 必须是存储服务校验过的值（head 返回的 sha256），不使用客户端提供的值；
+        对象在后端内复制到 media/ 位置后删除临时对象。复制失败时抛出异常，临时对象保留。
+        """
+        existing = await self.find(sha256, content_type)
+        if existing:
+            logger.info(f"♻️  相同内容已存在，删除直传的临时文件: {existing}")
+            await backend.delete(temp_key)
+            return existing, True
+
+        target_key = self.key_for(backend, media_relative_path(sha256, content_type))
+        await backend.copy(temp_key, target_key)
+        await backend.delete(temp_key)
+        file_url = backend.url_for(target_key)
+        logger.info(f"✅ 直传文件已保存到 {backend.name}: {file_url}")
+        return file_url, False
+
+    async def _put(self, path: Path, relative: str, content_type: str, remote: bool = True) -> str:
+        """依次尝试各后端保存文件（大文件上传 OSS 时自动分片），全部失败时抛出 RuntimeError"""
+        for backend in (self.backends() if remote else [self.local]):
+            # 本地后端直接移动文件（同一文件系统内为原子重命名）
+            file_url = await backend.put_file(self.key_for(backend, relative), path, content_type, move=True)
+            if file_url:
+                logger.info(f"✅ 文件已保存到 {backend.name}: {file_url}")
+                return file_url
+            if backend is not self.local:
+                logger.warning(f"{backend.name} 保存失败，回退到本地存储")
+        raise RuntimeError(f"文件保存失败: {relative}")
+
+    def locate(self, url: str) -> Optional[Tuple[StorageBackend, str]]:
+        """URL 对应的 (后端, 对象键)，不属于任何可用后端时返回 None"""
+        for backend in self.backends():
+            key = backend.key_for_url(url)
+            if key:
+                return backend, key
+        return None
+
+    def parse_url(self, url: str) -> Optional[Tuple[str, str]]:
+        """解析内容寻址 URL，返回 (哈希, 扩展名)；不是内容寻址文件时返回 None"""
+        match = _MEDIA_PATH_RE.search(urlparse(url).path)
+        if not match:
+            return None
+        return match.group(1), match.group(2)
+
+    def local_file_for_url(self, url: str) -> Optional[Path]:
+        """本地存储的 URL 对应的文件路径（不是本地文件时返回 None）"""
+        key = self.local.key_for_url(url)
+        return self.local.path_for(key) if key else None
+
+    async def store_derivative(self, path: Path, sha256: str, name: str, content_type: str, remote: bool) -> str:
+        """保存由原图生成的衍生文件（与原图放在同一目录），返回 URL
+
+        Args:
+            remote: 是否保存到 OSS（原图在 OSS 时为 True）
+        """
+        return await self._put(path, f"{MEDIA_DIR}/{sha256[:2]}/{name}", content_type, remote)
@@ -0,0 +1,304 @@
+"""媒体清理 - 定期删除未被引用的临时文件和媒体文件
+
+清理范围：
+- 临时文件：本地 static/uploads/temp/ 和 OSS temp/（上传后没有转为正式文件的）
+- 媒体文件：本地 static/uploads/media/ 和 OSS {OSS_PREFIX}/media/（删除产品、轮播图或替换图片后遗留的），
+  包括响应式图片衍生文件及其 media_variants 记录
+- 接收上传用的临时目录 static/.incoming/ 中的残留文件
+
+只删除修改时间超过 MEDIA_ORPHAN_TTL 且没有被 products.images、products.video、hero_slides.image 引用的文件。
+OSS 按页列举、按页批量删除，单次清理的内存占用和请求数只与孤儿文件数量有关；
+引用只在开始时完整读取一次，每页删除前只复查清理开始后保存的产品和引用了本页候选文件的轮播图。
+按日期组织的旧版正式文件（{OSS_PREFIX}/2024/...）不在清理范围内。
+"""
+import asyncio
+import logging
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from sqlalchemy import select, delete, or_
+from app.core.config import MEDIA_SWEEP_INTERVAL, MEDIA_ORPHAN_TTL
+from app.core.database import async_session_maker
+from app.core.media_store import MediaStore, MEDIA_DIR
+from app.core.storage import StorageBackend
+from app.models.catalog import Product
+from app.models.content import HeroSlide
+from app.models.media import MediaVariant
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，不做跨进程互斥
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+TEMP_DIR = "temp"
+LOCK_FILENAME = ".sweep.lock"
+# 启动后首次清理前的等待时间（秒），避免与启动时的迁移和预热争抢资源
+STARTUP_DELAY = 60
+# 复查轮播图引用时每条查询包含的候选数（避免 OR 条件过长）
+RECHECK_BATCH_SIZE = 100
+
+
+class MediaReferences:
+    """当前被引用的媒体：各后端中的对象键，以及内容寻址文件的哈希（用于保留衍生文件）"""
+
+    def __init__(self):
+        self.keys: Dict[str, Set[str]] = {}
+        self.hashes: Set[str] = set()
+        # 原图已不再被引用、且超过保留期的 media_variants 记录
+        self.stale_variants: List[str] = []
+
+    def add(self, backend: StorageBackend, key: str):
+        self.keys.setdefault(backend.name, set()).add(key)
+
+    def is_referenced(self, backend: StorageBackend, key: str, in_media: bool) -> bool:
+        if key in self.keys.get(backend.name, ()):
+            return True
+        return in_media and Path(key).name[:64] in self.hashes
+
+
+class MediaSweeper:
+    """后台媒体清理任务
+
+    - 每 MEDIA_SWEEP_INTERVAL 秒执行一次；多个 worker 进程通过文件锁保证同一时间只有一个在清理
+    - 每页删除前复查清理开始后新增的引用，缩小清理过程中新保存的产品引用到旧文件的窗口
+    """
+
+    def __init__(self, media_store: MediaStore, incoming_dir: Path, interval: int = MEDIA_SWEEP_INTERVAL, ttl: int = MEDIA_ORPHAN_TTL):
+        self.media_store = media_store
+        self.incoming_dir = incoming_dir
+        self.interval = interval
+        self.ttl = ttl
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.last_result: Optional[Dict] = None
+
+    # ==================== 调度 ====================
+    def start(self):
+        """启动后台清理任务（interval 为 0 时不启动）"""
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"🧹 媒体清理任务已启动: 间隔 {self.interval}s, 保留期 {self.ttl}s")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        await asyncio.sleep(STARTUP_DELAY)
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"媒体清理失败: {str(e)}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    # ==================== 清理 ====================
+    async def sweep(self, dry_run: bool = False) -> Dict:
+        """执行一次清理，返回统计结果
+
+        Args:
+            dry_run: 只统计将被删除的文件，不实际删除
+        """
+        async with self._lock:
+            lock_file = self._acquire_process_lock()
+            if lock_file is False:
+                logger.info("其他进程正在清理媒体，跳过本次清理")
+                return {"skipped": True}
+            try:
+                return await self._sweep(dry_run)
+            finally:
+                if lock_file:
+                    lock_file.close()
+
+    def _acquire_process_lock(self):
+        """获取跨进程文件锁：成功返回文件对象，已被占用返回 False，不支持时返回 None"""
+        if fcntl is None:
+            return None
+        self.incoming_dir.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.incoming_dir / LOCK_FILENAME, "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        return lock_file
+
+    async def _sweep(self, dry_run: bool) -> Dict:
+        started = time.perf_counter()
+        cutoff = time.time() - self.ttl
+        # 与产品的 updated_at 格式一致（admin 保存产品时写入 UTC 的 isoformat()）
+        since = datetime.now(timezone.utc).isoformat()
+        references = await self._load_references(cutoff)
+        result = {
+            "dry_run": dry_run,
+            "incoming": await asyncio.to_thread(self._sweep_incoming, cutoff, dry_run),
+            "backends": {},
+        }
+        for backend in self.media_store.backends():
+            result["backends"][backend.name] = await self._sweep_backend(backend, references, since, cutoff, dry_run)
+        result["variants"] = await self._delete_stale_variants(references.stale_variants, dry_run)
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+        self.last_result = result
+        summary = ", ".join(
+            f"{name} {stats['deleted']}/{stats['scanned']}" for name, stats in result["backends"].items()
+        )
+        logger.info(
+            f"🧹 媒体清理完成{'（预演）' if dry_run else ''}: {summary}, 衍生记录 {result['variants']}, "
+            f"接收残留 {result['incoming']}, 耗时 {result['elapsed_ms']}ms"
+        )
+        return result
+
+    async def _load_references(self, cutoff: float) -> MediaReferences:
+        """读取产品和轮播图引用的全部媒体 URL"""
+        async with async_session_maker() as session:
+            product_rows = (await session.execute(select(Product.images, Product.video))).all()
+            slide_images = (await session.execute(select(HeroSlide.image))).scalars().all()
+            variants = (await session.execute(select(MediaVariant))).scalars().all()
+
+        urls: Set[str] = set()
+        for images, video in product_rows:
+            urls.update(images or [])
+            if video:
+                urls.add(video)
+        urls.update(image for image in slide_images if image)
+
+        references = MediaReferences()
+        self._add_urls(references, urls, variants, cutoff)
+        return references
+
+    async def _recheck_references(self, keys: List[str], in_media: bool, since: str) -> MediaReferences:
+        """删除一页孤儿对象前复查引用：只读取清理开始后保存的产品，以及引用了这些候选文件的轮播图
+
+        查询量只与本页候选数和清理期间修改的产品数有关，与产品总数无关。
+        """
+        # 媒体文件按内容哈希匹配（衍生文件的文件名以原图哈希开头），临时文件按对象键匹配
+        tokens = sorted({Path(key).name[:64] if in_media else key for key in keys})
+        async with async_session_maker() as session:
+            product_rows = (await session.execute(
+                select(Product.images, Product.video).where(Product.updated_at >= since)
+            )).all()
+            slide_images: Set[str] = set()
+            for start in range(0, len(tokens), RECHECK_BATCH_SIZE):
+                batch = tokens[start:start + RECHECK_BATCH_SIZE]
+                slide_images.update((await session.execute(
+                    select(HeroSlide.image).where(or_(*(HeroSlide.image.contains(token, autoescape=True) for token in batch)))
+                )).scalars().all())
+
+            urls: Set[str] = set(slide_images)
+            for images, video in product_rows:
+                urls.update(images or [])
+                if video:
+                    urls.add(video)
+            variants = (await session.execute(
+                select(MediaVariant).where(MediaVariant.source_url.in_(urls))
+            )).scalars().all() if urls else []
+
+        references = MediaReferences()
+        self._add_urls(references, urls, variants)
+        return references
+
+    def _add_urls(self, references: MediaReferences, urls: Set[str], variants: List[MediaVariant], cutoff: Optional[float] = None):
+        """把引用的 URL（及其衍生文件）加入 references；提供 cutoff 时记录超过保留期且原图未被引用的衍生记录"""
+        variant_urls: Set[str] = set()
+        for variant in variants:
+            if variant.source_url in urls:
+                # 衍生文件的 URL 形如 "url 320w, url 640w"
+                for srcset in (variant.srcset or {}).values():
+                    variant_urls.update(item.rsplit(" ", 1)[0] for item in (srcset or "").split(", ") if item)
+            elif cutoff is not None and _parse_time(variant.created_at) < cutoff:
+                references.stale_variants.append(variant.source_url)
+
+        for url in urls | variant_urls:
+            located = self.media_store.locate(url)
+            if located:
+                references.add(*located)
+            parsed = self.media_store.parse_url(url)
+            if parsed:
+                references.hashes.add(parsed[0])
+
+    def _sweep_incoming(self, cutoff: float, dry_run: bool) -> int:
+        """删除接收上传时残留的临时文件和工作目录"""
+        if not self.incoming_dir.exists():
+            return 0
+        removed = 0
+        for entry in self.incoming_dir.iterdir():
+            if entry.name == LOCK_FILENAME or entry.stat().st_mtime >= cutoff:
+                continue
+            removed += 1
+            if not dry_run:
+                if entry.is_dir():
+                    shutil.rmtree(entry, ignore_errors=True)
+                else:
+                    entry.unlink(missing_ok=True)
+        return removed
+
+    async def _sweep_backend(
+        self, backend: StorageBackend, references: MediaReferences, since: str, cutoff: float, dry_run: bool
+    ) -> Dict:
+        """逐页列举后端的 temp/ 和 media/，每页的孤儿对象批量删除"""
+        scanned = deleted = 0
+        media_prefix = self.media_store.key_for(backend, f"{MEDIA_DIR}/")
+        for prefix in (f"{TEMP_DIR}/", media_prefix):
+            in_media = prefix == media_prefix
+            async for page in backend.iter_pages(prefix):
+                scanned += len(page)
+                orphans = [
+                    obj["key"] for obj in page
+                    if obj["last_modified"] < cutoff and not references.is_referenced(backend, obj["key"], in_media)
+                ]
+                if not orphans:
+                    continue
+                if dry_run:
+                    deleted += len(orphans)
+                    continue
+                # 删除前复查本页候选，跳过清理过程中被重新引用的文件
+                recent = await self._recheck_references(orphans, in_media, since)
+                orphans = [key for key in orphans if not recent.is_referenced(backend, key, in_media)]
+                failed = await backend.delete_many(orphans)
+                deleted += len(orphans) - len(failed)
+        return {"scanned": scanned, "deleted": deleted}
+
+    async def _delete_stale_variants(self, source_urls: List[str], dry_run: bool) -> int:
+        """删除原图已不再被引用的 media_variants 记录（衍生文件由媒体清理一并删除）"""
+        if not source_urls or dry_run:
+            return len(source_urls)
+        async with async_session_maker() as session:
+            for start in range(0, len(source_urls), 500):
+                await session.execute(
+                    delete(MediaVariant).where(MediaVariant.source_url.in_(source_urls[start:start + 500]))
+                )
+            await session.commit()
+        return len(source_urls)
+
+    def metrics(self) -> Dict:
+        return {
+            "interval": self.interval,
+            "ttl": self.ttl,
+            "running": self._task is not None,
+            "last_result": self.last_result,
+        }
+
+
+def _parse_time(value: Optional[str]) -> float:
+    """解析 isoformat 时间字符串，无法解析时视为很久以前
+
+    不带时区的值按 UTC 解析（旧数据由 utcnow() 写入），与服务器所在时区无关。
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
@@ -0,0 +1,158 @@
+"""数据库迁移 - 带版本号、非破坏性的表结构升级
+
+每个迁移是一个幂等的同步函数（在 run_sync 中执行），按版本号顺序应用，
+已应用的版本记录在 schema_version 表中。启动时只读取版本号，
+落后时才执行缺失的迁移，不再每次启动都 create_all 反射全部表。
+
+新增迁移：在 MIGRATIONS 末尾追加 (版本号, 说明, 函数)，不要修改已发布的迁移。
+"""
+import logging
+from datetime import datetime
+from typing import Callable, List, Tuple
+from sqlalchemy import Table, Column, Integer, String, DateTime, MetaData, select, func, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.models.base import Base
+# 导入全部模型，确保 Base.metadata 完整
+from app.models import Category, Product, Tag, HeroSlide, Admin, MediaVariant  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+# 版本表不属于业务模型，单独的 MetaData，避免被 create_all 一起管理
+schema_metadata = MetaData()
+schema_version_table = Table(
+    "schema_version",
+    schema_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# MySQL 命名锁，防止多个 worker 同时启动时重复执行迁移
+MIGRATION_LOCK_NAME = "scavi_schema_migration"
+MIGRATION_LOCK_TIMEOUT = 60
+
+
+# ==================== 迁移 ====================
+def _create_base_tables(conn: Connection):
+    """基线：创建缺失的表（已存在的表不会被修改）"""
+    Base.metadata.create_all(conn, checkfirst=True)
+
+
+def _add_tag_product_count(conn: Connection):
+    """tags 表增加 product_count 列（旧库 create_all 不会补列）"""
+    columns = {c["name"] for c in inspect(conn).get_columns("tags")}
+    if "product_count" not in columns:
+        conn.execute(text("ALTER TABLE tags ADD COLUMN product_count INTEGER NOT NULL DEFAULT 0"))
+
+
+def _create_index(conn: Connection, table: str, name: str, columns: Tuple[str, ...]):
+    """创建索引（已存在则跳过）
+
+    迁移中显式写出索引名和列，不从模型读取，之后修改模型不会改变已发布迁移的行为。
+    """
+    if name in {index["name"] for index in inspect(conn).get_indexes(table)}:
+        return
+    quote = conn.dialect.identifier_preparer.quote
+    conn.execute(text(
+        f"CREATE INDEX {quote(name)} ON {quote(table)} ({', '.join(quote(column) for column in columns)})"
+    ))
+
+
+def _create_performance_indexes(conn: Connection):
+    """热点查询的复合索引（与模型中声明的索引一致，已存在则跳过）"""
+    indexes: List[Tuple[str, str, Tuple[str, ...]]] = [
+        ("products", "ix_products_active_category_id", ("is_active", "category_id", "id")),
+        ("tags", "ix_tags_active_order", ("is_active", "order")),
+        ("categories", "ix_categories_active_order", ("is_active", "order")),
+        ("hero_slides", "ix_hero_slides_active_order", ("is_active", "order")),
+        ("product_tags", "ix_product_tags_tag_product", ("tag_id", "product_id")),
+    ]
+    for table, name, columns in indexes:
+        _create_index(conn, table, name, columns)
+
+
+def _create_media_variants(conn: Connection):
+    """图片衍生尺寸表"""
+    MediaVariant.__table__.create(conn, checkfirst=True)
+
+
+def _create_product_updated_at_index(conn: Connection):
+    """products.updated_at 索引（媒体清理按修改时间复查引用）"""
+    _create_index(conn, "products", "ix_products_updated_at", ("updated_at",))
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "基线表结构", _create_base_tables),
+    (2, "tags.product_count 列", _add_tag_product_count),
+    (3, "热点查询复合索引", _create_performance_indexes),
+    (4, "media_variants 表", _create_media_variants),
+    (5, "products.updated_at 索引", _create_product_updated_at_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ==================== 执行 ====================
+def _current_version(conn: Connection) -> int:
+    """读取已应用的最新版本号（没有版本表视为 0）"""
+    if not inspect(conn).has_table("schema_version"):
+        return 0
+    return conn.execute(select(func.max(schema_version_table.c.version))).scalar() or 0
+
+
+async def get_schema_version(engine: AsyncEngine) -> int:
+    """获取数据库当前的表结构版本"""
+    async with engine.connect() as conn:
+        return await conn.run_sync(_current_version)
+
+
+async def run_migrations(engine: AsyncEngine) -> int:
+    """应用所有未执行的迁移，返回迁移后的版本号"""
+    async with engine.connect() as conn:
+        use_lock = conn.dialect.name == "mysql"
+        if use_lock:
+            locked = (await conn.execute(
+                text("SELECT GET_LOCK(:name, :timeout)"),
+                {"name": MIGRATION_LOCK_NAME, "timeout": MIGRATION_LOCK_TIMEOUT}
+            )).scalar()
+            if not locked:
+                raise RuntimeError("等待迁移锁超时，可能有其他进程正在执行迁移")
+        try:
+            await conn.run_sync(lambda sync_conn: schema_metadata.create_all(sync_conn, checkfirst=True))
+            await conn.commit()
+
+            # 拿到锁之后重新读取版本，其他进程可能已经完成迁移
+            current = await conn.run_sync(_current_version)
+            for version, name, migrate in MIGRATIONS:
+                if version <= current:
+                    continue
+                logger.info(f"执行数据库迁移 {version}: {name}")
+                print(f"🔄 执行数据库迁移 {version}: {name}")
+                await conn.run_sync(migrate)
+                await conn.execute(
+                    schema_version_table.insert().values(
+                        version=version, name=name, applied_at=datetime.utcnow()
+                    )
+                )
+                await conn.commit()
+                current = version
+            return current
+        finally:
+            if use_lock:
+                await conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+                await conn.commit()
+
+
+async def ensure_schema(engine: AsyncEngine, auto_migrate: bool = True) -> int:
+    """启动时检查表结构版本，落后时按需迁移"""
+    version = await get_schema_version(engine)
+    if version >= LATEST_VERSION:
+        return version
+
+    if not auto_migrate:
+        logger.error(f"数据库表结构版本 {version} 落后于 {LATEST_VERSION}，请运行 python migrate_database.py")
+        print(f"⚠️  数据库表结构版本 {version} 落后于 {LATEST_VERSION}，请运行 python migrate_database.py")
+        return version
+
+    return await run_migrations(engine)
@@ -28,6 +28,7 @@ AWS_S3_SECRET_ACCESS_KEY = os.getenv("AWS_S3_SECRET_ACCESS_KEY", "")
 AWS_S3_REGION = os.getenv("AWS_S3_REGION", "")  # 例如: us-east-1
 AWS_S3_BUCKET_NAME = os.getenv("AWS_S3_BUCKET_NAME", "")
 AWS_S3_DOMAIN = os.getenv("AWS_S3_DOMAIN", "")  # 自定义域名
+AWS_S3_ENDPOINT_URL = os.getenv("AWS_S3_ENDPOINT_URL", "")  # S3 兼容服务地址（如 MinIO: http://localhost:9000），为空使用 AWS
 
 # 通用配置
 OSS_PREFIX = os.getenv("OSS_PREFIX", "uploads")  # OSS 中的路径前缀，例如: uploads
@@ -55,3 +56,19 @@ def validate_oss_config() -> tuple[bool, str]:
     else:
         return False, f"不支持的 OSS 类型: {OSS_TYPE}"
 
+
+# SDK 调用线程池配置（SDK 均为同步阻塞调用，放到独立线程池执行，避免阻塞事件循环）
+OSS_EXECUTOR_WORKERS = int(os.getenv("OSS_EXECUTOR_WORKERS", "8"))  # 线程数
+OSS_EXECUTOR_MAX_PENDING = int(os.getenv("OSS_EXECUTOR_MAX_PENDING", "64"))  # 排队 + 执行中的调用上限
+OSS_CALL_TIMEOUT = float(os.getenv("OSS_CALL_TIMEOUT", "30"))  # 普通调用超时（秒）
+OSS_UPLOAD_TIMEOUT = float(os.getenv("OSS_UPLOAD_TIMEOUT", "300"))  # 上传超时（秒）
+OSS_PROMOTE_CONCURRENCY = int(os.getenv("OSS_PROMOTE_CONCURRENCY", "4"))  # 临时文件转正时单个请求的并发复制数
+
+# 分片上传配置（超过阈值的文件分片并发上传，失败的分片单独重试）
+OSS_MULTIPART_THRESHOLD = int(os.getenv("OSS_MULTIPART_THRESHOLD", str(32 * 1024 * 1024)))  # 32MB
+OSS_MULTIPART_PART_SIZE = int(os.getenv("OSS_MULTIPART_PART_SIZE", str(8 * 1024 * 1024)))  # 8MB（S3 最小 5MB）
+OSS_MULTIPART_CONCURRENCY = int(os.getenv("OSS_MULTIPART_CONCURRENCY", "4"))  # 分片线程数（同一后端的所有上传共用）
+OSS_MULTIPART_RETRIES = int(os.getenv("OSS_MULTIPART_RETRIES", "3"))  # 单个分片最多尝试次数
+
+# 直传配置（浏览器使用预签名 URL 直接上传到 Bucket 的 temp/ 目录）
+OSS_PRESIGN_EXPIRES = int(os.getenv("OSS_PRESIGN_EXPIRES", "900"))  # 预签名 URL 有效期（秒）
@@ -1,7 +1,11 @@
-"""OSS 对象存储服务"""
-import os
+"""OSS 对象存储服务
+
+按 OSS_TYPE 创建对应的存储后端（app/core/storage），并提供管理后台使用的对象存储操作：
+临时文件转正、浏览器直传签名、直传校验等。各家 SDK 的差异都在后端适配器中处理。
+"""
+import asyncio
 import logging
-from typing import Optional, BinaryIO
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from pathlib import Path
 from app.core.oss_config import (
@@ -21,332 +25,213 @@ from app.core.oss_config import (
     AWS_S3_REGION,
     AWS_S3_BUCKET_NAME,
     AWS_S3_DOMAIN,
+    AWS_S3_ENDPOINT_URL,
     OSS_PREFIX,
     OSS_USE_HTTPS,
+    OSS_EXECUTOR_WORKERS,
+    OSS_EXECUTOR_MAX_PENDING,
+    OSS_PROMOTE_CONCURRENCY,
+    OSS_PRESIGN_EXPIRES,
     validate_oss_config
 )
+from app.core.storage import StorageBackend, StorageExecutor
 
 logger = logging.getLogger(__name__)
 
+# SDK 包名（未安装时的提示）
+SDK_PACKAGES = {"aliyun": "oss2", "tencent": "cos-python-sdk-v5", "aws": "boto3"}
+
+
+def create_remote_backend(oss_type: str) -> Optional[StorageBackend]:
+    """按类型创建对象存储后端，SDK 未安装或初始化失败时返回 None"""
+    if oss_type not in SDK_PACKAGES:
+        logger.error(f"不支持的 OSS 类型: {oss_type}")
+        return None
+
+    executor = StorageExecutor(OSS_EXECUTOR_WORKERS, OSS_EXECUTOR_MAX_PENDING, name=oss_type)
+    try:
+        if oss_type == "aliyun":
+            from app.core.storage.aliyun import AliyunOSSBackend
+            backend = AliyunOSSBackend(
+                executor,
+                ALIYUN_OSS_ACCESS_KEY_ID,
+                ALIYUN_OSS_ACCESS_KEY_SECRET,
+                ALIYUN_OSS_ENDPOINT,
+                ALIYUN_OSS_BUCKET_NAME,
+                domain=ALIYUN_OSS_BUCKET_DOMAIN,
+                use_https=OSS_USE_HTTPS,
+            )
+        elif oss_type == "tencent":
+            from app.core.storage.tencent import TencentCOSBackend
+            backend = TencentCOSBackend(
+                executor,
+                TENCENT_COS_SECRET_ID,
+                TENCENT_COS_SECRET_KEY,
+                TENCENT_COS_REGION,
+                TENCENT_COS_BUCKET_NAME,
+                domain=TENCENT_COS_DOMAIN,
+                use_https=OSS_USE_HTTPS,
+            )
+        else:
+            from app.core.storage.s3 import S3StorageBackend
+            backend = S3StorageBackend(
+                executor,
+                AWS_S3_ACCESS_KEY_ID,
+                AWS_S3_SECRET_ACCESS_KEY,
+                AWS_S3_REGION,
+                AWS_S3_BUCKET_NAME,
+                domain=AWS_S3_DOMAIN,
+                endpoint_url=AWS_S3_ENDPOINT_URL,
+                use_https=OSS_USE_HTTPS,
+            )
+    except ImportError:
+        package = SDK_PACKAGES[oss_type]
+        logger.error(f"未安装 {package} 库，请运行: pip install {package}")
+        executor.shutdown()
+        return None
+    except Exception as e:
+        logger.error(f"{oss_type} 对象存储客户端初始化失败: {str(e)}")
+        executor.shutdown()
+        return None
+
+    logger.info(f"{oss_type} 对象存储客户端初始化成功: {backend.host}")
+    return backend
+
 
 class OSSService:
-    """OSS 服务基类"""
-    
+    """OSS 服务（未配置或初始化失败时 enabled 为 False，调用方回退到本地存储）"""
+
     def __init__(self):
         self.oss_type = OSS_TYPE
         self.prefix = OSS_PREFIX
-        self.use_https = OSS_USE_HTTPS
-        
+        self.backend: Optional[StorageBackend] = None
+
         # 验证配置
         is_valid, error_msg = validate_oss_config()
         if not is_valid:
             logger.warning(f"OSS 配置验证失败: {error_msg}")
             logger.warning("将使用本地存储模式")
-            self.enabled = False
-        else:
-            self.enabled = True
-            self._init_client()
-    
-    def _init_client(self):
-        """初始化 OSS 客户端"""
-        if self.oss_type == "aliyun":
-            self._init_aliyun_oss()
-        elif self.oss_type == "tencent":
-            self._init_tencent_cos()
-        elif self.oss_type == "aws":
-            self._init_aws_s3()
-        else:
-            self.enabled = False
-            logger.error(f"不支持的 OSS 类型: {self.oss_type}")
-    
-    def _init_aliyun_oss(self):
-        """初始化阿里云 OSS 客户端"""
-        try:
-            import oss2
-            self.client = oss2.Bucket(
-                oss2.Auth(ALIYUN_OSS_ACCESS_KEY_ID, ALIYUN_OSS_ACCESS_KEY_SECRET),
-                f"https://{ALIYUN_OSS_ENDPOINT}",
-                ALIYUN_OSS_BUCKET_NAME
-            )
-            self.bucket_name = ALIYUN_OSS_BUCKET_NAME
-            self.domain = ALIYUN_OSS_BUCKET_DOMAIN or f"https://{ALIYUN_OSS_BUCKET_NAME}.{ALIYUN_OSS_ENDPOINT}"
-            logger.info(f"阿里云 OSS 客户端初始化成功: {self.domain}")
-        except ImportError:
-            logger.error("未安装 oss2 库，请运行: pip install oss2")
-            self.enabled = False
-        except Exception as e:
-            logger.error(f"阿里云 OSS 客户端初始化失败: {str(e)}")
-            self.enabled = False
-    
-    def _init_tencent_cos(self):
-        """初始化腾讯云 COS 客户端"""
-        try:
-            from qcloud_cos import CosConfig
-            from qcloud_cos import CosS3Client
-            config = CosConfig(
-                Region=TENCENT_COS_REGION,
-                SecretId=TENCENT_COS_SECRET_ID,
-                SecretKey=TENCENT_COS_SECRET_KEY,
-                Scheme='https' if OSS_USE_HTTPS else 'http'
-            )
-            self.client = CosS3Client(config)
-            self.bucket_name = TENCENT_COS_BUCKET_NAME
-            self.domain = TENCENT_COS_DOMAIN or f"https://{TENCENT_COS_BUCKET_NAME}.cos.{TENCENT_COS_REGION}.myqcloud.com"
-            logger.info(f"腾讯云 COS 客户端初始化成功: {self.domain}")
-        except ImportError:
-            logger.error("未安装 qcloud-python-sdk 库，请运行: pip install cos-python-sdk-v5")
-            self.enabled = False
-        except Exception as e:
-            logger.error(f"腾讯云 COS 客户端初始化失败: {str(e)}")
-            self.enabled = False
-    
-    def _init_aws_s3(self):
-        """初始化 AWS S3 客户端"""
-        try:
-            import boto3
-            self.client = boto3.client(
-                's3',
-                aws_access_key_id=AWS_S3_ACCESS_KEY_ID,
-                aws_secret_access_key=AWS_S3_SECRET_ACCESS_KEY,
-                region_name=AWS_S3_REGION
-            )
-            self.bucket_name = AWS_S3_BUCKET_NAME
-            self.domain = AWS_S3_DOMAIN or f"https://{AWS_S3_BUCKET_NAME}.s3.{AWS_S3_REGION}.amazonaws.com"
-            logger.info(f"AWS S3 客户端初始化成功: {self.domain}")
-        except ImportError:
-            logger.error("未安装 boto3 库，请运行: pip install boto3")
-            self.enabled = False
-        except Exception as e:
-            logger.error(f"AWS S3 客户端初始化失败: {str(e)}")
-            self.enabled = False
-    
-    def _generate_object_key(self, filename: str, is_temp: bool = False) -> str:
+        elif self.oss_type:
+            self.backend = create_remote_backend(self.oss_type)
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def generate_object_key(self, filename: str, is_temp: bool = False) -> str:
         """生成 OSS 对象键（路径）"""
         # 按日期组织文件：uploads/2024/12/15/filename.jpg 或 temp/2024/12/15/filename.jpg
         date_path = datetime.now().strftime("%Y/%m/%d")
         prefix = "temp" if is_temp else self.prefix
         return f"{prefix}/{date_path}/{filename}"
-    
-    def upload_file(self, file_content: bytes, filename: str, content_type: Optional[str] = None, is_temp: bool = False) -> Optional[str]:
-        """上传文件到 OSS
-        
-        Args:
-            file_content: 文件内容（字节）
-            filename: 文件名
-            content_type: 文件 MIME 类型
-            is_temp: 是否为临时文件（上传到 temp/ 目录）
-        
+
+    def object_url(self, object_key: str) -> Optional[str]:
+        """生成对象的访问 URL（未启用时返回 None）"""
+        return self.backend.url_for(object_key) if self.backend else None
+
+    def object_key_for_url(self, url: str) -> Optional[str]:
+        """从对象 URL 中提取对象键"""
+        return self.backend.key_for_url(url) if self.backend else None
+
+    # ==================== 直传 ====================
+    def presign_upload(
+        self, filename: str, content_type: str, expires: int = OSS_PRESIGN_EXPIRES, sha256: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """生成浏览器直传的预签名 PUT 请求（只做本地签名计算，不访问网络）
+
+        只签发 temp/ 目录下的新对象键；内容寻址位置（media/）由服务器确认哈希后复制，不允许直传。
+        提供 sha256 且后端支持时，由存储服务校验上传内容与哈希一致（checksum 为 True）。
+
         Returns:
-            文件 URL，如果上传失败返回 None
+            {"method", "url", "headers", "object_key", "file_url", "expires_in", "checksum"}，未启用或失败返回 None
         """
-        if not self.enabled:
+        if not self.backend or not self.backend.supports_presign:
             return None
-        
+
         try:
-            object_key = self._generate_object_key(filename, is_temp=is_temp)
-            
-            if self.oss_type == "aliyun":
-                return self._upload_to_aliyun(file_content, object_key, content_type)
-            elif self.oss_type == "tencent":
-                return self._upload_to_tencent(file_content, object_key, content_type)
-            elif self.oss_type == "aws":
-                return self._upload_to_aws(file_content, object_key, content_type)
-            else:
-                logger.error(f"不支持的 OSS 类型: {self.oss_type}")
+            object_key = self.generate_object_key(filename, is_temp=True)
+            checksum = bool(sha256) and self.backend.supports_checksum
+            url = self.backend.presign_put(object_key, content_type, expires, sha256 if checksum else None)
+            if not url:
                 return None
+            headers = {'Content-Type': content_type}
+            if checksum:
+                headers.update(self.backend.checksum_headers(sha256))
+            return {
+                "method": "PUT",
+                "url": url,
+                "headers": headers,
+                "object_key": object_key,
+                "file_url": self.backend.url_for(object_key),
+                "expires_in": expires,
+                "checksum": checksum,
+            }
         except Exception as e:
-            logger.error(f"文件上传到 OSS 失败: {str(e)}")
+            logger.error(f"生成预签名 URL 失败: {str(e)}")
             return None
-    
-    def _upload_to_aliyun(self, file_content: bytes, object_key: str, content_type: Optional[str] = None) -> str:
-        """上传到阿里云 OSS"""
-        headers = {}
-        if content_type:
-            headers['Content-Type'] = content_type
-        
-        self.client.put_object(object_key, file_content, headers=headers)
-        
-        # 返回文件 URL
-        if ALIYUN_OSS_BUCKET_DOMAIN:
-            # 使用自定义域名
-            protocol = "https" if self.use_https else "http"
-            return f"{protocol}://{ALIYUN_OSS_BUCKET_DOMAIN}/{object_key}"
-        else:
-            # 使用默认域名
-            protocol = "https" if self.use_https else "http"
-            return f"{protocol}://{self.bucket_name}.{ALIYUN_OSS_ENDPOINT}/{object_key}"
-    
-    def _upload_to_tencent(self, file_content: bytes, object_key: str, content_type: Optional[str] = None) -> str:
-        """上传到腾讯云 COS"""
-        from qcloud_cos.cos_exception import CosClientError
-        
-        try:
-            response = self.client.put_object(
-                Bucket=self.bucket_name,
-                Body=file_content,
-                Key=object_key,
-                ContentType=content_type or 'application/octet-stream'
-            )
-            
-            # 返回文件 URL
-            if TENCENT_COS_DOMAIN:
-                protocol = "https" if self.use_https else "http"
-                return f"{protocol}://{TENCENT_COS_DOMAIN}/{object_key}"
-            else:
-                protocol = "https" if self.use_https else "http"
-                return f"{protocol}://{self.bucket_name}.cos.{TENCENT_COS_REGION}.myqcloud.com/{object_key}"
-        except CosClientError as e:
-            logger.error(f"腾讯云 COS 上传失败: {str(e)}")
-            raise
-    
-    def _upload_to_aws(self, file_content: bytes, object_key: str, content_type: Optional[str] = None) -> str:
-        """上传到 AWS S3"""
-        extra_args = {}
-        if content_type:
-            extra_args['ContentType'] = content_type
-        
-        self.client.put_object(
-            Bucket=self.bucket_name,
-            Key=object_key,
-            Body=file_content,
-            **extra_args
-        )
-        
-        # 返回文件 URL
-        if AWS_S3_DOMAIN:
-            protocol = "https" if self.use_https else "http"
-            return f"{protocol}://{AWS_S3_DOMAIN}/{object_key}"
-        else:
-            protocol = "https" if self.use_https else "http"
-            return f"{protocol}://{self.bucket_name}.s3.{AWS_S3_REGION}.amazonaws.com/{object_key}"
-    
-    def delete_file(self, url: str) -> bool:
-        """从 OSS 删除文件
-        
-        Args:
-            url: 文件 URL
-        
-        Returns:
-            是否删除成功
-        """
-        if not self.enabled:
-            return False
-        
-        try:
-            # 从 URL 中提取 object_key
-            object_key = self._extract_object_key_from_url(url)
-            if not object_key:
-                return False
-            
-            if self.oss_type == "aliyun":
-                self.client.delete_object(object_key)
-            elif self.oss_type == "tencent":
-                self.client.delete_object(Bucket=self.bucket_name, Key=object_key)
-            elif self.oss_type == "aws":
-                self.client.delete_object(Bucket=self.bucket_name, Key=object_key)
-            else:
-                return False
-            
-            logger.info(f"文件删除成功: {object_key}")
-            return True
-        except Exception as e:
-            logger.error(f"文件删除失败: {str(e)}")
-            return False
-    
-    def _extract_object_key_from_url(self, url: str) -> Optional[str]:
-        """从 URL 中提取 object_key"""
-        try:
-            # 移除协议和域名部分
-            if "://" in url:
-                parts = url.split("://", 1)
-                path = parts[1].split("/", 1)
-                if len(path) > 1:
-                    return path[1]
-            return None
-        except Exception:
-            return None
-    
-    def move_file(self, source_url: str, target_filename: str) -> Optional[str]:
-        """将文件从临时位置移动到正式位置（OSS 中复制文件）
-        
-        Args:
-            source_url: 源文件 URL（临时文件）
-            target_filename: 目标文件名
-        
+
+    async def head_object_async(self, object_key: str) -> Optional[Dict[str, Any]]:
+        """获取对象的大小和类型，存储服务校验过时还有 sha256（不存在、未启用或超时返回 None）"""
+        return await self.backend.head(object_key) if self.backend else None
+
+    async def read_object_range_async(self, object_key: str, start: int, end: int) -> Optional[bytes]:
+        """读取对象的 [start, end] 字节（用于校验文件头）"""
+        return await self.backend.read_range(object_key, start, end) if self.backend else None
+
+    async def delete_object_async(self, object_key: str) -> bool:
+        """按对象键删除文件"""
+        return await self.backend.delete(object_key) if self.backend else False
+
+    # ==================== 临时文件转正 ====================
+    async def promote_temp_files_async(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """将 temp/ 下的文件转为正式文件：并发复制，全部复制完成后批量删除临时对象
+
         Returns:
-            新文件 URL，如果移动失败返回 None
+            与 urls 顺序一致的结果列表，每项包含 source、url（新 URL，失败时为原 URL）、status：
+            moved（已转正）、unchanged（不是临时文件）、failed（复制失败）
         """
-        if not self.enabled:
-            return None
-        
-        try:
-            # 从源 URL 提取 object_key
-            source_key = self._extract_object_key_from_url(source_url)
-            if not source_key:
-                logger.error(f"无法从 URL 提取 object_key: {source_url}")
-                return None
-            
-            # 生成目标 object_key
-            target_key = self._generate_object_key(target_filename, is_temp=False)
-            
-            # 在 OSS 中复制文件
-            if self.oss_type == "aliyun":
-                # 阿里云 OSS copy_object 格式: copy_object(target_key, source_bucket, source_key)
-                self.client.copy_object(target_key, self.bucket_name, source_key)
-                # 删除临时文件
-                self.client.delete_object(source_key)
-            elif self.oss_type == "tencent":
-                # 复制文件
-                copy_source = {"Bucket": self.bucket_name, "Key": source_key}
-                self.client.copy_object(
-                    Bucket=self.bucket_name,
-                    Key=target_key,
-                    CopySource=copy_source
-                )
-                # 删除临时文件
-                self.client.delete_object(Bucket=self.bucket_name, Key=source_key)
-            elif self.oss_type == "aws":
-                # 复制文件
-                copy_source = {"Bucket": self.bucket_name, "Key": source_key}
-                self.client.copy_object(
-                    CopySource=copy_source,
-                    Bucket=self.bucket_name,
-                    Key=target_key
-                )
-                # 删除临时文件
-                self.client.delete_object(Bucket=self.bucket_name, Key=source_key)
-            else:
+        results: List[Dict[str, Any]] = [{"source": url, "url": url, "status": "unchanged"} for url in urls]
+        backend = self.backend
+        if not backend:
+            return results
+
+        slots = asyncio.Semaphore(OSS_PROMOTE_CONCURRENCY)
+
+        async def promote(result: Dict[str, Any]) -> Optional[str]:
+            source_key = backend.key_for_url(result["source"])
+            if not source_key or not source_key.startswith("temp/"):
                 return None
-            
-            # 生成新文件 URL
-            if self.oss_type == "aliyun":
-                if ALIYUN_OSS_BUCKET_DOMAIN:
-                    protocol = "https" if self.use_https else "http"
-                    return f"{protocol}://{ALIYUN_OSS_BUCKET_DOMAIN}/{target_key}"
-                else:
-                    protocol = "https" if self.use_https else "http"
-                    return f"{protocol}://{self.bucket_name}.{ALIYUN_OSS_ENDPOINT}/{target_key}"
-            elif self.oss_type == "tencent":
-                if TENCENT_COS_DOMAIN:
-                    protocol = "https" if self.use_https else "http"
-                    return f"{protocol}://{TENCENT_COS_DOMAIN}/{target_key}"
-                else:
-                    protocol = "https" if self.use_https else "http"
-                    return f"{protocol}://{self.bucket_name}.cos.{TENCENT_COS_REGION}.myqcloud.com/{target_key}"
-            elif self.oss_type == "aws":
-                if AWS_S3_DOMAIN:
-                    protocol = "https" if self.use_https else "http"
-                    return f"{protocol}://{AWS_S3_DOMAIN}/{target_key}"
-                else:
-                    protocol = "https" if self.use_https else "http"
-                    return f"{protocol}://{self.bucket_name}.s3.{AWS_S3_REGION}.amazonaws.com/{target_key}"
-            
-            return None
-        except Exception as e:
-            logger.error(f"移动文件失败: {str(e)}")
-            return None
+            target_key = self.generate_object_key(Path(source_key).name, is_temp=False)
+            async with slots:
+                try:
+                    await backend.copy(source_key, target_key)
+                except Exception as e:
+                    logger.error(f"复制临时文件失败: {source_key}: {str(e)}")
+                    result.update(status="failed", error=str(e))
+                    return None
+            result.update(url=backend.url_for(target_key), status="moved")
+            return source_key
+
+        copied = await asyncio.gather(*(promote(result) for result in results))
+        source_keys = [key for key in copied if key]
+        if source_keys:
+            # 复制都完成后一次性删除临时对象；删除失败不影响结果，残留的临时文件由清理任务处理
+            failed = set(await backend.delete_many(source_keys))
+            for result, key in zip(results, copied):
+                if key:
+                    result["source_deleted"] = key not in failed
+        return results
+
+    def metrics(self) -> Dict[str, Any]:
+        """OSS 调用线程池指标"""
+        if not self.backend:
+            return {"enabled": False, "oss_type": self.oss_type}
+        return {"enabled": True, "oss_type": self.oss_type, **self.backend.metrics()}
+
+    def shutdown(self):
+        if self.backend:
+            self.backend.shutdown()
 
 
 # 全局 OSS 服务实例
 oss_service = OSSService()
-
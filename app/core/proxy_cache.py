@@ -0,0 +1,454 @@
+"""OSS 代理磁盘缓存 - 热点文件从本地磁盘返回，不再每次访问存储桶
+
+- 按字节预算保存完整对象，超出预算时淘汰最久未使用的（LRU）
+- 先写入 .tmp/ 再原子重命名，进程中断或客户端断开不会留下不完整的缓存文件
+- 超过 PROXY_CACHE_REVALIDATE 秒未验证的缓存项，使用前向存储桶发送条件请求确认是否变化
+- 同一对象的并发未命中请求只向存储桶请求一次，所有请求按写入进度读取同一个临时文件
+
+目录结构：{root}/ab/<sha256(对象键)> 为文件内容，同名 .json 为元数据（类型、ETag、Last-Modified、大小）。
+多个 worker 进程共用缓存目录，各自维护内存索引；其他进程写入的缓存项在首次访问时加入索引。
+字节预算是整个缓存目录的上限：除了按内存索引淘汰，每隔 DISK_CHECK_INTERVAL 秒按磁盘上的实际文件
+（包括其他进程写入的）重新统计大小，超出时按文件修改时间淘汰。
+.tmp/ 中可能有其他进程正在写入的文件，启动时只删除超过 TMP_MAX_AGE 未修改的残留文件。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+import httpx
+from app.core.config import (
+    PROXY_CACHE_MAX_BYTES,
+    PROXY_CACHE_MAX_OBJECT_SIZE,
+    PROXY_CACHE_REVALIDATE,
+    PROXY_CHUNK_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+TMP_DIR = ".tmp"
+# 保存到 .json 的元数据字段
+# source_version：缩放后的图片对应的原图版本（ETag 或 Last-Modified），原图变化后不再使用
+META_FIELDS = ("key", "digest", "content_type", "etag", "last_modified", "size", "validated_at", "source_version")
+# 命中时最多每隔多久更新一次文件修改时间（秒），重启后按修改时间恢复 LRU 顺序
+TOUCH_INTERVAL = 60
+# 按磁盘文件统计缓存总大小的最小间隔（秒）
+DISK_CHECK_INTERVAL = 60
+# .tmp/ 中的文件超过这个时间（秒）未修改时视为中断写入的残留：
+# 写入中的文件每收到一块数据都会更新修改时间，上游停止发送数据超过 PROXY_TIMEOUT 即中止
+TMP_MAX_AGE = 3600
+
+
+class ProxyCache:
+    """按对象键缓存的磁盘 LRU（max_bytes 为 0 时关闭）"""
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int = PROXY_CACHE_MAX_BYTES,
+        max_object_size: int = PROXY_CACHE_MAX_OBJECT_SIZE,
+        revalidate_after: int = PROXY_CACHE_REVALIDATE,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_object_size = max_object_size
+        self.revalidate_after = revalidate_after
+        # digest -> 元数据，按最近使用排序（最久未使用的在前）
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._size = 0
+        # 最近一次按磁盘文件统计的缓存总大小（包括其他进程写入的）
+        self._disk_size: Optional[int] = None
+        self._disk_checked_at = 0.0
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        # 对象键 -> 正在进行的上游请求（合并并发的未命中请求）
+        self._flights: Dict[str, "Flight"] = {}
+        self.stats = dict.fromkeys(
+            ("hits", "misses", "coalesced", "bypassed", "revalidated", "stored", "evicted"), 0
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    # ==================== 路径 ====================
+    @staticmethod
+    def _digest(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _data_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def _meta_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest}.json"
+
+    def tmp_path(self, suffix: str = "") -> Path:
+        """缓存目录内的临时文件路径（与缓存文件在同一文件系统，可以原子重命名）"""
+        tmp_dir = self.root / TMP_DIR
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        return tmp_dir / f"{uuid.uuid4().hex}{suffix}"
+
+    # ==================== 索引 ====================
+    async def _ensure_loaded(self):
+        """首次使用时扫描缓存目录，按文件修改时间恢复 LRU 顺序"""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            for meta in await asyncio.to_thread(self._scan):
+                self._index(meta)
+            self._loaded = True
+            logger.info(f"📦 代理缓存已加载: {len(self._entries)} 个文件, {self._size} 字节")
+            await self._evict()
+
+    def _scan(self) -> List[Dict[str, Any]]:
+        self._remove_stale_tmp()
+        if not self.root.exists():
+            return []
+        items = [meta for meta in map(self._read_meta, self.root.glob("??/*.json")) if meta]
+        items.sort(key=lambda meta: meta["used_at"])
+        return items
+
+    def _remove_stale_tmp(self):
+        """删除中断写入残留的临时文件（其他进程正在写入的文件不受影响）"""
+        tmp_dir = self.root / TMP_DIR
+        if not tmp_dir.exists():
+            return
+        cutoff = time.time() - TMP_MAX_AGE
+        for path in tmp_dir.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+
+    def _read_meta(self, meta_path: Path) -> Optional[Dict[str, Any]]:
+        """读取元数据并核对文件大小（文件缺失或不一致时视为不存在）"""
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            data_path = self._data_path(meta["digest"])
+            stat = data_path.stat()
+        except (OSError, ValueError, KeyError):
+            return None
+        if stat.st_size != meta.get("size"):
+            return None
+        meta["path"] = str(data_path)
+        meta["used_at"] = stat.st_mtime
+        return meta
+
+    def _index(self, meta: Dict[str, Any]):
+        old = self._entries.pop(meta["digest"], None)
+        if old:
+            self._size -= old["size"]
+        self._entries[meta["digest"]] = meta
+        self._size += meta["size"]
+
+    def _unindex(self, digest: str):
+        meta = self._entries.pop(digest, None)
+        if meta:
+            self._size -= meta["size"]
+
+    # ==================== 读取 ====================
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查找缓存项，返回元数据（含文件路径 path），不存在返回 None"""
+        if not self.enabled:
+            return None
+        await self._ensure_loaded()
+        digest = self._digest(key)
+        meta = self._entries.get(digest)
+        if meta is None:
+            # 可能由其他 worker 进程写入
+            meta = await asyncio.to_thread(self._read_meta, self._meta_path(digest))
+            if meta is None:
+                return None
+            self._index(meta)
+            await self._evict()
+            if digest not in self._entries:
+                return None
+        self._entries.move_to_end(digest)
+        now = time.time()
+        if now - meta["used_at"] > TOUCH_INTERVAL:
+            meta["used_at"] = now
+            try:
+                os.utime(meta["path"])
+            except OSError:
+                pass
+        return meta
+
+    def is_fresh(self, meta: Dict[str, Any]) -> bool:
+        """缓存项是否在免验证期内"""
+        return time.time() - meta.get("validated_at", 0) < self.revalidate_after
+
+    async def mark_validated(self, meta: Dict[str, Any]):
+        """存储桶确认未变化后更新验证时间"""
+        meta["validated_at"] = time.time()
+        try:
+            await asyncio.to_thread(self._write_meta, meta)
+        except OSError as e:
+            logger.warning(f"更新代理缓存元数据失败: {meta['key']}: {str(e)}")
+
+    def forget(self, key: str):
+        """只从内存索引中移除（缓存文件已被其他进程替换或淘汰）"""
+        self._unindex(self._digest(key))
+
+    async def discard(self, key: str):
+        """删除缓存项（对象已变化、已删除或缓存文件丢失）"""
+        digest = self._digest(key)
+        self._unindex(digest)
+        await asyncio.to_thread(self._remove_files, [digest])
+
+    # ==================== 请求合并 ====================
+    def join(self, key: str) -> Tuple["Flight", bool]:
+        """加入对象正在进行的上游请求，没有时新建一个
+
+        Returns:
+            (flight, 是否为新建)，新建方负责发起请求
+        """
+        flight = self._flights.get(key)
+        if flight:
+            self.stats["coalesced"] += 1
+            return flight, False
+        flight = self._flights[key] = Flight(key)
+        self.stats["misses"] += 1
+        return flight, True
+
+    def end_flight(self, flight: "Flight"):
+        """上游响应体接收完毕（或失败），之后的请求走缓存或重新请求"""
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    # ==================== 写入 ====================
+    def writer(self, key: str, upstream: httpx.Response) -> Optional["CacheWriter"]:
+        """为上游的完整响应（200）创建缓存写入器，不适合缓存时返回 None"""
+        if not self.enabled or upstream.status_code != 200 or "Content-Encoding" in upstream.headers:
+            return None
+        length = upstream.headers.get("Content-Length")
+        if length is not None and int(length) > self.max_object_size:
+            return None
+        meta = {
+            "key": key,
+            "digest": self._digest(key),
+            "content_type": upstream.headers.get("Content-Type", "application/octet-stream"),
+            "etag": upstream.headers.get("ETag"),
+            "last_modified": upstream.headers.get("Last-Modified"),
+        }
+        return CacheWriter(self, meta, int(length) if length is not None else None)
+
+    def _write_meta(self, meta: Dict[str, Any]):
+        tmp_path = self.tmp_path(".json")
+        tmp_path.write_text(json.dumps({field: meta.get(field) for field in META_FIELDS}), encoding="utf-8")
+        os.replace(tmp_path, self._meta_path(meta["digest"]))
+
+    def _install(self, meta: Dict[str, Any], tmp_path: Path):
+        data_path = self._data_path(meta["digest"])
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, data_path)
+        self._write_meta(meta)
+        meta["path"] = str(data_path)
+
+    async def _store(self, meta: Dict[str, Any], tmp_path: Path) -> bool:
+        now = time.time()
+        meta.update(validated_at=now, used_at=now)
+        try:
+            await asyncio.to_thread(self._install, meta, tmp_path)
+        except OSError as e:
+            logger.warning(f"写入代理缓存失败: {meta['key']}: {str(e)}")
+            tmp_path.unlink(missing_ok=True)
+            return False
+        self._index(meta)
+        self.stats["stored"] += 1
+        await self._evict()
+        return True
+
+    async def store_file(self, key: str, path: Path, content_type: str, **meta) -> bool:
+        """把 tmp_path() 下生成的文件加入缓存（用于缩放后的图片）
+
+        Args:
+            meta: etag、last_modified、source_version 等元数据
+        """
+        meta.update(key=key, digest=self._digest(key), content_type=content_type)
+        try:
+            meta["size"] = (await asyncio.to_thread(path.stat)).st_size
+        except OSError:
+            return False
+        return await self._store(meta, path)
+
+    # ==================== 淘汰 ====================
+    async def _evict(self):
+        """超出字节预算时淘汰最久未使用的缓存项
+
+        内存索引只包含本进程用到的缓存项，定期按磁盘文件重新统计，多个进程合计也不超过预算。
+        """
+        victims = []
+        while self._size > self.max_bytes and self._entries:
+            digest, meta = self._entries.popitem(last=False)
+            self._size -= meta["size"]
+            victims.append(digest)
+        if victims:
+            self.stats["evicted"] += len(victims)
+            await asyncio.to_thread(self._remove_files, victims)
+
+        now = time.time()
+        if now - self._disk_checked_at < DISK_CHECK_INTERVAL:
+            return
+        self._disk_checked_at = now
+        self._disk_size, victims = await asyncio.to_thread(self._evict_disk)
+        for digest in victims:
+            self._unindex(digest)
+        self.stats["evicted"] += len(victims)
+
+    def _evict_disk(self) -> Tuple[int, List[str]]:
+        """按磁盘上的缓存文件统计总大小，超出预算时删除修改时间最早的，返回 (淘汰后的大小, 被淘汰的 digest)"""
+        files = []
+        for path in self.root.glob("??/*"):
+            if path.suffix:
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path.name))
+        total = sum(size for _, size, _ in files)
+        victims = []
+        if total > self.max_bytes:
+            files.sort()
+            for _, size, digest in files:
+                if total <= self.max_bytes:
+                    break
+                victims.append(digest)
+                total -= size
+            self._remove_files(victims)
+        return total, victims
+
+    def _remove_files(self, digests: List[str]):
+        for digest in digests:
+            # 先删元数据，其他进程不会读到没有文件的缓存项
+            self._meta_path(digest).unlink(missing_ok=True)
+            self._data_path(digest).unlink(missing_ok=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "disk_bytes": self._disk_size,
+            "max_bytes": self.max_bytes,
+            "max_object_size": self.max_object_size,
+            "in_flight": len(self._flights),
+            **self.stats,
+        }
+
+
+class CacheWriter:
+    """写入临时文件，完整接收后原子替换到缓存目录
+
+    写入过程中，其他请求可以通过 follow() 按写入进度读取同一个临时文件。
+    """
+
+    def __init__(self, cache: ProxyCache, meta: Dict[str, Any], expected_size: Optional[int]):
+        self.cache = cache
+        self.meta = meta
+        self.expected_size = expected_size
+        self.size = 0
+        self.written = 0
+        self.finished = False
+        self.failed = False
+        self._path = cache.tmp_path()
+        # 不使用缓冲区，写入的数据立即对读取者可见
+        self._file = open(self._path, "wb", buffering=0)
+        self._progress = asyncio.Event()
+
+    def _notify(self):
+        """唤醒等待新数据的读取者"""
+        event, self._progress = self._progress, asyncio.Event()
+        event.set()
+
+    def _write_all(self, chunk: bytes):
+        view = memoryview(chunk)
+        while view:
+            view = view[self._file.write(view):]
+
+    async def write(self, chunk: bytes):
+        """写入一块数据
+
+        没有 Content-Length 的响应可能在接收过程中才超过单文件上限：
+        此时继续写入，读取中的请求照常收到完整内容，只是结束后不加入缓存。
+        """
+        self.size += len(chunk)
+        await asyncio.to_thread(self._write_all, chunk)
+        self.written += len(chunk)
+        self._notify()
+
+    async def commit(self):
+        """上游响应体读取完毕：长度与 Content-Length 一致且未超过单文件上限时加入缓存"""
+        self._file.close()
+        if self.expected_size is not None and self.size != self.expected_size:
+            self.abort()
+            return
+        self.finished = True
+        self._notify()
+        if self.size > self.cache.max_object_size:
+            # 已打开的读取不受删除影响
+            logger.info(f"代理文件超过缓存上限，不缓存: {self.meta['key']}（{self.size} 字节）")
+            self._path.unlink(missing_ok=True)
+            return
+        self.meta["size"] = self.size
+        await self.cache._store(self.meta, self._path)
+
+    def abort(self):
+        """放弃写入（上游中断或文件过大）"""
+        self._file.close()
+        self.failed = True
+        self._notify()
+        self._path.unlink(missing_ok=True)
+
+    def follow(self):
+        """打开临时文件，返回按写入进度读取的异步迭代器（写入已失败时返回 None）
+
+        文件在这里立即打开，之后即使临时文件被重命名或删除，已打开的读取也不受影响；
+        临时文件刚被重命名到缓存目录时打开缓存文件。
+        """
+        if self.failed:
+            return None
+        for path in (self._path, self.cache._data_path(self.meta["digest"])):
+            try:
+                return self._follow(open(path, "rb"))
+            except FileNotFoundError:
+                continue
+        return None
+
+    async def _follow(self, f):
+        sent = 0
+        try:
+            while True:
+                progress = self._progress
+                if sent < self.written:
+                    chunk = await asyncio.to_thread(f.read, min(PROXY_CHUNK_SIZE, self.written - sent))
+                    sent += len(chunk)
+                    yield chunk
+                    continue
+                if self.failed:
+                    raise RuntimeError(f"上游下载中断: {self.meta['key']}")
+                if self.finished:
+                    return
+                await progress.wait()
+        finally:
+            f.close()
+
+
+class Flight:
+    """同一对象正在进行的上游请求，并发的未命中请求共享它的结果"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.ready = asyncio.Event()  # 收到上游响应头（或请求失败）后设置
+        self.upstream: Optional[httpx.Response] = None
+        self.writer: Optional[CacheWriter] = None
+        self.error: Optional[Exception] = None
+        self.task: Optional[asyncio.Task] = None
@@ -0,0 +1,188 @@
+"""产品全文搜索 - 内存倒排索引 + BM25 排序
+
+索引只包含启用的产品，字段按权重参与计分（名称 > SKU > 卖点 > 规格 > 简介）。
+- 与目录快照版本绑定：版本不一致时从快照全量重建（不查数据库）
+- 管理后台写产品后调用 upsert_product / remove_product 增量更新，避免整体重建
+"""
+import bisect
+import logging
+import math
+import re
+import time
+from typing import Dict, List, Optional, Tuple, Iterable
+from app.models.catalog import Product
+
+logger = logging.getLogger(__name__)
+
+# 各字段权重
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "slug": 2.0,
+    "key_features": 1.5,
+    "specs": 1.0,
+    "description": 1.0,
+}
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 中文按字切分并补充相邻二元组，其他文字按单词切分
+_CJK = "\u4e00-\u9fff"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[^\W{_CJK}_]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """将文本切分为小写词项"""
+    if not text:
+        return []
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        word = match.group()
+        if "\u4e00" <= word[0] <= "\u9fff":
+            tokens.extend(word)
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def product_field_texts(product: Product) -> Dict[str, str]:
+    """提取产品参与索引的各字段文本"""
+    specs = product.specs or {}
+    return {
+        "name": product.name or "",
+        "slug": product.slug or "",
+        "key_features": " ".join(str(f) for f in (product.key_features or [])),
+        "specs": " ".join(str(v) for v in specs.values() if v is not None),
+        "description": product.description or "",
+    }
+
+
+class SearchIndex:
+    """产品倒排索引（单进程内存，读写都在事件循环线程中完成，无需加锁）"""
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        # 词项 -> {产品 ID: 加权词频}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        # 产品 ID -> {词项: 加权词频}，用于增量删除
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        # 产品 ID -> 加权文档长度
+        self._doc_len: Dict[int, float] = {}
+        self._total_len = 0.0
+        # 有序词表（前缀匹配用），写入后延迟重建
+        self._vocabulary: Optional[List[str]] = None
+
+    @property
+    def size(self) -> int:
+        return len(self._doc_terms)
+
+    def rebuild(self, products: Iterable[Product], version: int):
+        """全量重建索引"""
+        started = time.perf_counter()
+        self._postings = {}
+        self._doc_terms = {}
+        self._doc_len = {}
+        self._total_len = 0.0
+        self._vocabulary = None
+        for product in products:
+            self._add(product)
+        self.version = version
+        elapsed = (time.perf_counter() - started) * 1000
+        logger.info(f"搜索索引已重建: version={version}, products={self.size}, terms={len(self._postings)}, 耗时 {elapsed:.1f}ms")
+
+    def upsert_product(self, product: Product, version: int):
+        """产品新增或修改后增量更新（未启用的产品会被移出索引）
+
+        只有索引恰好停留在上一个版本时才增量更新，否则保持过期状态，下次搜索时全量重建。
+        """
+        if self.version is None or self.version != version - 1:
+            return
+        self._remove(product.id)
+        if product.is_active:
+            self._add(product)
+        self.version = version
+
+    def remove_product(self, product_id: int, version: int):
+        """产品删除后增量更新"""
+        if self.version is None or self.version != version - 1:
+            return
+        self._remove(product_id)
+        self.version = version
+
+    def _add(self, product: Product):
+        terms: Dict[str, float] = {}
+        for field, text in product_field_texts(product).items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0.0) + weight
+        doc_len = sum(terms.values())
+        self._doc_terms[product.id] = terms
+        self._doc_len[product.id] = doc_len
+        self._total_len += doc_len
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[product.id] = tf
+        self._vocabulary = None
+
+    def _remove(self, product_id: int):
+        terms = self._doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        self._total_len -= self._doc_len.pop(product_id, 0.0)
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(product_id, None)
+            if not posting:
+                del self._postings[term]
+        self._vocabulary = None
+
+    def _expand_prefix(self, prefix: str, max_terms: int = 20) -> List[str]:
+        """查找以 prefix 开头的词项（用于边输入边搜索）"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        matches = []
+        for term in self._vocabulary[start:start + max_terms]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[int, float]]:
+        """BM25 检索，返回按得分降序的 (产品 ID, 得分)
+
+        查询词之间为 OR 关系；最后一个词同时按前缀匹配。
+        """
+        tokens = tokenize(query)
+        if not tokens or not self._doc_terms:
+            return []
+
+        query_terms = {token: 1.0 for token in tokens}
+        last = tokens[-1]
+        if len(last) >= 2:
+            for term in self._expand_prefix(last):
+                # 前缀扩展出的词项降权，避免压过完整匹配
+                query_terms.setdefault(term, 0.5)
+
+        doc_count = len(self._doc_terms)
+        avg_len = self._total_len / doc_count if doc_count else 1.0
+        scores: Dict[int, float] = {}
+        for term, query_weight in query_terms.items():
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for product_id, tf in posting.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[product_id] / avg_len)
+                score = query_weight * idf * tf * (BM25_K1 + 1) / (tf + norm)
+                scores[product_id] = scores.get(product_id, 0.0) + score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+
+# 全局搜索索引实例
+search_index = SearchIndex()
@@ -0,0 +1,11 @@
+"""存储后端
+
+- StorageBackend: 统一的异步存储接口
+- LocalStorageBackend: 本地文件系统
+- S3StorageBackend / AliyunOSSBackend / TencentCOSBackend: 对象存储（SDK 按需导入）
+"""
+from app.core.storage.executor import StorageExecutor, StorageTimeoutError
+from app.core.storage.base import StorageBackend
+from app.core.storage.local import LocalStorageBackend
+
+__all__ = ["StorageExecutor", "StorageTimeoutError", "StorageBackend", "LocalStorageBackend"]
@@ -0,0 +1,90 @@
+"""阿里云 OSS（oss2）"""
+import logging
+from typing import Optional, Dict, Any, List, Tuple
+from app.core.storage.executor import StorageExecutor
+from app.core.storage.remote import RemoteStorageBackend
+
+logger = logging.getLogger(__name__)
+
+
+class AliyunOSSBackend(RemoteStorageBackend):
+    """阿里云 OSS 后端"""
+
+    name = "aliyun"
+
+    def __init__(
+        self,
+        executor: StorageExecutor,
+        access_key_id: str,
+        access_key_secret: str,
+        endpoint: str,
+        bucket_name: str,
+        domain: Optional[str] = None,
+        use_https: bool = True,
+    ):
+        import oss2
+        super().__init__(executor, bucket_name, domain or f"{bucket_name}.{endpoint}", use_https)
+        self.client = oss2.Bucket(
+            oss2.Auth(access_key_id, access_key_secret),
+            f"https://{endpoint}",
+            bucket_name
+        )
+
+    def _put_object(self, key: str, body, content_type: Optional[str]):
+        headers = {'Content-Type': content_type} if content_type else {}
+        self.client.put_object(key, body, headers=headers)
+
+    def _put_multipart(self, key: str, path: str, size: int, content_type: Optional[str]):
+        import oss2
+
+        headers = {'Content-Type': content_type} if content_type else None
+        upload_id = self.client.init_multipart_upload(key, headers=headers).upload_id
+        try:
+            parts = self._upload_parts(
+                path, size, lambda part_number, data: self.client.upload_part(key, upload_id, part_number, data).etag
+            )
+            self.client.complete_multipart_upload(key, upload_id, [oss2.models.PartInfo(n, etag) for n, etag in parts])
+        except Exception:
+            self._abort_multipart_upload(key, upload_id)
+            raise
+
+    def _abort_multipart_upload(self, key: str, upload_id: str):
+        try:
+            self.client.abort_multipart_upload(key, upload_id)
+        except Exception as e:
+            logger.warning(f"取消分片上传失败: {key} ({upload_id}): {str(e)}")
+
+    def _head(self, key: str) -> Optional[Dict[str, Any]]:
+        result = self.client.head_object(key)
+        return {"size": result.content_length, "content_type": result.headers.get('Content-Type')}
+
+    def _read_range(self, key: str, start: int, end: int) -> bytes:
+        return self.client.get_object(key, byte_range=(start, end)).read()
+
+    def _download(self, key: str, path: str):
+        self.client.get_object_to_file(key, path)
+
+    def _delete(self, key: str):
+        self.client.delete_object(key)
+
+    def _delete_batch(self, keys: List[str]) -> List[str]:
+        deleted = set(self.client.batch_delete_objects(keys).deleted_keys)
+        return [key for key in keys if key not in deleted]
+
+    def _copy(self, source_key: str, target_key: str):
+        self.client.copy_object(self.bucket_name, source_key, target_key)
+
+    def _touch(self, key: str, content_type: Optional[str]):
+        # update_object_meta 即原地复制并替换元数据
+        self.client.update_object_meta(key, {'Content-Type': content_type} if content_type else {})
+
+    def _list_page(self, prefix: str, marker: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        result = self.client.list_objects(prefix=prefix, marker=marker or "", max_keys=self.BATCH_DELETE_SIZE)
+        items = [
+            {"key": obj.key, "size": obj.size, "last_modified": float(obj.last_modified)}
+            for obj in result.object_list
+        ]
+        return items, result.next_marker if result.is_truncated else None
+
+    def presign_put(self, key: str, content_type: str, expires: int, sha256: Optional[str] = None) -> Optional[str]:
+        return self.client.sign_url('PUT', key, expires, headers={'Content-Type': content_type})
@@ -0,0 +1,198 @@
+"""存储后端接口
+
+所有后端对外提供同一套异步接口，内部只需实现对应的同步操作（_put_file、_head 等），
+由基类放到后端自己的 StorageExecutor 线程池中执行，并统一处理超时、异常和日志。
+
+对象信息使用字典：
+- head: {"size", "content_type"}，存储服务保存了整个对象的 SHA-256 校验值时还有 "sha256"（十六进制）
+- 列举: {"key", "size", "last_modified"}（last_modified 为 Unix 时间戳）
+"""
+import os
+import logging
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple, Union
+from app.core.oss_config import OSS_UPLOAD_TIMEOUT
+from app.core.storage.executor import StorageExecutor, StorageTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend:
+    """存储后端基类"""
+
+    # 后端名称（日志和指标中使用）
+    name = "storage"
+    # 是否支持浏览器直传（预签名 URL）
+    supports_presign = False
+    # 直传时能否要求存储服务校验 SHA-256（校验通过的对象可以按哈希直接转为内容寻址文件）
+    supports_checksum = False
+
+    def __init__(self, executor: StorageExecutor):
+        self.executor = executor
+
+    # ==================== 需要子类实现的同步操作 ====================
+    def url_for(self, key: str) -> str:
+        """对象的访问 URL"""
+        raise NotImplementedError
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        """从访问 URL 解析对象键，不属于该后端的 URL 返回 None"""
+        raise NotImplementedError
+
+    def _put_file(self, key: str, path: str, size: int, content_type: Optional[str], move: bool):
+        raise NotImplementedError
+
+    def _head(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def _read_range(self, key: str, start: int, end: int) -> bytes:
+        raise NotImplementedError
+
+    def _download(self, key: str, path: str):
+        raise NotImplementedError
+
+    def _delete(self, key: str):
+        raise NotImplementedError
+
+    def _delete_batch(self, keys: List[str]) -> List[str]:
+        """删除一批对象（不超过 BATCH_DELETE_SIZE 个），返回删除失败的对象键"""
+        raise NotImplementedError
+
+    def _copy(self, source_key: str, target_key: str):
+        raise NotImplementedError
+
+    def _touch(self, key: str, content_type: Optional[str]):
+        raise NotImplementedError
+
+    def _list_page(self, prefix: str, marker: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """列举一页对象，返回 (对象列表, 下一页标记)；没有下一页时标记为 None"""
+        raise NotImplementedError
+
+    def presign_put(self, key: str, content_type: str, expires: int, sha256: Optional[str] = None) -> Optional[str]:
+        """生成预签名 PUT URL（只做本地签名计算），不支持时返回 None
+
+        Args:
+            sha256: 文件的 SHA-256（十六进制），supports_checksum 的后端把它签入 URL，
+                上传时必须带上 checksum_headers() 返回的请求头，内容不一致时存储服务拒绝上传
+        """
+        return None
+
+    def checksum_headers(self, sha256: str) -> Dict[str, str]:
+        """直传时携带的校验请求头（与 presign_put 的 sha256 对应），不支持时返回空字典"""
+        return {}
+
+    def _is_not_found(self, error: Exception) -> bool:
+        return isinstance(error, FileNotFoundError)
+
+    # ==================== 异步接口 ====================
+    # 批量删除单次最多 1000 个对象（各家对象存储的上限）
+    BATCH_DELETE_SIZE = 1000
+
+    async def put_file(self, key: str, path: Union[str, Path], content_type: Optional[str] = None, move: bool = False) -> Optional[str]:
+        """保存本地文件到 key，返回访问 URL（失败或超时返回 None）
+
+        Args:
+            move: 允许直接移动源文件（本地后端使用；远程后端上传后源文件保持不变）
+        """
+        try:
+            size = os.path.getsize(path)
+            await self.executor.run("put", self._put_file, key, str(path), size, content_type, move, timeout=OSS_UPLOAD_TIMEOUT)
+            return self.url_for(key)
+        except StorageTimeoutError:
+            return None
+        except Exception as e:
+            logger.error(f"[{self.name}] 保存文件失败: {key}: {str(e)}")
+            return None
+
+    async def head(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取对象的大小和类型，对象不存在、失败或超时返回 None"""
+        try:
+            return await self.executor.run("head", self._head, key)
+        except StorageTimeoutError:
+            return None
+        except Exception as e:
+            if self._is_not_found(e):
+                logger.debug(f"[{self.name}] 对象不存在: {key}")
+            else:
+                logger.warning(f"[{self.name}] 获取对象信息失败: {key}: {str(e)}")
+            return None
+
+    async def read_range(self, key: str, start: int, end: int) -> Optional[bytes]:
+        """读取对象的 [start, end] 字节（失败或超时返回 None）"""
+        try:
+            return await self.executor.run("read", self._read_range, key, start, end)
+        except StorageTimeoutError:
+            return None
+        except Exception as e:
+            logger.warning(f"[{self.name}] 读取对象失败: {key}: {str(e)}")
+            return None
+
+    async def download(self, key: str, path: Union[str, Path]) -> bool:
+        """下载对象到本地文件"""
+        try:
+            await self.executor.run("download", self._download, key, str(path), timeout=OSS_UPLOAD_TIMEOUT)
+            return True
+        except StorageTimeoutError:
+            return False
+        except Exception as e:
+            logger.error(f"[{self.name}] 下载对象失败: {key}: {str(e)}")
+            return False
+
+    async def delete(self, key: str) -> bool:
+        """删除对象"""
+        try:
+            await self.executor.run("delete", self._delete, key)
+            return True
+        except StorageTimeoutError:
+            return False
+        except Exception as e:
+            logger.error(f"[{self.name}] 删除对象失败: {key}: {str(e)}")
+            return False
+
+    async def delete_many(self, keys: List[str]) -> List[str]:
+        """批量删除对象，返回删除失败的对象键"""
+        failed: List[str] = []
+        for start in range(0, len(keys), self.BATCH_DELETE_SIZE):
+            batch = keys[start:start + self.BATCH_DELETE_SIZE]
+            try:
+                failed.extend(await self.executor.run("batch_delete", self._delete_batch, batch))
+            except StorageTimeoutError:
+                failed.extend(batch)
+            except Exception as e:
+                logger.error(f"[{self.name}] 批量删除失败（{len(batch)} 个对象）: {str(e)}")
+                failed.extend(batch)
+        if keys:
+            if failed:
+                logger.warning(f"[{self.name}] 批量删除: {len(keys) - len(failed)} 个成功, {len(failed)} 个失败")
+            else:
+                logger.info(f"[{self.name}] 批量删除成功: {len(keys)} 个对象")
+        return failed
+
+    async def copy(self, source_key: str, target_key: str):
+        """在后端内复制对象（不经过应用服务器），失败抛出异常"""
+        await self.executor.run("copy", self._copy, source_key, target_key)
+
+    async def touch(self, key: str, content_type: Optional[str] = None) -> bool:
+        """刷新对象的最后修改时间（失败返回 False）"""
+        try:
+            await self.executor.run("touch", self._touch, key, content_type)
+            return True
+        except Exception as e:
+            logger.warning(f"[{self.name}] 刷新对象修改时间失败: {key}: {str(e)}")
+            return False
+
+    async def iter_pages(self, prefix: str):
+        """逐页列举 prefix 下的对象（每次产出一页，内存占用与对象总数无关）"""
+        marker = None
+        while True:
+            items, marker = await self.executor.run("list", self._list_page, prefix, marker)
+            if items:
+                yield items
+            if not marker:
+                return
+
+    def metrics(self) -> Dict[str, Any]:
+        return self.executor.metrics()
+
+    def shutdown(self):
+        self.executor.shutdown()
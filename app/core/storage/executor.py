@@ -0,0 +1,149 @@
+"""存储调用线程池 - 在有界线程池中执行阻塞的存储操作，带超时和耗时统计"""
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Dict, Any
+from app.core.oss_config import OSS_CALL_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# 默认调用超时（秒）
+STORAGE_CALL_TIMEOUT = OSS_CALL_TIMEOUT
+
+
+class StorageTimeoutError(Exception):
+    """存储调用超时"""
+
+
+class StorageExecutor:
+    """存储后端阻塞调用（SDK、文件系统）专用的有界线程池
+
+    - 线程数固定为 max_workers，排队 + 执行中的调用不超过 max_pending，超出时调用方异步等待
+    - 每次调用有超时（包括排队时间）；超时后线程中的 SDK 调用无法中断，会继续执行完，
+      但占用的名额直到真正结束才释放，保证线程池不会被超时调用撑爆
+    - 每个存储后端使用独立的线程池，可以分别调整线程数并对比指标
+    - 记录排队深度和各操作的耗时统计
+    """
+
+    LATENCY_SAMPLES = 200
+
+    def __init__(self, max_workers: int, max_pending: int, name: str = "storage"):
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.name = name
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._waiting = 0  # 等待名额
+        self._queued = 0  # 已提交、等待线程
+        self._running = 0  # 执行中
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        return self._slots
+
+    def _record(self, op: str, elapsed: float, queue_wait: float, outcome: str):
+        with self._lock:
+            stats = self._stats.setdefault(op, {
+                "calls": 0, "errors": 0, "timeouts": 0,
+                "total_ms": 0.0, "max_ms": 0.0, "queue_wait_ms": 0.0,
+                "samples": deque(maxlen=self.LATENCY_SAMPLES),
+            })
+            ms = elapsed * 1000
+            stats["calls"] += 1
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+            stats["queue_wait_ms"] += queue_wait * 1000
+            stats["samples"].append(ms)
+            if outcome == "error":
+                stats["errors"] += 1
+            elif outcome == "timeout":
+                stats["timeouts"] += 1
+
+    async def run(self, op: str, fn: Callable, *args, timeout: float = STORAGE_CALL_TIMEOUT, **kwargs):
+        """在线程池中执行 fn，超时抛出 StorageTimeoutError"""
+        loop = asyncio.get_running_loop()
+        slots = self._get_slots()
+        submitted = time.perf_counter()
+        started = [None]
+
+        def call():
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            started[0] = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                # 名额在 SDK 调用真正结束后才释放
+                loop.call_soon_threadsafe(slots.release)
+
+        async def acquire_and_call():
+            self._waiting += 1
+            try:
+                await slots.acquire()
+            finally:
+                self._waiting -= 1
+            with self._lock:
+                self._queued += 1
+            try:
+                future = loop.run_in_executor(self._executor, call)
+            except BaseException:
+                with self._lock:
+                    self._queued -= 1
+                slots.release()
+                raise
+            # 超时取消只影响等待方，不会取消线程中的调用
+            return await asyncio.shield(future)
+
+        outcome = "ok"
+        try:
+            return await asyncio.wait_for(acquire_and_call(), timeout=timeout)
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            logger.error(f"存储调用超时: {self.name}.{op}（{timeout:g}s）")
+            raise StorageTimeoutError(f"存储调用超时: {self.name}.{op}")
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            finished = time.perf_counter()
+            queue_wait = (started[0] or finished) - submitted
+            self._record(op, finished - submitted, queue_wait, outcome)
+
+    def metrics(self) -> Dict[str, Any]:
+        """线程池状态和各操作耗时统计"""
+        with self._lock:
+            operations = {}
+            for op, stats in self._stats.items():
+                samples = sorted(stats["samples"])
+                calls = stats["calls"]
+                operations[op] = {
+                    "calls": calls,
+                    "errors": stats["errors"],
+                    "timeouts": stats["timeouts"],
+                    "avg_ms": round(stats["total_ms"] / calls, 1) if calls else 0.0,
+                    "avg_queue_wait_ms": round(stats["queue_wait_ms"] / calls, 1) if calls else 0.0,
+                    "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1) if samples else 0.0,
+                    "max_ms": round(stats["max_ms"], 1),
+                }
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "waiting": self._waiting,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "operations": operations,
+            }
+
+    def shutdown(self):
+        """关闭线程池（不等待执行中的调用）"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,129 @@
+"""本地文件系统后端（static/uploads，通过 /uploads 静态路由访问）
+
+OSS 未启用或上传失败时使用；也可以在测试中代替对象存储。
+"""
+import os
+import shutil
+import mimetypes
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+from app.core.config import LOCAL_STORAGE_WORKERS
+from app.core.storage.base import StorageBackend
+from app.core.storage.executor import StorageExecutor
+
+
+class LocalStorageBackend(StorageBackend):
+    """本地目录后端，对象键即相对 root 的路径"""
+
+    name = "local"
+
+    def __init__(self, root: Path, url_prefix: str = "/uploads", executor: Optional[StorageExecutor] = None):
+        super().__init__(executor or StorageExecutor(LOCAL_STORAGE_WORKERS, LOCAL_STORAGE_WORKERS * 8, name="local"))
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/")
+
+    def path_for(self, key: str) -> Path:
+        """对象键对应的文件路径（键越出 root 时抛出 ValueError）"""
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"无效的对象键: {key}")
+        return path
+
+    def url_for(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        if not url.startswith(f"{self.url_prefix}/"):
+            return None
+        key = url[len(self.url_prefix) + 1:].split("?", 1)[0]
+        try:
+            self.path_for(key)
+        except ValueError:
+            return None
+        return key
+
+    def _put_file(self, key: str, path: str, size: int, content_type: Optional[str], move: bool):
+        target = self.path_for(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if move:
+            # 同一文件系统内为原子重命名，跨文件系统时复制
+            shutil.move(path, str(target))
+        else:
+            shutil.copyfile(path, str(target))
+
+    def _head(self, key: str) -> Optional[Dict[str, Any]]:
+        stat = self.path_for(key).stat()
+        return {"size": stat.st_size, "content_type": mimetypes.guess_type(key)[0]}
+
+    def _read_range(self, key: str, start: int, end: int) -> bytes:
+        with open(self.path_for(key), "rb") as f:
+            f.seek(start)
+            return f.read(end - start + 1)
+
+    def _download(self, key: str, path: str):
+        shutil.copyfile(str(self.path_for(key)), path)
+
+    def _delete(self, key: str):
+        path = self.path_for(key)
+        path.unlink(missing_ok=True)
+        self._prune(path.parent)
+
+    def _delete_batch(self, keys: List[str]) -> List[str]:
+        failed = []
+        for key in keys:
+            try:
+                self._delete(key)
+            except (OSError, ValueError):
+                failed.append(key)
+        return failed
+
+    def _prune(self, directory: Path):
+        """删除因删除文件而变空的目录（不删除 root）"""
+        root = self.root.resolve()
+        while directory != root and root in directory.parents:
+            try:
+                directory.rmdir()
+            except OSError:
+                return
+            directory = directory.parent
+
+    def _copy(self, source_key: str, target_key: str):
+        target = self.path_for(target_key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(str(self.path_for(source_key)), str(target))
+
+    def _touch(self, key: str, content_type: Optional[str]):
+        os.utime(self.path_for(key))
+
+    def _list_all(self, prefix: str) -> List[Dict[str, Any]]:
+        root = self.root.resolve()
+        base = (root / prefix).resolve()
+        # 前缀可能是目录（media/）或文件名的一部分，从所在目录开始遍历再按前缀过滤
+        start = base if prefix.endswith("/") or base.is_dir() else base.parent
+        if not start.is_dir() or (start != root and root not in start.parents):
+            return []
+        items = []
+        for dirpath, _, filenames in os.walk(start):
+            for filename in filenames:
+                path = Path(dirpath) / filename
+                key = path.relative_to(root).as_posix()
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                items.append({"key": key, "size": stat.st_size, "last_modified": stat.st_mtime})
+        items.sort(key=lambda item: item["key"])
+        return items
+
+    def _list_page(self, prefix: str, marker: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        items = [item for item in self._list_all(prefix) if marker is None or item["key"] > marker]
+        page = items[:self.BATCH_DELETE_SIZE]
+        return page, page[-1]["key"] if len(items) > len(page) else None
+
+    async def iter_pages(self, prefix: str):
+        # 目录只遍历一次，再按页产出（避免每页重新遍历）
+        items = await self.executor.run("list", self._list_all, prefix)
+        for start in range(0, len(items), self.BATCH_DELETE_SIZE):
+            yield items[start:start + self.BATCH_DELETE_SIZE]
@@ -0,0 +1,131 @@
+"""对象存储后端的公共部分：访问 URL、分片并发上传、404 判断
+
+分片由每个后端共用的一个分片线程池上传（OSS_MULTIPART_CONCURRENCY 个线程）：
+同时进行多个分片上传时总线程数仍然有界，不会随 StorageExecutor 的线程数成倍增加。
+"""
+import math
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Callable, List, Tuple
+from app.core.oss_config import (
+    OSS_MULTIPART_THRESHOLD,
+    OSS_MULTIPART_PART_SIZE,
+    OSS_MULTIPART_CONCURRENCY,
+    OSS_MULTIPART_RETRIES,
+)
+from app.core.storage.base import StorageBackend
+from app.core.storage.executor import StorageExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteStorageBackend(StorageBackend):
+    """对象存储后端基类（SDK 客户端为同步接口，在线程池中调用）"""
+
+    supports_presign = True
+
+    def __init__(self, executor: StorageExecutor, bucket_name: str, host: str, use_https: bool = True):
+        """
+        Args:
+            host: 访问域名（自定义域名或 Bucket 默认域名，不含协议）
+        """
+        super().__init__(executor)
+        self.bucket_name = bucket_name
+        self.host = host
+        self.use_https = use_https
+        # 所有分片上传共用，线程数不随并发上传数增加
+        self._part_pool = ThreadPoolExecutor(
+            max_workers=max(1, OSS_MULTIPART_CONCURRENCY), thread_name_prefix=f"{self.name}-part"
+        )
+
+    def url_for(self, key: str) -> str:
+        protocol = "https" if self.use_https else "http"
+        return f"{protocol}://{self.host}/{key}"
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        # 不校验域名：更换过自定义域名时，旧 URL 仍然对应同一个对象
+        if "://" not in url:
+            return None
+        path = url.split("://", 1)[1].split("/", 1)
+        if len(path) < 2 or not path[1]:
+            return None
+        return path[1].split("?", 1)[0]
+
+    def _is_not_found(self, error: Exception) -> bool:
+        # oss2: OssError.status；boto3: ClientError.response；qcloud_cos: CosServiceError.get_status_code()
+        if getattr(error, 'status', None) == 404:
+            return True
+        response = getattr(error, 'response', None)
+        if isinstance(response, dict) and response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return True
+        get_status_code = getattr(error, 'get_status_code', None)
+        return callable(get_status_code) and get_status_code() == 404
+
+    # ==================== 上传 ====================
+    def _put_file(self, key: str, path: str, size: int, content_type: Optional[str], move: bool):
+        """小文件单次上传，超过 OSS_MULTIPART_THRESHOLD 时分片并发上传"""
+        if size < OSS_MULTIPART_THRESHOLD:
+            with open(path, "rb") as f:
+                self._put_object(key, f, content_type)
+            return
+        started = time.perf_counter()
+        self._put_multipart(key, path, size, content_type)
+        elapsed = time.perf_counter() - started
+        logger.info(f"[{self.name}] 分片上传完成: {key}, {size} 字节, 耗时 {elapsed:.1f}s")
+
+    def _put_object(self, key: str, body, content_type: Optional[str]):
+        raise NotImplementedError
+
+    def _put_multipart(self, key: str, path: str, size: int, content_type: Optional[str]):
+        raise NotImplementedError
+
+    def _upload_parts(self, path: str, size: int, upload_part: Callable[[int, bytes], str]) -> List[Tuple[int, str]]:
+        """在共用的分片线程池中并发上传各分片，单个分片失败时只重试该分片
+
+        Args:
+            path: 本地文件路径
+            size: 文件大小
+            upload_part: (分片号, 分片内容) -> ETag
+
+        Returns:
+            按分片号排序的 [(分片号, ETag)]
+        """
+        part_count = math.ceil(size / OSS_MULTIPART_PART_SIZE)
+
+        def send(part_number: int) -> Tuple[int, str]:
+            # 分片开始上传时才读取，内存占用不超过 分片线程数 × 分片大小
+            with open(path, "rb") as f:
+                f.seek((part_number - 1) * OSS_MULTIPART_PART_SIZE)
+                data = f.read(OSS_MULTIPART_PART_SIZE)
+            for attempt in range(1, OSS_MULTIPART_RETRIES + 1):
+                try:
+                    return part_number, upload_part(part_number, data)
+                except Exception as e:
+                    if attempt >= OSS_MULTIPART_RETRIES:
+                        raise
+                    logger.warning(f"分片 {part_number}/{part_count} 上传失败（第 {attempt} 次）: {str(e)}，重试中")
+                    time.sleep(0.5 * 2 ** (attempt - 1))
+
+        parts = []
+        futures = [self._part_pool.submit(send, n) for n in range(1, part_count + 1)]
+        try:
+            for future in as_completed(futures):
+                parts.append(future.result())
+        except Exception:
+            # 有分片重试后仍失败，取消尚未开始的分片
+            for future in futures:
+                future.cancel()
+            raise
+        return sorted(parts)
+
+    def shutdown(self):
+        super().shutdown()
+        self._part_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _abort_multipart_upload(self, key: str, upload_id: str):
+        """放弃分片上传，释放已上传的分片（失败只记录日志；腾讯云和 S3 的参数相同）"""
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket_name, Key=key, UploadId=upload_id)
+        except Exception as e:
+            logger.warning(f"取消分片上传失败: {key} ({upload_id}): {str(e)}")
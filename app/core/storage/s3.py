@@ -0,0 +1,145 @@
+"""AWS S3 及 S3 兼容服务（MinIO 等，通过 endpoint_url 指定）
+
+浏览器直传时把 SHA-256 签入预签名 URL（x-amz-checksum-sha256），由 S3 校验上传内容；
+服务器确认直传时从 head 读取 S3 保存的校验值，不需要下载对象重新计算。
+"""
+import base64
+import binascii
+from typing import Optional, Dict, Any, List, Tuple
+from app.core.storage.executor import StorageExecutor
+from app.core.storage.remote import RemoteStorageBackend
+
+
+class S3StorageBackend(RemoteStorageBackend):
+    """S3 后端（boto3）"""
+
+    name = "aws"
+    supports_checksum = True
+
+    def __init__(
+        self,
+        executor: StorageExecutor,
+        access_key_id: str,
+        secret_access_key: str,
+        region: str,
+        bucket_name: str,
+        domain: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        use_https: bool = True,
+    ):
+        import boto3
+        from botocore.config import Config
+        super().__init__(executor, bucket_name, domain or f"{bucket_name}.s3.{region}.amazonaws.com", use_https)
+        self.client = boto3.client(
+            's3',
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            region_name=region,
+            endpoint_url=endpoint_url or None,
+            # 校验请求头只有 SigV4 会签入预签名 URL
+            config=Config(signature_version="s3v4")
+        )
+
+    def _put_object(self, key: str, body, content_type: Optional[str]):
+        extra_args = {'ContentType': content_type} if content_type else {}
+        self.client.put_object(Bucket=self.bucket_name, Key=key, Body=body, **extra_args)
+
+    def _put_multipart(self, key: str, path: str, size: int, content_type: Optional[str]):
+        extra_args = {'ContentType': content_type} if content_type else {}
+        response = self.client.create_multipart_upload(Bucket=self.bucket_name, Key=key, **extra_args)
+        upload_id = response['UploadId']
+        try:
+            parts = self._upload_parts(path, size, lambda part_number, data: self.client.upload_part(
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=data,
+                PartNumber=part_number,
+                UploadId=upload_id
+            )['ETag'])
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': [{'ETag': etag, 'PartNumber': n} for n, etag in parts]}
+            )
+        except Exception:
+            self._abort_multipart_upload(key, upload_id)
+            raise
+
+    def _head(self, key: str) -> Optional[Dict[str, Any]]:
+        result = self.client.head_object(Bucket=self.bucket_name, Key=key, ChecksumMode="ENABLED")
+        info = {"size": result['ContentLength'], "content_type": result.get('ContentType')}
+        sha256 = _checksum_to_hex(result.get('ChecksumSHA256'))
+        if sha256:
+            info["sha256"] = sha256
+        return info
+
+    def _read_range(self, key: str, start: int, end: int) -> bytes:
+        result = self.client.get_object(Bucket=self.bucket_name, Key=key, Range=f"bytes={start}-{end}")
+        return result['Body'].read()
+
+    def _download(self, key: str, path: str):
+        self.client.download_file(self.bucket_name, key, path)
+
+    def _delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket_name, Key=key)
+
+    def _delete_batch(self, keys: List[str]) -> List[str]:
+        result = self.client.delete_objects(
+            Bucket=self.bucket_name,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True}
+        )
+        return [error["Key"] for error in result.get("Errors", [])]
+
+    def _copy(self, source_key: str, target_key: str):
+        self.client.copy_object(
+            CopySource={"Bucket": self.bucket_name, "Key": source_key},
+            Bucket=self.bucket_name,
+            Key=target_key
+        )
+
+    def _touch(self, key: str, content_type: Optional[str]):
+        # 原地复制必须替换元数据，否则 S3 拒绝请求
+        self.client.copy_object(
+            CopySource={"Bucket": self.bucket_name, "Key": key},
+            Bucket=self.bucket_name,
+            Key=key,
+            MetadataDirective="REPLACE",
+            **({"ContentType": content_type} if content_type else {})
+        )
+
+    def _list_page(self, prefix: str, marker: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        kwargs = {"Bucket": self.bucket_name, "Prefix": prefix, "MaxKeys": self.BATCH_DELETE_SIZE}
+        if marker:
+            kwargs["ContinuationToken"] = marker
+        result = self.client.list_objects_v2(**kwargs)
+        items = [
+            {"key": obj["Key"], "size": obj["Size"], "last_modified": obj["LastModified"].timestamp()}
+            for obj in result.get("Contents", [])
+        ]
+        return items, result.get("NextContinuationToken") if result.get("IsTruncated") else None
+
+    def presign_put(self, key: str, content_type: str, expires: int, sha256: Optional[str] = None) -> Optional[str]:
+        params = {'Bucket': self.bucket_name, 'Key': key, 'ContentType': content_type}
+        if sha256:
+            params['ChecksumSHA256'] = _hex_to_checksum(sha256)
+        return self.client.generate_presigned_url('put_object', Params=params, ExpiresIn=expires)
+
+    def checksum_headers(self, sha256: str) -> Dict[str, str]:
+        return {'x-amz-checksum-sha256': _hex_to_checksum(sha256)}
+
+
+def _hex_to_checksum(sha256: str) -> str:
+    """十六进制 SHA-256 转为 S3 校验值格式（Base64）"""
+    return base64.b64encode(bytes.fromhex(sha256)).decode("ascii")
+
+
+def _checksum_to_hex(checksum: Optional[str]) -> Optional[str]:
+    """S3 保存的整个对象的 SHA-256 校验值转为十六进制（分片上传的组合校验值形如 "xxx-3"，不是文件哈希，返回 None）"""
+    if not checksum or "-" in checksum:
+        return None
+    try:
+        digest = base64.b64decode(checksum, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return digest.hex() if len(digest) == 32 else None
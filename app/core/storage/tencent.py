@@ -0,0 +1,127 @@
+"""腾讯云 COS（cos-python-sdk-v5）"""
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+from app.core.storage.executor import StorageExecutor
+from app.core.storage.remote import RemoteStorageBackend
+
+
+class TencentCOSBackend(RemoteStorageBackend):
+    """腾讯云 COS 后端"""
+
+    name = "tencent"
+
+    def __init__(
+        self,
+        executor: StorageExecutor,
+        secret_id: str,
+        secret_key: str,
+        region: str,
+        bucket_name: str,
+        domain: Optional[str] = None,
+        use_https: bool = True,
+    ):
+        from qcloud_cos import CosConfig
+        from qcloud_cos import CosS3Client
+        super().__init__(executor, bucket_name, domain or f"{bucket_name}.cos.{region}.myqcloud.com", use_https)
+        self.region = region
+        self.client = CosS3Client(CosConfig(
+            Region=region,
+            SecretId=secret_id,
+            SecretKey=secret_key,
+            Scheme='https' if use_https else 'http'
+        ))
+
+    def _put_object(self, key: str, body, content_type: Optional[str]):
+        self.client.put_object(
+            Bucket=self.bucket_name,
+            Body=body,
+            Key=key,
+            ContentType=content_type or 'application/octet-stream'
+        )
+
+    def _put_multipart(self, key: str, path: str, size: int, content_type: Optional[str]):
+        response = self.client.create_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=key,
+            ContentType=content_type or 'application/octet-stream'
+        )
+        upload_id = response['UploadId']
+        try:
+            parts = self._upload_parts(path, size, lambda part_number, data: self.client.upload_part(
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=data,
+                PartNumber=part_number,
+                UploadId=upload_id
+            )['ETag'])
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={'Part': [{'ETag': etag, 'PartNumber': n} for n, etag in parts]}
+            )
+        except Exception:
+            self._abort_multipart_upload(key, upload_id)
+            raise
+
+    def _head(self, key: str) -> Optional[Dict[str, Any]]:
+        result = self.client.head_object(Bucket=self.bucket_name, Key=key)
+        return {"size": int(result['Content-Length']), "content_type": result.get('Content-Type')}
+
+    def _read_range(self, key: str, start: int, end: int) -> bytes:
+        result = self.client.get_object(Bucket=self.bucket_name, Key=key, Range=f"bytes={start}-{end}")
+        return result['Body'].get_raw_stream().read()
+
+    def _download(self, key: str, path: str):
+        result = self.client.get_object(Bucket=self.bucket_name, Key=key)
+        result['Body'].get_stream_to_file(path)
+
+    def _delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket_name, Key=key)
+
+    def _delete_batch(self, keys: List[str]) -> List[str]:
+        result = self.client.delete_objects(
+            Bucket=self.bucket_name,
+            Delete={"Object": [{"Key": key} for key in keys], "Quiet": "true"}
+        )
+        return [error["Key"] for error in result.get("Error", [])]
+
+    def _copy_source(self, key: str) -> Dict[str, str]:
+        return {"Bucket": self.bucket_name, "Key": key, "Region": self.region}
+
+    def _copy(self, source_key: str, target_key: str):
+        self.client.copy_object(Bucket=self.bucket_name, Key=target_key, CopySource=self._copy_source(source_key))
+
+    def _touch(self, key: str, content_type: Optional[str]):
+        self.client.copy_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            CopySource=self._copy_source(key),
+            CopyStatus="Replaced",
+            **({"ContentType": content_type} if content_type else {})
+        )
+
+    def _list_page(self, prefix: str, marker: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        result = self.client.list_objects(
+            Bucket=self.bucket_name, Prefix=prefix, Marker=marker or "", MaxKeys=self.BATCH_DELETE_SIZE
+        )
+        items = [
+            {
+                "key": obj["Key"],
+                "size": int(obj["Size"]),
+                "last_modified": datetime.fromisoformat(obj["LastModified"].replace("Z", "+00:00")).timestamp(),
+            }
+            for obj in result.get("Contents", [])
+        ]
+        if str(result.get("IsTruncated", "false")).lower() != "true":
+            return items, None
+        return items, result.get("NextMarker") or (items[-1]["key"] if items else None)
+
+    def presign_put(self, key: str, content_type: str, expires: int, sha256: Optional[str] = None) -> Optional[str]:
+        return self.client.get_presigned_url(
+            Bucket=self.bucket_name,
+            Key=key,
+            Method='PUT',
+            Expired=expires,
+            Headers={'Content-Type': content_type}
+        )
@@ -0,0 +1,181 @@
+"""上传文件接收 - 分块读取、边读边校验大小和文件类型
+
+上传内容按 UPLOAD_CHUNK_SIZE 分块写入临时文件（写盘在线程中执行），单个上传的内存占用不超过一个分块；
+超过大小限制或文件头与声明类型不符时立即中止并删除临时文件。
+"""
+import asyncio
+import os
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Optional, Iterable
+from fastapi import HTTPException, UploadFile, status
+from app.core.config import UPLOAD_CHUNK_SIZE, UPLOAD_MAX_IMAGE_SIZE, UPLOAD_MAX_VIDEO_SIZE
+
+logger = logging.getLogger(__name__)
+
+# 识别文件类型所需的文件头长度
+SNIFF_SIZE = 16
+# 旧版 QuickTime 文件可能以这些 atom 开头（没有 ftyp）
+QUICKTIME_ATOMS = {b"moov", b"mdat", b"wide", b"free", b"skip", b"pnot"}
+
+# 文件头识别出的“格式族”与声明的 MIME 类型对应关系
+COMPATIBLE_TYPES = {
+    "image/jpeg": {"image/jpeg"},
+    "image/png": {"image/png"},
+    "image/gif": {"image/gif"},
+    "image/webp": {"image/webp"},
+    # MP4 与 MOV 都是 ISO BMFF（ftyp），文件头无法可靠区分
+    "video/iso-bmff": {"video/mp4", "video/quicktime"},
+    # 没有 ftyp 的旧版 QuickTime 文件（第一个 atom 为 moov、mdat、wide 等）
+    "video/quicktime": {"video/quicktime", "video/mp4"},
+    "video/webm": {"video/webm"},
+    "video/x-msvideo": {"video/x-msvideo"},
+    "video/ogg": {"video/ogg"},
+}
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """根据文件头识别格式，无法识别时返回 None"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return "video/x-msvideo"
+    if head[4:8] == b"ftyp":
+        return "video/iso-bmff"
+    if head[4:8] in QUICKTIME_ATOMS:
+        return "video/quicktime"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "video/webm"
+    if head.startswith(b"OggS"):
+        return "video/ogg"
+    return None
+
+
+def max_size_for(content_type: Optional[str]) -> int:
+    """按声明的类型返回大小上限"""
+    if content_type and content_type.startswith("video/"):
+        return UPLOAD_MAX_VIDEO_SIZE
+    return UPLOAD_MAX_IMAGE_SIZE
+
+
+class ReceivedUpload:
+    """已接收到本地临时文件的上传"""
+
+    def __init__(self, path: Path, size: int, content_type: str, sha256: str):
+        self.path = path
+        self.size = size
+        self.content_type = content_type
+        # 内容哈希（十六进制），接收过程中逐块计算
+        self.sha256 = sha256
+
+    def discard(self):
+        """删除临时文件（已移动时忽略）"""
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _write_chunk(buffer, digest, chunk: bytes):
+    buffer.write(chunk)
+    digest.update(chunk)
+
+
+def _sync_file(buffer):
+    buffer.flush()
+    os.fsync(buffer.fileno())
+
+
+async def receive_upload(
+    file: UploadFile,
+    incoming_dir: Path,
+    allowed_types: Iterable[str],
+    max_size: Optional[int] = None,
+) -> ReceivedUpload:
+    """分块接收上传文件到 incoming_dir 下的临时文件
+
+    Args:
+        file: 上传文件
+        incoming_dir: 临时目录（与最终目录在同一文件系统时可原子移动）
+        allowed_types: 允许的 MIME 类型
+        max_size: 大小上限（字节），默认按类型取 UPLOAD_MAX_IMAGE_SIZE / UPLOAD_MAX_VIDEO_SIZE
+    """
+    allowed_types = set(allowed_types)
+    if file.content_type not in allowed_types:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"不支持的文件类型: {file.content_type}"
+        )
+    if max_size is None:
+        max_size = max_size_for(file.content_type)
+
+    incoming_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=incoming_dir, suffix=".part")
+    tmp_path = Path(tmp_name)
+    # mkstemp 创建的文件权限为 0600，保存到本地后需要能被静态文件服务读取
+    os.chmod(tmp_path, 0o644)
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        await file.seek(0)
+        with os.fdopen(fd, "wb") as buffer:
+            head = b""
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                # 第一个分块到达时校验文件头
+                if len(head) < SNIFF_SIZE:
+                    head += chunk[:SNIFF_SIZE - len(head)]
+                    if len(head) >= SNIFF_SIZE or len(chunk) < UPLOAD_CHUNK_SIZE:
+                        check_content_type(file.content_type, head)
+
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"文件过大，最大允许 {max_size / 1024 / 1024:.0f}MB"
+                    )
+                # 写盘和计算哈希都在线程中执行，大文件上传不阻塞事件循环
+                await asyncio.to_thread(_write_chunk, buffer, digest, chunk)
+
+            if size == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="文件内容为空"
+                )
+            await asyncio.to_thread(_sync_file, buffer)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    logger.info(f"上传已接收: {file.filename}, {size} 字节, 临时文件 {tmp_path.name}")
+    return ReceivedUpload(tmp_path, size, file.content_type, digest.hexdigest())
+
+
+def file_sha256(path: Path) -> str:
+    """分块计算文件的 SHA-256（十六进制），在线程中调用"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def check_content_type(declared: Optional[str], head: bytes):
+    """校验文件头与声明的类型一致"""
+    sniffed = sniff_content_type(head)
+    if sniffed is None or declared not in COMPATIBLE_TYPES.get(sniffed, set()):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"文件内容与声明的类型不符: {declared}"
+        )
@@ -5,9 +5,8 @@ from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
 from pathlib import Path
 import os
-from app.core.config import SECRET_KEY
+from app.core.config import SECRET_KEY, AUTO_MIGRATE
 from app.core.database import engine
-from app.models.base import Base
 from app.api.routes import router
 from app.api.auth import router as auth_router
 from app.api.admin import router as admin_router
@@ -166,19 +165,44 @@ else:
 @app.on_event("startup")
 async def startup():
     """启动时初始化数据库"""
-    # 创建数据库表
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    print("✅ 数据库表已创建")
+    # 检查表结构版本（只读取版本号，落后时才执行迁移）
+    from app.core.migrations import ensure_schema
+    version = await ensure_schema(engine, auto_migrate=AUTO_MIGRATE)
+    print(f"✅ 数据库表结构版本: {version}")
     
     # 初始化默认管理员账户
-    from app.core.init_db import init_default_admin
+    from app.core.init_db import init_default_admin, init_tag_product_counts
     await init_default_admin()
+    
+    # 校正标签的启用产品数量
+    await init_tag_product_counts()
+    
+    # 创建 OSS 代理共享 HTTP 客户端
+    from app.core.http_client import proxy_http_client
+    proxy_http_client.start()
+    
+    # 启动媒体清理任务
+    from app.api.admin import media_sweeper
+    media_sweeper.start()
 
 
 @app.on_event("shutdown")
 async def shutdown():
     """关闭时清理"""
+    from app.api.admin import media_sweeper, image_variants, media_store
+    await media_sweeper.stop()
+    
+    from app.core.http_client import proxy_http_client
+    from app.api.proxy import image_transformer
+    await proxy_http_client.close()
+    image_transformer.shutdown()
+    
     await engine.dispose()
     print("✅ 数据库连接已关闭")
+    
+    from app.core.oss_service import oss_service
+    oss_service.shutdown()
+    media_store.local.shutdown()
+    
+    image_variants.shutdown()
 
@@ -3,6 +3,7 @@ from app.models.base import Base
 from app.models.catalog import Category, Product, Tag
 from app.models.content import HeroSlide
 from app.models.admin import Admin
+from app.models.media import MediaVariant
 
-__all__ = ["Base", "Category", "Product", "Tag", "HeroSlide", "Admin"]
+__all__ = ["Base", "Category", "Product", "Tag", "HeroSlide", "Admin", "MediaVariant"]
 
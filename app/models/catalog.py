@@ -1,6 +1,6 @@
 """产品目录模型 - Category、Product、Tag"""
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Text, Integer, Boolean, ForeignKey, JSON, Table, Column
+from sqlalchemy import String, Text, Integer, Boolean, ForeignKey, JSON, Table, Column, Index
 from typing import Optional, List
 from app.models.base import Base
 
@@ -10,12 +10,17 @@ product_tag_association = Table(
     Base.metadata,
     Column("product_id", Integer, ForeignKey("products.id"), primary_key=True),
     Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    # 按标签查产品（主键是 product_id 在前）
+    Index("ix_product_tags_tag_product", "tag_id", "product_id"),
 )
 
 
 class Category(Base):
     """产品分类 - 维度表（单级分类，极简版）"""
     __tablename__ = "categories"
+    __table_args__ = (
+        Index("ix_categories_active_order", "is_active", "order"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False, comment="分类名称")
@@ -33,12 +38,17 @@ class Category(Base):
 class Tag(Base):
     """标签模型 - 用于产品标签（如：New Arrival, Bestseller 等）"""
     __tablename__ = "tags"
+    __table_args__ = (
+        Index("ix_tags_active_order", "is_active", "order"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(100), unique=True, nullable=False, comment="标签名称")
     color: Mapped[str] = mapped_column(String(20), default="#10b981", comment="标签颜色（十六进制）")
     order: Mapped[int] = mapped_column(Integer, default=0, comment="排序权重")
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, comment="是否启用")
+    # 关联的启用产品数量（由管理后台写产品时增量维护，启动时全量校正）
+    product_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False, comment="关联的启用产品数量")
     
     # 关联关系
     products: Mapped[List["Product"]] = relationship(
@@ -54,6 +64,12 @@ class Tag(Base):
 class Product(Base):
     """产品 - B2B 展示（基于前端 ProductType 设计）"""
     __tablename__ = "products"
+    __table_args__ = (
+        # 公开列表：WHERE is_active [AND category_id] ORDER BY id / keyset 分页
+        Index("ix_products_active_category_id", "is_active", "category_id", "id"),
+        # 媒体清理：复查清理开始后保存的产品
+        Index("ix_products_updated_at", "updated_at"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     category_id: Mapped[Optional[int]] = mapped_column(
@@ -110,6 +126,9 @@ class Product(Base):
         back_populates="products"
     )
 
+    # 非数据库列：目录快照构建时填充，{图片 URL: srcset 数据}
+    image_srcsets = None
+
     def __repr__(self):
         return f"<Product(id={self.id}, name='{self.name}')>"
 
@@ -1,6 +1,6 @@
 """内容模型 - HeroSlide (首页轮播图)"""
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Text, Integer, Boolean
+from sqlalchemy import String, Text, Integer, Boolean, Index
 from typing import Optional
 from app.models.base import Base
 
@@ -8,6 +8,9 @@ from app.models.base import Base
 class HeroSlide(Base):
     """首页轮播图（基于前端 HeroSlide 设计）"""
     __tablename__ = "hero_slides"
+    __table_args__ = (
+        Index("ix_hero_slides_active_order", "is_active", "order"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     title: Mapped[str] = mapped_column(String(200), nullable=False, comment="标题")
@@ -20,6 +23,9 @@ class HeroSlide(Base):
     order: Mapped[int] = mapped_column(Integer, default=0, comment="排序权重（数字越小越靠前）")
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, comment="是否启用")
     
+    # 非数据库列：目录快照构建时填充的 srcset 数据
+    image_srcset = None
+    
     def __repr__(self):
         return f"<HeroSlide(id={self.id}, title='{self.title}')>"
 
@@ -0,0 +1,24 @@
+"""媒体模型 - MediaVariant (图片衍生尺寸)"""
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, JSON
+from typing import Optional
+from app.models.base import Base
+
+
+class MediaVariant(Base):
+    """图片的响应式衍生尺寸（按原图 URL 记录，多个产品 / 轮播图引用同一图片时共用）"""
+    __tablename__ = "media_variants"
+    
+    source_url: Mapped[str] = mapped_column(String(500), primary_key=True, comment="原图URL")
+    width: Mapped[int] = mapped_column(Integer, nullable=False, comment="原图宽度")
+    height: Mapped[int] = mapped_column(Integer, nullable=False, comment="原图高度")
+    # {"webp": "url 320w, url 640w", "jpeg": "url 320w, url 640w"}
+    srcset: Mapped[dict] = mapped_column(JSON, nullable=False, comment="各格式的 srcset 字符串")
+    created_at: Mapped[Optional[str]] = mapped_column(String(50), nullable=True, comment="生成时间")
+    
+    def srcset_data(self) -> dict:
+        """响应中使用的 srcset 数据"""
+        return {"width": self.width, "height": self.height, **self.srcset}
+    
+    def __repr__(self):
+        return f"<MediaVariant(source_url='{self.source_url}')>"
@@ -2,10 +2,7 @@ import React, { createContext, useContext, useState, useEffect, ReactNode } from
 import { ProductType } from "../components/Products";
 import { Category, TagItem, HeroSlide } from "../types/admin";
 import {
-  fetchHeroSlides,
-  fetchCategories,
-  fetchProducts,
-  fetchTags,
+  fetchBootstrap,
   convertApiProductToProductType,
   convertApiHeroSlideToHeroSlide,
   convertApiTagToTagItem,
@@ -36,28 +33,16 @@ export function DataProvider({ children }: { children: ReactNode }) {
       setLoading(true);
       console.log("[DataContext] 开始加载数据...");
       
-      const [heroSlidesData, categoriesData, productsData, tagsData] = await Promise.all([
-        fetchHeroSlides().catch((err) => {
-          console.error("[DataContext] 获取轮播图失败:", err);
-          toast.error("无法加载轮播图数据");
-          return [];
-        }),
-        fetchCategories().catch((err) => {
-          console.error("[DataContext] 获取分类失败:", err);
-          toast.error("无法加载分类数据");
-          return [];
-        }),
-        fetchProducts(undefined, false).catch((err) => {
-          console.error("[DataContext] 获取产品失败:", err);
-          toast.error("无法加载产品数据");
-          return [];
-        }),
-        fetchTags().catch((err) => {
-          console.error("[DataContext] 获取标签失败:", err);
-          toast.error("无法加载标签数据");
-          return [];
-        }),
-      ]);
+      // 一次请求获取首页所需的全部数据
+      const bootstrap = await fetchBootstrap().catch((err) => {
+        console.error("[DataContext] 获取首页数据失败:", err);
+        toast.error("无法加载首页数据");
+        return { slides: [], categories: [], tags: [], products: [] };
+      });
+      const heroSlidesData = bootstrap.slides;
+      const categoriesData = bootstrap.categories;
+      const productsData = bootstrap.products;
+      const tagsData = bootstrap.tags;
       
       console.log("[DataContext] 数据加载完成:", {
         heroSlides: heroSlidesData.length,
@@ -112,13 +97,8 @@ export function DataProvider({ children }: { children: ReactNode }) {
       
       setProducts(convertedProducts);
 
-      // 计算每个标签关联的产品数量
-      const tagsWithCounts = tagsData.map(tag => {
-        const productCount = productsData.filter(p => 
-          p.tags && p.tags.some(t => t.id === tag.id)
-        ).length;
-        return convertApiTagToTagItem(tag, productCount);
-      });
+      // 每个标签关联的启用产品数量由后端维护（product_count）
+      const tagsWithCounts = tagsData.map(tag => convertApiTagToTagItem(tag, tag.product_count));
       setTags(tagsWithCounts);
 
     } catch (error) {
@@ -50,7 +50,75 @@ async function authenticatedFetch(url: string, options: RequestInit = {}) {
 
 // ==================== 文件上传 ====================
 /**
- * 上传临时文件（用于预览，上传到临时目录）
+ * 计算文件内容的 SHA-256（十六进制）
+ * 浏览器不支持（非 HTTPS 环境没有 crypto.subtle）时返回 null
+ */
+async function computeSha256(file: File): Promise<string | null> {
+  if (!window.crypto?.subtle) {
+    return null;
+  }
+  try {
+    const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+  } catch (error) {
+    console.warn('[computeSha256] 计算哈希失败:', error);
+    return null;
+  }
+}
+
+/**
+ * 上传前预检：服务器已有相同内容时直接返回已有文件的 URL，跳过上传
+ */
+async function findExistingMedia(file: File, sha256: string | null): Promise<string | null> {
+  if (!sha256) {
+    return null;
+  }
+  try {
+    const result = await authenticatedFetch(`${ADMIN_API_BASE_URL}/media/precheck`, {
+      method: 'POST',
+      body: JSON.stringify({ sha256, content_type: file.type }),
+    });
+    return result?.exists ? result.url : null;
+  } catch (error) {
+    console.warn('[findExistingMedia] 预检失败，继续上传:', error);
+    return null;
+  }
+}
+
+/**
+ * 直传 OSS：获取预签名地址 → 浏览器直接上传到临时目录 → 回调确认
+ * 存储服务支持时哈希会签入上传地址，由存储服务校验内容，确认后转为正式文件；否则保留为临时文件
+ * OSS 未启用时返回 null，由调用方改为经服务器上传
+ */
+async function uploadDirectToBucket(file: File, sha256: string | null): Promise<string | null> {
+  const ticket = await authenticatedFetch(`${ADMIN_API_BASE_URL}/upload-url`, {
+    method: 'POST',
+    body: JSON.stringify({ filename: file.name, content_type: file.type, size: file.size, sha256 }),
+  });
+  if (!ticket?.direct) {
+    return null;
+  }
+  
+  // 直接上传到 Bucket（不经过应用服务器，也不携带本站 cookie）
+  const putResponse = await fetch(ticket.url, {
+    method: ticket.method,
+    headers: ticket.headers,
+    body: file,
+  });
+  if (!putResponse.ok) {
+    throw new Error(`直传失败 (${putResponse.status} ${putResponse.statusText})`);
+  }
+  
+  const result = await authenticatedFetch(`${ADMIN_API_BASE_URL}/upload-complete`, {
+    method: 'POST',
+    body: JSON.stringify({ object_key: ticket.object_key }),
+  });
+  return result?.url || null;
+}
+
+/**
+ * 上传文件用于预览
+ * 先按内容哈希预检（已有相同文件时不再上传），再优先直传 OSS，OSS 未启用或直传失败时经服务器上传
  */
 export async function uploadTempFile(file: File): Promise<string> {
   const formData = new FormData();
@@ -65,6 +133,23 @@ export async function uploadTempFile(file: File): Promise<string> {
   });
   
   try {
+    const sha256 = await computeSha256(file);
+    const existingUrl = await findExistingMedia(file, sha256);
+    if (existingUrl) {
+      console.log('[uploadTempFile] ♻️ 服务器已有相同文件，跳过上传:', existingUrl);
+      return existingUrl;
+    }
+    
+    try {
+      const directUrl = await uploadDirectToBucket(file, sha256);
+      if (directUrl) {
+        console.log('[uploadTempFile] ✅ 已直传到 OSS:', directUrl);
+        return directUrl;
+      }
+    } catch (error: any) {
+      console.warn('[uploadTempFile] 直传失败，改为经服务器上传:', error);
+    }
+    
     const response = await authenticatedFetch(`${ADMIN_API_BASE_URL}/upload-temp`, {
       method: 'POST',
       body: formData,
@@ -136,6 +221,12 @@ export async function uploadFile(file: File): Promise<string> {
   });
   
   try {
+    const existingUrl = await findExistingMedia(file, await computeSha256(file));
+    if (existingUrl) {
+      console.log('[uploadFile] ♻️ 服务器已有相同文件，跳过上传:', existingUrl);
+      return existingUrl;
+    }
+    
     const response = await authenticatedFetch(`${ADMIN_API_BASE_URL}/upload`, {
       method: 'POST',
       body: formData,
@@ -195,6 +286,12 @@ export async function uploadVideo(file: File): Promise<string> {
   });
   
   try {
+    const existingUrl = await findExistingMedia(file, await computeSha256(file));
+    if (existingUrl) {
+      console.log('[uploadVideo] ♻️ 服务器已有相同文件，跳过上传:', existingUrl);
+      return existingUrl;
+    }
+    
     const response = await authenticatedFetch(`${ADMIN_API_BASE_URL}/upload-video`, {
       method: 'POST',
       body: formData,
@@ -19,6 +19,15 @@ export interface ApiTag {
   color: string;
   order: number;
   is_active: boolean;
+  product_count: number;  // 关联的启用产品数量
+}
+
+// 响应式图片：原图尺寸和各格式的 srcset 字符串
+export interface ApiImageSrcset {
+  width: number;
+  height: number;
+  webp: string | null;
+  jpeg: string | null;
 }
 
 export interface ApiProduct {
@@ -35,6 +44,7 @@ export interface ApiProduct {
   category_id: number | null;
   category?: ApiCategory;
   tags: ApiTag[];
+  image_srcsets?: Record<string, ApiImageSrcset> | null;  // 按图片 URL 索引
 }
 
 export interface ApiHeroSlide {
@@ -48,6 +58,32 @@ export interface ApiHeroSlide {
   text_color: string | null;
   order: number;
   is_active: boolean;
+  image_srcset?: ApiImageSrcset | null;
+}
+
+export interface ApiBootstrap {
+  slides: ApiHeroSlide[];
+  categories: ApiCategory[];
+  tags: ApiTag[];
+  products: ApiProduct[];
+}
+
+/**
+ * 获取首页初始化数据（轮播图、分类、标签、产品一次返回）
+ */
+export async function fetchBootstrap(): Promise<ApiBootstrap> {
+  const url = `${API_BASE_URL}/bootstrap`;
+  console.log(`[API] 获取首页初始化数据: ${url}`);
+  const response = await fetch(url);
+  console.log(`[API] 首页初始化数据响应: ${response.status} ${response.statusText}`);
+  
+  if (!response.ok) {
+    const errorText = await response.text();
+    console.error(`[API] 获取首页初始化数据失败: ${response.status} - ${errorText}`);
+    throw new Error(`Failed to fetch bootstrap data: ${response.statusText}`);
+  }
+  
+  return response.json();
 }
 
 /**
@@ -1,42 +1,74 @@
 #!/usr/bin/env python3
 """
-数据库迁移脚本 - 更新表结构以匹配前端数据结构
-运行此脚本会删除旧表并创建新表（注意：会丢失数据！）
+数据库迁移脚本 - 按版本号应用未执行的迁移（非破坏性，不会丢失数据）
+
+用法：
+    python migrate_database.py           # 应用所有未执行的迁移
+    python migrate_database.py --status  # 查看当前版本
+    python migrate_database.py --reset   # 删除所有表并重建（会丢失数据！）
 """
+import sys
 import asyncio
 from app.core.database import engine
+from app.core.migrations import (
+    MIGRATIONS,
+    LATEST_VERSION,
+    get_schema_version,
+    run_migrations,
+    schema_metadata,
+)
 from app.models.base import Base
-from app.models.catalog import Category, Product, Tag
-from app.models.content import HeroSlide
-from app.models.admin import Admin
 
-async def migrate():
-    """迁移数据库表结构"""
-    print("🔄 开始数据库迁移...")
+
+async def show_status():
+    """显示当前表结构版本和待执行的迁移"""
+    version = await get_schema_version(engine)
+    print(f"📊 当前表结构版本: {version}（最新: {LATEST_VERSION}）")
+    for number, name, _ in MIGRATIONS:
+        mark = "✅" if number <= version else "⏳"
+        print(f"  {mark} {number}: {name}")
+
+
+async def reset():
+    """删除所有表并重新执行全部迁移"""
     print("⚠️  警告：这将删除所有现有表并重新创建（会丢失数据）")
-    
     async with engine.begin() as conn:
-        # 删除所有表
         print("\n📋 删除旧表...")
         await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(schema_metadata.drop_all)
         print("✅ 旧表已删除")
-        
-        # 创建新表
-        print("\n📋 创建新表...")
-        await conn.run_sync(Base.metadata.create_all)
-        print("✅ 新表已创建")
-        
-        print("\n📊 表结构：")
-        print("  - categories (分类表)")
-        print("  - products (产品表，包含 order 字段)")
-        print("  - tags (标签表)")
-        print("  - product_tags (产品-标签关联表)")
-        print("  - hero_slides (轮播图表，包含 text_color 字段)")
-        print("  - admins (管理员账户表)")
-        
-    print("\n✅ 数据库迁移完成！")
+
+
+async def migrate():
+    """应用所有未执行的迁移"""
+    print("🔄 开始数据库迁移...")
+    
+    if "--status" in sys.argv:
+        await show_status()
+        await engine.dispose()
+        return
+    
+    if "--reset" in sys.argv:
+        await reset()
+    
+    before = await get_schema_version(engine)
+    after = await run_migrations(engine)
+    if after == before:
+        print(f"\n✅ 表结构已是最新版本: {after}")
+    else:
+        print(f"\n✅ 数据库迁移完成：{before} -> {after}")
+    
+    print("\n📊 表结构：")
+    print("  - categories (分类表)")
+    print("  - products (产品表，包含 order 字段)")
+    print("  - tags (标签表，包含 product_count 字段)")
+    print("  - product_tags (产品-标签关联表)")
+    print("  - hero_slides (轮播图表，包含 text_color 字段)")
+    print("  - admins (管理员账户表)")
+    print("  - schema_version (表结构版本记录)")
+    
+    await engine.dispose()
     print("\n💡 提示：现在可以通过管理后台 (http://localhost:8000/admin) 添加数据")
 
 if __name__ == "__main__":
     asyncio.run(migrate())
-
@@ -2,6 +2,8 @@
 """测试 OSS 上传功能"""
 import sys
 import os
+import asyncio
+import tempfile
 from pathlib import Path
 
 # 添加项目路径
@@ -23,16 +25,18 @@ def test_oss_config():
     
     print("✅ OSS 配置验证通过")
     print(f"   OSS 类型: {oss_service.oss_type}")
-    print(f"   Bucket: {oss_service.bucket_name}")
-    print(f"   域名: {oss_service.domain}")
     print(f"   路径前缀: {oss_service.prefix}")
-    print(f"   使用 HTTPS: {oss_service.use_https}")
     print(f"   服务状态: {'启用' if oss_service.enabled else '未启用'}")
     
     if not oss_service.enabled:
         print("❌ OSS 服务未启用，无法继续测试")
         return False
     
+    backend = oss_service.backend
+    print(f"   Bucket: {backend.bucket_name}")
+    print(f"   域名: {backend.host}")
+    print(f"   使用 HTTPS: {backend.use_https}")
+    
     return True
 
 def test_oss_upload():
@@ -49,12 +53,14 @@ def test_oss_upload():
     print(f"   文件大小: {len(test_content)} 字节")
     
     try:
-        # 上传文件
-        file_url = oss_service.upload_file(
-            test_content,
-            test_filename,
-            content_type="text/plain"
-        )
+        # 上传文件（写入临时文件后通过存储后端上传）
+        with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as f:
+            f.write(test_content)
+        object_key = oss_service.generate_object_key(test_filename)
+        try:
+            file_url = asyncio.run(oss_service.backend.put_file(object_key, f.name, "text/plain"))
+        finally:
+            os.unlink(f.name)
         
         if file_url:
             print(f"✅ 文件上传成功!")
@@ -92,7 +98,7 @@ def test_oss_delete(file_url):
     print(f"🗑️  准备删除文件: {file_url}")
     
     try:
-        success = oss_service.delete_file(file_url)
+        success = asyncio.run(oss_service.delete_object_async(oss_service.object_key_for_url(file_url)))
         if success:
             print("✅ 文件删除成功!")
         else:
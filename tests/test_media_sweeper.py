@@ -0,0 +1,52 @@
+"""媒体清理测试：时间解析与服务器时区无关"""
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from app.core.media_sweeper import MediaSweeper, MediaReferences, _parse_time
+from app.core.media_store import MediaStore
+
+
+@pytest.fixture
+def local_timezone():
+    """把进程时区切换到 UTC+8，测试结束后恢复"""
+    if not hasattr(time, "tzset"):
+        pytest.skip("当前平台不支持 time.tzset")
+    original = os.environ.get("TZ")
+    os.environ["TZ"] = "Asia/Shanghai"
+    time.tzset()
+    yield
+    if original is None:
+        os.environ.pop("TZ", None)
+    else:
+        os.environ["TZ"] = original
+    time.tzset()
+
+
+def test_parse_time_mixes_naive_and_aware_values(local_timezone):
+    moment = datetime(2026, 10, 17, 3, 0, 0, tzinfo=timezone.utc)
+    expected = moment.timestamp()
+    # 旧数据：utcnow().isoformat()；新数据：now(timezone.utc).isoformat()
+    assert _parse_time(moment.replace(tzinfo=None).isoformat()) == expected
+    assert _parse_time(moment.isoformat()) == expected
+    assert _parse_time(moment.astimezone(timezone(timedelta(hours=8))).isoformat()) == expected
+    assert _parse_time(None) == 0.0
+    assert _parse_time("not a time") == 0.0
+
+
+def test_recent_variants_are_not_stale_outside_utc(local_timezone, tmp_path):
+    sweeper = MediaSweeper(MediaStore(tmp_path / "uploads"), tmp_path / "incoming", interval=0, ttl=3600)
+    cutoff = time.time() - sweeper.ttl
+    just_now = datetime.now(timezone.utc) - timedelta(minutes=1)
+    long_ago = datetime.now(timezone.utc) - timedelta(days=2)
+    variants = [
+        SimpleNamespace(source_url="/uploads/a.jpg", srcset={}, created_at=just_now.replace(tzinfo=None).isoformat()),
+        SimpleNamespace(source_url="/uploads/b.jpg", srcset={}, created_at=just_now.isoformat()),
+        SimpleNamespace(source_url="/uploads/c.jpg", srcset={}, created_at=long_ago.replace(tzinfo=None).isoformat()),
+        SimpleNamespace(source_url="/uploads/d.jpg", srcset={}, created_at=long_ago.isoformat()),
+    ]
+
+    references = MediaReferences()
+    sweeper._add_urls(references, set(), variants, cutoff)
+    assert sorted(references.stale_variants) == ["/uploads/c.jpg", "/uploads/d.jpg"]
@@ -0,0 +1,207 @@
+"""存储后端测试
+
+- LocalStorageBackend：保存、读取、分页列举、批量删除的完整流程
+- S3StorageBackend：通过 endpoint_url 连接 S3 兼容服务（moto 服务端），验证分片上传、分片重试和分片线程数上限
+
+S3 测试需要 boto3 和 moto[server]，未安装时跳过（pip install boto3 "moto[server]"）。
+"""
+import asyncio
+import base64
+import hashlib
+import os
+import threading
+import pytest
+from app.core.storage import LocalStorageBackend, StorageExecutor
+import app.core.storage.remote as remote
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+# ==================== 本地后端 ====================
+def test_local_backend_round_trip(tmp_path):
+    root = tmp_path / "uploads"
+    backend = LocalStorageBackend(root, "/uploads", StorageExecutor(2, 8, name="test-local"))
+    backend.BATCH_DELETE_SIZE = 2
+    source = tmp_path / "source.jpg"
+    source.write_bytes(b"hello world")
+
+    async def scenario():
+        url = await backend.put_file("media/ab/a.jpg", source, "image/jpeg")
+        assert url == "/uploads/media/ab/a.jpg"
+        assert source.exists(), "move=False 时保留源文件"
+        assert backend.key_for_url(url) == "media/ab/a.jpg"
+
+        info = await backend.head("media/ab/a.jpg")
+        assert info == {"size": 11, "content_type": "image/jpeg"}
+        assert await backend.head("media/ab/missing.jpg") is None
+        assert await backend.read_range("media/ab/a.jpg", 6, 10) == b"world"
+
+        for i in range(4):
+            assert await backend.put_file(f"media/cd/{i}.png", source, "image/png")
+        pages = [page async for page in backend.iter_pages("media/")]
+        assert [len(page) for page in pages] == [2, 2, 1]
+        keys = [item["key"] for page in pages for item in page]
+        assert keys == sorted(keys)
+        assert keys[0] == "media/ab/a.jpg"
+
+        # 同步分页接口：按标记逐页继续
+        first, marker = backend._list_page("media/", None)
+        second, marker = backend._list_page("media/", marker)
+        assert [item["key"] for item in first + second] == keys[:4]
+
+        assert await backend.delete_many(keys) == []
+        assert [page async for page in backend.iter_pages("media/")] == []
+
+    try:
+        run(scenario())
+    finally:
+        backend.shutdown()
+    # 删除文件后空目录一并清理，根目录保留
+    assert root.exists()
+    assert not (root / "media").exists()
+
+
+def test_local_backend_rejects_keys_outside_root(tmp_path):
+    backend = LocalStorageBackend(tmp_path / "uploads", "/uploads", StorageExecutor(1, 4, name="test-local"))
+    try:
+        with pytest.raises(ValueError):
+            backend.path_for("../secret.txt")
+        assert backend.key_for_url("/uploads/../secret.txt") is None
+        assert backend.key_for_url("https://example.com/uploads/a.jpg") is None
+    finally:
+        backend.shutdown()
+
+
+# ==================== S3 后端（moto） ====================
+@pytest.fixture
+def s3_endpoint():
+    pytest.importorskip("boto3")
+    moto_server = pytest.importorskip("moto.server")
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3_backend(s3_endpoint, monkeypatch):
+    # 超过 6MB 分片上传，分片 5MB（S3 要求除最后一片外不小于 5MB）
+    monkeypatch.setattr(remote, "OSS_MULTIPART_THRESHOLD", 6 * 1024 * 1024)
+    monkeypatch.setattr(remote, "OSS_MULTIPART_PART_SIZE", 5 * 1024 * 1024)
+    monkeypatch.setattr(remote, "OSS_MULTIPART_CONCURRENCY", 2)
+    from app.core.storage.s3 import S3StorageBackend
+
+    backend = S3StorageBackend(
+        StorageExecutor(4, 16, name="test-s3"),
+        "testing",
+        "testing",
+        "us-east-1",
+        "test-bucket",
+        endpoint_url=s3_endpoint,
+    )
+    backend.client.create_bucket(Bucket="test-bucket")
+    yield backend
+    backend.shutdown()
+
+
+def test_s3_multipart_upload(s3_backend, tmp_path):
+    data = os.urandom(12 * 1024 * 1024)
+    source = tmp_path / "video.mp4"
+    source.write_bytes(data)
+
+    # 第 2 片第一次失败，只重试这一片
+    upload_part = s3_backend.client.upload_part
+    calls = []
+
+    def flaky_upload_part(**kwargs):
+        calls.append(kwargs["PartNumber"])
+        if kwargs["PartNumber"] == 2 and calls.count(2) == 1:
+            raise ConnectionError("connection reset")
+        return upload_part(**kwargs)
+
+    s3_backend.client.upload_part = flaky_upload_part
+
+    async def scenario():
+        url = await s3_backend.put_file("uploads/media/ab/video.mp4", source, "video/mp4")
+        assert url and url.endswith("/uploads/media/ab/video.mp4")
+        assert await s3_backend.head("uploads/media/ab/video.mp4") == {"size": len(data), "content_type": "video/mp4"}
+        downloaded = tmp_path / "downloaded.mp4"
+        assert await s3_backend.download("uploads/media/ab/video.mp4", downloaded)
+        assert downloaded.read_bytes() == data
+
+    run(scenario())
+    assert sorted(calls) == [1, 2, 2, 3]
+    assert not s3_backend.client.list_multipart_uploads(Bucket="test-bucket").get("Uploads")
+
+
+def test_s3_failed_multipart_upload_is_aborted(s3_backend, tmp_path, monkeypatch):
+    source = tmp_path / "video.mp4"
+    source.write_bytes(os.urandom(11 * 1024 * 1024))
+
+    def broken_upload_part(**kwargs):
+        raise ConnectionError("connection reset")
+
+    s3_backend.client.upload_part = broken_upload_part
+    monkeypatch.setattr(remote.time, "sleep", lambda seconds: None)
+    assert run(s3_backend.put_file("uploads/media/ab/broken.mp4", source, "video/mp4")) is None
+    assert run(s3_backend.head("uploads/media/ab/broken.mp4")) is None
+    assert not s3_backend.client.list_multipart_uploads(Bucket="test-bucket").get("Uploads")
+
+
+def test_s3_concurrent_multipart_uploads_share_part_threads(s3_backend, tmp_path):
+    sources = []
+    for i in range(3):
+        path = tmp_path / f"video-{i}.mp4"
+        path.write_bytes(os.urandom(11 * 1024 * 1024))
+        sources.append(path)
+
+    upload_part = s3_backend.client.upload_part
+    peak = [0]
+
+    def counting_upload_part(**kwargs):
+        part_threads = [t for t in threading.enumerate() if t.name.startswith(f"{s3_backend.name}-part")]
+        peak[0] = max(peak[0], len(part_threads))
+        return upload_part(**kwargs)
+
+    s3_backend.client.upload_part = counting_upload_part
+
+    async def scenario():
+        return await asyncio.gather(*(
+            s3_backend.put_file(f"uploads/media/ab/video-{i}.mp4", path, "video/mp4")
+            for i, path in enumerate(sources)
+        ))
+
+    assert all(run(scenario()))
+    # 三个上传同时进行，分片线程总数仍不超过 OSS_MULTIPART_CONCURRENCY
+    assert 0 < peak[0] <= 2
+
+
+# ==================== S3 直传校验 ====================
+def test_s3_presigned_put_signs_sha256(tmp_path):
+    pytest.importorskip("boto3")
+    from botocore.stub import Stubber
+    from app.core.storage.s3 import S3StorageBackend
+
+    backend = S3StorageBackend(StorageExecutor(1, 4, name="test-s3"), "testing", "testing", "us-east-1", "test-bucket")
+    sha256 = hashlib.sha256(b"hello").hexdigest()
+    checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+    try:
+        url = backend.presign_put("temp/a.png", "image/png", 600, sha256)
+        assert "x-amz-checksum-sha256" in url.split("X-Amz-SignedHeaders=")[1].split("&")[0]
+        assert backend.checksum_headers(sha256) == {"x-amz-checksum-sha256": checksum}
+        assert "x-amz-checksum-sha256" not in backend.presign_put("temp/b.png", "image/png", 600)
+
+        with Stubber(backend.client) as stubber:
+            expected = {"Bucket": "test-bucket", "Key": "temp/a.png", "ChecksumMode": "ENABLED"}
+            stubber.add_response("head_object", {"ContentLength": 5, "ContentType": "image/png", "ChecksumSHA256": checksum}, expected)
+            # 分片上传的组合校验值不是文件哈希
+            stubber.add_response("head_object", {"ContentLength": 5, "ContentType": "image/png", "ChecksumSHA256": f"{checksum}-3"}, expected)
+            stubber.add_response("head_object", {"ContentLength": 5, "ContentType": "image/png"}, expected)
+            assert run(backend.head("temp/a.png")) == {"size": 5, "content_type": "image/png", "sha256": sha256}
+            assert run(backend.head("temp/a.png")) == {"size": 5, "content_type": "image/png"}
+            assert run(backend.head("temp/a.png")) == {"size": 5, "content_type": "image/png"}
+    finally:
+        backend.shutdown()
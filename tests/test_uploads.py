@@ -0,0 +1,37 @@
+"""上传接收测试：文件头识别与类型校验"""
+import asyncio
+import io
+import pytest
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+from app.core.uploads import check_content_type, receive_upload, sniff_content_type
+
+
+def atom(kind: bytes, payload: bytes = b"") -> bytes:
+    return (8 + len(payload)).to_bytes(4, "big") + kind + payload
+
+
+@pytest.mark.parametrize("first_atom", [b"wide", b"moov", b"mdat", b"free", b"skip", b"pnot"])
+def test_quicktime_without_ftyp_is_accepted(first_atom):
+    head = atom(first_atom, b"\0" * 8)
+    assert sniff_content_type(head) == "video/quicktime"
+    check_content_type("video/quicktime", head)
+    check_content_type("video/mp4", head)
+    with pytest.raises(HTTPException):
+        check_content_type("image/jpeg", head)
+
+
+def test_receive_mov_starting_with_wide(tmp_path):
+    content = atom(b"wide") + atom(b"mdat", b"\0" * 1024) + atom(b"moov", b"\0" * 64)
+    upload = UploadFile(io.BytesIO(content), filename="clip.mov", headers=Headers({"content-type": "video/quicktime"}))
+
+    received = asyncio.run(receive_upload(upload, tmp_path, {"video/quicktime", "video/mp4"}))
+    assert received.size == len(content)
+    assert received.path.read_bytes() == content
+    received.discard()
+
+
+def test_unknown_header_is_rejected():
+    with pytest.raises(HTTPException):
+        check_content_type("video/mp4", b"\0\0\0\x08abcd" + b"\0" * 8)
+    check_content_type("video/mp4", atom(b"ftyp", b"isom\0\0\0\0"))